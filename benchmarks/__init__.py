@@ -0,0 +1,4 @@
+"""
+离线基准测试：python -m benchmarks [--suite parse,serialize,e2e] [--quick] [--save-baseline] [--check]
+不访问网络；端到端测试使用本地 aiohttp 搜索桩与进程内 AMQP 替身。
+"""
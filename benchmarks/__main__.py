@@ -0,0 +1,61 @@
+import argparse
+import json
+import sys
+
+from . import bench_e2e, bench_parse, bench_serialize
+from .common import compare, load_baseline, median_of, peak_rss_mb, save_baseline
+
+SUITES = ("parse", "serialize", "e2e")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="离线基准测试")
+    parser.add_argument("--suite", default=",".join(SUITES), help="逗号分隔：parse,serialize,e2e")
+    parser.add_argument("--quick", action="store_true", help="减少迭代次数，用于冒烟检查")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果写为基线")
+    parser.add_argument("--check", action="store_true", help="相对基线退化超过容差时返回非零退出码")
+    parser.add_argument("--repeats", type=int, default=5, help="每个 suite 重复运行次数，逐项取中位数，默认 5")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的相对退化比例，默认 0.2")
+    parser.add_argument("--output", help="另存本次结果 JSON 的路径")
+    args = parser.parse_args()
+
+    suites = [s.strip() for s in args.suite.split(",") if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"未知的 suite: {', '.join(sorted(unknown))}")
+
+    iterations = 50 if args.quick else 200
+    results = {}
+    rss = {}
+    runners = {
+        "parse": lambda: bench_parse.run(iterations),
+        "serialize": lambda: bench_serialize.run(iterations * 50),
+        "e2e": lambda: bench_e2e.run(pages=50 if args.quick else 300),
+    }
+    for suite in SUITES:
+        if suite in suites:
+            results[suite] = median_of([runners[suite]() for _ in range(max(1, args.repeats))])
+            rss[suite] = peak_rss_mb()
+    # 峰值常驻内存单调不减，记录每个 suite 结束时的值
+    results["memory"] = {suite: {"peakRssMb": value} for suite, value in rss.items()}
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    baseline = load_baseline()
+    regressions = []
+    if baseline:
+        print("\n与基线比较（容差 {:.0%}）:".format(args.tolerance))
+        regressions = compare(results, baseline, args.tolerance)
+    if args.save_baseline:
+        save_baseline(results)
+        print("💾 已保存基线")
+    if regressions:
+        print(f"\n❌ {len(regressions)} 项退化超过容差")
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
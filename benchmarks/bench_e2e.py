@@ -0,0 +1,116 @@
+"""
+端到端基准：CrawlerService._start_job 对本地 aiohttp 搜索桩抓取，结果发往进程内 AMQP 替身
+- 搜索桩按页改写链接域名，使每页结果互不重复，去重不会吞掉结果
+- 关闭限速、自适应调节与 SERP 缓存，测的是抓取/解析/发布流水线本身
+"""
+import asyncio
+import time
+from typing import Dict
+
+from aiohttp import web
+
+from spider_core import configs, engines
+from spider_core.crawler import CrawlerService
+
+from .common import BING_FIXTURES, REFERENCE_BLOCKS, percentile, reference_runs
+
+STUB_HOST = "127.0.0.1"
+
+
+class InProcessExchange:
+    """AMQP 交换机替身：只统计消息数与字节数"""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def publish(self, message, routing_key=""):
+        self.messages += 1
+        self.bytes += len(message.body)
+
+
+class StubBingEngine(engines.BingEngine):
+    """指向本地搜索桩的 Bing 引擎"""
+
+    name = "bench"
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url
+
+
+async def _start_stub(html: str):
+    async def search(request):
+        page = request.query.get("first", "1")
+        return web.Response(text=html.replace("https://", f"https://p{page}."), content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/search", search)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, STUB_HOST, 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{STUB_HOST}:{port}/search"
+
+
+def _configure():
+    configs.RATE_LIMIT_CONFIG["bench"] = {"rate": 0, "burst": 1}
+    configs.ADAPTIVE_CONFIG["enabled"] = False
+    configs.CACHE_CONFIG["enabled"] = False
+
+
+async def _run(pages: int, concurrency: int) -> Dict[str, float]:
+    _configure()
+    runner, base_url = await _start_stub(BING_FIXTURES[0].read_text(encoding="utf-8"))
+    engines.register_engine(StubBingEngine(base_url))
+    svc = CrawlerService(configs.AMQP_URL)
+    await svc.http_pool.start()
+    svc.parse_executor.start()
+    exchange = InProcessExchange()
+    svc.split_exchange = None
+
+    latencies = []
+    results = 0
+    crawl_one = svc._crawl_one
+
+    async def timed_crawl_one(*args, **kwargs):
+        nonlocal results
+        start = time.perf_counter()
+        report = await crawl_one(*args, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        results += report.get("results", 0)
+        return report
+
+    svc._crawl_one = timed_crawl_one
+    cmd = {"task_id": 1, "keywords": ["bench"], "pageSize": pages, "concurrency": concurrency,
+           "rateLimitPerSec": 0, "engine": "bench"}
+    try:
+        start = time.perf_counter()
+        await svc._start_job(exchange, cmd, asyncio.Event())
+        elapsed = time.perf_counter() - start
+    finally:
+        await svc.close()
+        await runner.cleanup()
+        engines.ENGINES.pop("bench", None)
+
+    return {
+        "pagesPerSec": round(len(latencies) / elapsed, 1),
+        "resultsPerSec": round(results / elapsed, 1),
+        "p50Ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99Ms": round(percentile(latencies, 99) * 1000, 3),
+        "messagesPerSec": round(exchange.messages / elapsed, 1),
+        "publishedBytesPerPage": round(exchange.bytes / max(1, len(latencies)), 1),
+    }
+
+
+def run(pages: int, concurrency: int = 8) -> Dict[str, dict]:
+    """
+    用例名只含并发数、指标都是速率或单页值，--quick 的少量页数与完整运行可以和同一条基线比较
+    参考负载在运行前后各测一组，relP50 为单页中位延迟相对其中位耗时的比值
+    """
+    reference = reference_runs(REFERENCE_BLOCKS)
+    summary = asyncio.run(_run(pages, concurrency))
+    reference += reference_runs(REFERENCE_BLOCKS)
+    summary["relP50"] = round(summary["p50Ms"] / 1000 / percentile(reference, 50), 4)
+    return {f"c{concurrency}": summary}
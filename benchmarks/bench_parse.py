@@ -0,0 +1,38 @@
+"""解析微基准：每个 Bing fixture × 每个解析后端（含流式解析），百度 fixture × 百度解析"""
+from typing import Callable, Dict
+
+from spider_core.parsers import PARSER_BACKENDS, bing_stream_parser, parse_baidu_links
+
+from .common import BAIDU_FIXTURES, BING_FIXTURES, summarize, timed_runs
+
+
+def _stream_parse(html: str, chunk_size: int = 16 * 1024):
+    parser = bing_stream_parser()
+    links = []
+    for i in range(0, len(html), chunk_size):
+        links.extend(parser.feed(html[i:i + chunk_size]))
+    links.extend(parser.close())
+    return links
+
+
+def _cases(path) -> Dict[str, Callable[[], list]]:
+    """按 fixture 所属引擎选择解析用例：Bing 页面跑各后端与流式解析，百度页面跑百度解析"""
+    html = path.read_text(encoding="utf-8", errors="ignore")
+    if path in BAIDU_FIXTURES:
+        return {"baidu": lambda h=html: parse_baidu_links(h)}
+    cases = {name: (lambda h=html, f=func: f(h, "bing")) for name, func in PARSER_BACKENDS.items()}
+    if bing_stream_parser() is not None:
+        cases["stream"] = lambda h=html: _stream_parse(h)
+    return cases
+
+
+def run(iterations: int) -> Dict[str, dict]:
+    results = {}
+    for path in BING_FIXTURES + BAIDU_FIXTURES:
+        for name, func in _cases(path).items():
+            count = len(func())
+            reference = []
+            summary = summarize(timed_runs(func, iterations, reference=reference), count, reference=reference)
+            summary["pagesPerSec"] = summary.pop("opsPerSec")
+            results[f"{path.name}/{name}"] = summary
+    return results
@@ -0,0 +1,59 @@
+"""
+信封序列化基准：Broadcaster._envelope + _build_message，以及消费端解压与按 content_type 解码
+resultBatch 按其发布路径允许压缩，progress / result 走 SpringBoot 也会收到的路径，不压缩
+"""
+from datetime import datetime
+from typing import Dict
+
+import aio_pika
+
+from spider_core import codecs, compression
+from spider_core.broadcaster import Broadcaster
+
+from .common import summarize, timed_runs
+
+
+def _result_item(i: int) -> dict:
+    return {
+        "task_id": 1,
+        "keywords": ["电影", "排名", "TOP250"],
+        "url": f"https://movie.douban.com/subject/{1292052 + i}/",
+        "title": f"肖申克的救赎 The Shawshank Redemption ({i})",
+        "source": "movie.douban.com",
+        "dateTime": datetime.now().isoformat(),
+    }
+
+
+def _decode(message: aio_pika.Message):
+    body = compression.decompress(message.body, message.content_encoding, message.headers)
+    return codecs.decode(body, message.content_type)
+
+
+def run(iterations: int) -> Dict[str, dict]:
+    items = [_result_item(i) for i in range(10)]
+    payloads = [Broadcaster._result_payload(1, item) for item in items]
+    cases = {
+        "progress": lambda: Broadcaster._build_message(Broadcaster._envelope(
+            "progress", 1, {"currentPage": 3, "totalPages": 10, "queueDepth": 2, "cacheHits": 0})),
+        "result": lambda: Broadcaster._build_message(Broadcaster._envelope("result", 1, payloads[0])),
+        "resultBatch10": lambda: Broadcaster._build_message(Broadcaster._envelope(
+            "resultBatch", 1, {"count": len(payloads), "results": payloads}), compress=True),
+    }
+    batch = Broadcaster._envelope("resultBatch", 1, {"count": len(payloads), "results": payloads})
+    json_message = Broadcaster._build_message(batch, compress=True)
+    cases["decodeBatch10/json"] = lambda: _decode(json_message)
+    if "msgpack" in codecs.CODECS:
+        msgpack_codec = codecs.get_codec("msgpack")
+        msgpack_message = Broadcaster._build_message(batch, msgpack_codec, compress=True)
+        cases["resultBatch10/msgpack"] = lambda: Broadcaster._build_message(batch, msgpack_codec, compress=True)
+        cases["decodeBatch10/msgpack"] = lambda: _decode(msgpack_message)
+    results = {}
+    for name, func in cases.items():
+        reference = []
+        summary = summarize(timed_runs(func, iterations, reference=reference), reference=reference)
+        summary["messagesPerSec"] = summary.pop("opsPerSec")
+        output = func()
+        if isinstance(output, aio_pika.Message):
+            summary["bytes"] = len(output.body)
+        results[name] = summary
+    return results
@@ -0,0 +1,154 @@
+import json
+import re
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+# out.txt 是真实抓取的 Bing 页面外壳（结果由脚本渲染，解析出 0 条），只用来衡量整页 DOM 的解析开销
+BING_FIXTURES = sorted((ROOT / "spider_core" / "fixtures").glob("bing_*.html")) + [ROOT / "out.txt"]
+BAIDU_FIXTURES = sorted((ROOT / "spider_core" / "fixtures").glob("baidu_*.html"))
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+# 门禁比较的指标：
+# - relP50：中位耗时 ÷ 同期测得的参考负载中位耗时，机器整体变快变慢（虚拟机降频、邻居抢占）时比值基本不变
+# - 字节数与内存：确定性指标
+# 绝对耗时、吞吐（由均值算出）与 p99 易受机器状态与个别慢样本影响，只输出不判定
+GATED_METRICS = ("relP50", "bytes", "publishedBytesPerPage", "peakRssMb")
+# 用例每累计计时这么多秒穿插测一次参考负载：按时间而不是按次数穿插，
+# 参考负载对紧随其后样本的扰动（缓存被冲掉）在 --quick 与完整运行中占比相同
+REFERENCE_INTERVAL = 0.002
+# bench_e2e 在运行前后各测的参考负载次数
+REFERENCE_BLOCKS = 20
+# 每个用例计时前的最短预热时间（秒）
+WARMUP_SECONDS = 0.1
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """最近秩百分位数"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+_REFERENCE_PATTERN = re.compile(r"href='([^']+)'>([^<]+)<")
+_REFERENCE_TEXT = " ".join(f"<a href='/item/{i}'>标题 {i}</a>" for i in range(200))
+
+
+def _reference_workload() -> None:
+    """固定的参考负载：正则提取 + JSON 编解码 + 纯 Python 循环，覆盖解析与序列化的主要开销类型"""
+    links = _REFERENCE_PATTERN.findall(_REFERENCE_TEXT)
+    doc = json.loads(json.dumps({"links": links, "total": sum(i * i for i in range(5000))}, ensure_ascii=False))
+    sorted(doc["links"], reverse=True)
+
+
+def reference_runs(count: int) -> List[float]:
+    """执行 count 次参考负载，返回每次耗时（秒）"""
+    return timed_runs(_reference_workload, count, warmup=1)
+
+
+def timed_runs(func: Callable[[], object], iterations: int, warmup: int = 3,
+               reference: Optional[List[float]] = None) -> List[float]:
+    """
+    重复执行 func，返回每次耗时（秒）
+    预热至少 warmup 次且不少于 WARMUP_SECONDS，--quick 与完整运行都在稳态下计时，结果可以互相比较
+    :param reference: 传入列表时，每隔 REFERENCE_INTERVAL 秒的用例耗时测一次参考负载并追加到该列表
+    """
+    deadline = time.perf_counter() + WARMUP_SECONDS
+    done = 0
+    while done < warmup or time.perf_counter() < deadline:
+        func()
+        if reference is not None:
+            _reference_workload()
+        done += 1
+    samples = []
+    since_reference = REFERENCE_INTERVAL
+    for _ in range(iterations):
+        if reference is not None and since_reference >= REFERENCE_INTERVAL:
+            start = time.perf_counter()
+            _reference_workload()
+            reference.append(time.perf_counter() - start)
+            since_reference = 0.0
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+        since_reference += samples[-1]
+    return samples
+
+
+def summarize(samples: List[float], items_per_run: int = 0, item_name: str = "results",
+              reference: Optional[List[float]] = None) -> Dict[str, float]:
+    """
+    把耗时样本汇总为吞吐与 p50/p99（毫秒）
+    :param reference: 同期测得的参考负载耗时，给出时附加 relP50（中位耗时相对参考负载的比值）
+    """
+    total = sum(samples) or 1e-9
+    summary = {
+        "opsPerSec": round(len(samples) / total, 1),
+        "p50Ms": round(percentile(samples, 50) * 1000, 4),
+        "p99Ms": round(percentile(samples, 99) * 1000, 4),
+    }
+    if reference:
+        summary["relP50"] = round(percentile(samples, 50) / percentile(reference, 50), 4)
+    if items_per_run:
+        summary[f"{item_name}PerSec"] = round(len(samples) * items_per_run / total, 1)
+    return summary
+
+
+def median_of(runs: List[Dict[str, dict]]) -> Dict[str, dict]:
+    """
+    合并同一 suite 的多次运行：数值指标逐项取中位数
+    偶发的抢占（或参考负载恰好被打断）只影响个别运行，中位数把它们滤掉，基线也不会被个别幸运的运行拉低
+    """
+    merged: Dict[str, dict] = {}
+    for case in runs[0]:
+        merged[case] = {
+            name: (statistics.median(run[case][name] for run in runs) if isinstance(value, (int, float)) else value)
+            for name, value in runs[0][case].items()
+        }
+    return merged
+
+
+def peak_rss_mb() -> float:
+    """本进程的峰值常驻内存（MB）；不含进程池子进程"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def load_baseline() -> dict:
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+
+
+def save_baseline(results: dict) -> None:
+    BASELINE_PATH.write_text(json.dumps(results, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    与基线逐项比较（只判定 GATED_METRICS，全部越小越好）
+    :param tolerance: 允许的相对退化比例（0.2 表示 20%）
+    :return: 退化项描述列表
+    """
+    regressions = []
+    for suite, cases in results.items():
+        for case, metrics in cases.items():
+            base = baseline.get(suite, {}).get(case)
+            if not base:
+                continue
+            for name, value in metrics.items():
+                old = base.get(name)
+                if name not in GATED_METRICS or not old or not isinstance(value, (int, float)):
+                    continue
+                change = (value - old) / old
+                flag = "❌" if change > tolerance else ("✅" if change < -tolerance else "  ")
+                print(f"{flag} {suite:<10} {case:<32} {name:<22} {old:>12} -> {value:>12} ({change:+.1%})")
+                if change > tolerance:
+                    regressions.append(f"{suite}/{case}/{name}: {old} -> {value} ({change:+.1%})")
+    return regressions
@@ -40,9 +40,8 @@ async def main():
         import traceback
         traceback.print_exc()  # 🔥 打印完整错误堆栈
     finally:
-        # 清理资源
-        if crawler.connection and not crawler.connection.is_closed:
-            await crawler.connection.close()
+        # 清理资源：HTTP 连接池 + RabbitMQ 连接
+        await crawler.close()
         print("✅ 爬虫服务已停止")
 
 
@@ -0,0 +1,125 @@
+import math
+import time
+from typing import Dict, List
+
+# 请求结果分类
+OK = "ok"
+THROTTLED = "throttled"  # 429/503 等限流状态码
+TIMEOUT = "timeout"
+CAPTCHA = "captcha"
+ERROR = "error"  # 其它非 200 或连接错误
+
+
+class AimdController:
+    """
+    单个搜索引擎的 AIMD 自适应调节器
+    维护缩放系数 scale ∈ [min_scale, 1]，调用方给出的 concurrency / rateLimitPerSec 是上限：
+    - 每累计 window 个样本评估一次：p95 延迟达标且成功率达标时加法增加，否则乘法减小
+    - 限流状态码、超时、验证码页立即乘法减小（cooldown 秒内只减一次，避免同一波失败连续砍）
+    """
+
+    def __init__(self, engine: str, config: dict):
+        self.engine = engine
+        self.enabled = config.get("enabled", True)
+        self.min_scale = config["min_scale"]
+        self.increase = config["increase"]
+        self.decrease = config["decrease"]
+        self.window = max(1, config["window"])
+        self.target_p95 = config["target_p95"]
+        self.min_success_rate = config["min_success_rate"]
+        self.cooldown = config["cooldown"]
+        self.throttle_statuses = frozenset(config["throttle_statuses"])
+        self.scale = config["initial_scale"] if self.enabled else 1.0
+        self._latencies: List[float] = []  # 当前窗口内成功请求的延迟
+        self._samples = 0
+        self._last_cut = 0.0
+        self.counts = {OK: 0, THROTTLED: 0, TIMEOUT: 0, CAPTCHA: 0, ERROR: 0}
+        self.increases = 0
+        self.decreases = 0
+
+    def outcome_for_status(self, status: int) -> str:
+        """把 HTTP 状态码归类为请求结果"""
+        if status == 200:
+            return OK
+        return THROTTLED if status in self.throttle_statuses else ERROR
+
+    def record(self, outcome: str, latency: float) -> None:
+        """
+        记录一次请求结果并按需调整 scale
+        :param outcome: OK / THROTTLED / TIMEOUT / CAPTCHA / ERROR
+        :param latency: 请求耗时（秒）
+        """
+        self.counts[outcome] = self.counts.get(outcome, 0) + 1
+        if not self.enabled:
+            return
+        self._samples += 1
+        if outcome == OK:
+            self._latencies.append(latency)
+        elif outcome != ERROR:
+            self._cut()
+            return
+        if self._samples >= self.window:
+            self._evaluate()
+
+    def _cut(self) -> None:
+        """乘法减小并清空当前窗口"""
+        now = time.monotonic()
+        if now - self._last_cut >= self.cooldown:
+            self._last_cut = now
+            self.scale = max(self.min_scale, self.scale * self.decrease)
+            self.decreases += 1
+        self._reset_window()
+
+    def _evaluate(self) -> None:
+        """窗口满：延迟与成功率都达标则加法增加，否则乘法减小"""
+        success_rate = len(self._latencies) / self._samples
+        if success_rate >= self.min_success_rate and self.p95() <= self.target_p95:
+            self.scale = min(1.0, self.scale + self.increase)
+            self.increases += 1
+            self._reset_window()
+        else:
+            self._cut()
+
+    def _reset_window(self) -> None:
+        self._latencies = []
+        self._samples = 0
+
+    def p95(self) -> float:
+        """当前窗口内成功请求的 p95 延迟"""
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def concurrency_for(self, upper: int) -> int:
+        """按 scale 折算后的实际并发（至少 1，不超过 upper）"""
+        return max(1, min(upper, math.ceil(upper * self.scale)))
+
+    def stats(self) -> dict:
+        """返回调节器统计快照"""
+        return {
+            "scale": round(self.scale, 3),
+            "p95": round(self.p95(), 3),
+            "increases": self.increases,
+            "decreases": self.decreases,
+            **self.counts,
+        }
+
+
+class AdaptiveRegistry:
+    """进程级调节器注册表：同一搜索引擎的所有任务共享一个 AIMD 调节器"""
+
+    def __init__(self, config: dict):
+        self._config = config
+        self._controllers: Dict[str, AimdController] = {}
+
+    def get(self, engine: str) -> AimdController:
+        """获取（或懒创建）某引擎的调节器"""
+        controller = self._controllers.get(engine)
+        if controller is None:
+            controller = self._controllers[engine] = AimdController(engine, self._config)
+        return controller
+
+    def stats(self) -> Dict[str, dict]:
+        """所有引擎调节器的统计"""
+        return {engine: c.stats() for engine, c in self._controllers.items()}
@@ -0,0 +1,89 @@
+import heapq
+import itertools
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class AdmissionController:
+    """
+    任务准入控制
+    - 本进程同时运行的任务数不超过 max_running
+    - 超出的 start 命令按 priority（大者优先，同优先级先到先得）进入本地等待队列，
+      对应的 AMQP 消息保持未确认；命令通道的 prefetch 用完后 broker 不再向本进程投递，
+      多出的命令留在 broker 上由其它 worker 消费
+    - 同一 task_id 已在运行或排队时，新的 start 视为重复（由调用方拒绝其消息）
+    """
+
+    def __init__(self, max_running: int, max_queued: int):
+        self.max_running = max(1, max_running)
+        self.max_queued = max_queued
+        self._running: Set[str] = set()
+        self._heap: List[Tuple[int, int, str]] = []
+        self._entries: Dict[str, Tuple[dict, object]] = {}
+        self._seq = itertools.count()
+        self.duplicates = 0
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    @property
+    def queued(self) -> int:
+        return len(self._entries)
+
+    def is_duplicate(self, task_id) -> bool:
+        """该任务已在运行或排队时返回 True 并计数"""
+        key = str(task_id)
+        if key in self._running or key in self._entries:
+            self.duplicates += 1
+            return True
+        return False
+
+    def holds(self, task_id, message) -> bool:
+        """该消息是否作为该任务的 start 命令在等待队列中（由本控制器负责确认）"""
+        entry = self._entries.get(str(task_id))
+        return entry is not None and entry[1] is message
+
+    def try_acquire(self, task_id) -> bool:
+        """有空闲名额时为该任务占用一个并返回 True"""
+        if self.running < self.max_running:
+            self._running.add(str(task_id))
+            return True
+        return False
+
+    def release(self, task_id) -> None:
+        """任务结束，释放名额"""
+        self._running.discard(str(task_id))
+
+    def push(self, cmd: dict, message) -> int:
+        """
+        把 start 命令放入等待队列
+        :param cmd: start 命令
+        :param message: 对应的未确认 AMQP 消息
+        :return: 当前排队位置（从 1 开始的近似值）
+        :raises ValueError: 该任务已在运行或排队（应先用 is_duplicate 检查）
+        """
+        key = str(cmd["task_id"])
+        if key in self._running or key in self._entries:
+            raise ValueError(f"任务已在运行或排队: {key}")
+        self._entries[key] = (cmd, message)
+        heapq.heappush(self._heap, (-int(cmd.get("priority", 0)), next(self._seq), key))
+        return self.queued
+
+    def pop(self) -> Optional[Tuple[dict, object]]:
+        """取出优先级最高的等待命令并占用一个名额；无可运行命令时返回 None"""
+        while self._heap:
+            _, _, key = heapq.heappop(self._heap)
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._running.add(key)
+                return entry
+        return None
+
+    def remove(self, task_id) -> Optional[Tuple[dict, object]]:
+        """从等待队列移除某任务（stop），堆中残留项在 pop 时跳过"""
+        return self._entries.pop(str(task_id), None)
+
+    def stats(self) -> dict:
+        """返回准入统计快照"""
+        return {"running": self.running, "queued": self.queued, "maxRunning": self.max_running,
+                "duplicates": self.duplicates}
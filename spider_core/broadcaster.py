@@ -1,13 +1,66 @@
+import asyncio
 import json, time
 from datetime import datetime
+from typing import Dict
 import aio_pika
+from . import codecs, compression
+from .configs import DELIVERY_POLICY_CONFIG, EXCHANGE_CONFIG, QUEUE_CONFIG, RESULT_BATCH_CONFIG, TOPIC_EXCHANGE_CONFIG
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+TERMINAL_STATUSES = ("done", "stopped", "error")
+
+
+def routing_key(task_id, message_type: str = "*") -> str:
+    """
+    Topic 交换机的 routing key：task.<taskId>.<messageType>
+    message_type 缺省为 "*"，得到绑定某个任务全部消息的 binding key
+    """
+    return f"task.{str(task_id).replace('.', '_')}.{message_type}"
+
+# 每条发布路径使用的编码：Topic / Fanout 最终送达所有队列，Headers 交换机只送达 result_mode=single 的队列
+EXCHANGE_CODECS = {
+    TOPIC_EXCHANGE_CONFIG["name"]: codecs.common_codec(QUEUE_CONFIG.values()),
+    EXCHANGE_CONFIG["name"]: codecs.common_codec(QUEUE_CONFIG.values()),
+    RESULT_BATCH_CONFIG["split_exchange"]: codecs.common_codec(
+        c for c in QUEUE_CONFIG.values() if c.get("result_mode") == "single"
+    ),
+}
+
+
+def _accepts_compression(queue_configs) -> bool:
+    """路径送达的所有队列都声明 compression=True 时才压缩（未声明视为不支持，如 SpringBoot 消费者）"""
+    return all(conf.get("compression", False) for conf in queue_configs)
+
+
+# 每条发布路径是否压缩，按 (交换机名, 消息类型是否在 split_message_types 中) 区分：
+# Topic / Fanout 上 split_message_types 中的消息还会经 Headers 交换机送达 single 队列，其余类型（resultBatch）
+# 只送达 batch 队列（当前没有 batch 业务队列，resultBatch 只到 SSE 分发中心与结果入库）；
+# SSE 分发中心与结果入库直接绑定 Topic 交换机，总能解压，不参与判断。
+# Headers 交换机只送达 single 队列，不压缩；未登记的交换机也不压缩
+_SPLIT_TYPES = frozenset(RESULT_BATCH_CONFIG["split_message_types"])
+_BATCH_QUEUES = [c for c in QUEUE_CONFIG.values() if c.get("result_mode") != "single"]
+EXCHANGE_COMPRESSION = {
+    (TOPIC_EXCHANGE_CONFIG["name"], True): _accepts_compression(QUEUE_CONFIG.values()),
+    (TOPIC_EXCHANGE_CONFIG["name"], False): _accepts_compression(_BATCH_QUEUES),
+    (EXCHANGE_CONFIG["name"], True): _accepts_compression(QUEUE_CONFIG.values()),
+    (EXCHANGE_CONFIG["name"], False): _accepts_compression(_BATCH_QUEUES),
+}
+
 
 class Broadcaster:
+    # 进度合并：task_id -> 上次发布时间 / 待发布的最新进度 (exchange, data) / 延迟发布任务
+    _progress_sent: Dict[str, float] = {}
+    _progress_pending: Dict[str, tuple] = {}
+    _progress_timers: Dict[str, asyncio.Task] = {}
+    _progress_coalesced = 0
+
     @classmethod
     def _envelope(cls, message_type: str, task_id: int, payload: dict) -> dict:
         return {
             "version": "1.0",
-            "messageType": message_type,   # status | progress | result
+            "messageType": message_type,   # status | progress | result | resultBatch
             "taskId": task_id,
             "timestamp": int(time.time()),
             "dateTime": datetime.now().isoformat(),
@@ -15,36 +68,135 @@ class Broadcaster:
         }
 
     @classmethod
-    async def _broadcast_data(cls, exchange, data: dict):
-        message = aio_pika.Message(
-            body=json.dumps(data, ensure_ascii=False).encode("utf-8"),
-            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-            content_type="application/json",
-            headers={
-                "messageType": data.get("messageType", "unknown"),
-                "taskId": str(data.get("taskId", "")),
-                "timestamp": str(data.get("timestamp", 0)),
-            }
+    def _codec_for(cls, exchange) -> codecs.Codec:
+        """按交换机名选择编码，未登记的交换机用 json"""
+        return EXCHANGE_CODECS.get(getattr(exchange, "name", None), codecs.JSON)
+
+    @classmethod
+    def _compress_for(cls, exchange, message_type: str) -> bool:
+        """该消息类型经此交换机送达的队列是否都能解压"""
+        key = (getattr(exchange, "name", None), message_type in _SPLIT_TYPES)
+        return EXCHANGE_COMPRESSION.get(key, False)
+
+    @classmethod
+    def _policy(cls, message_type: str) -> dict:
+        return DELIVERY_POLICY_CONFIG.get(message_type) or DELIVERY_POLICY_CONFIG["default"]
+
+    @classmethod
+    def _build_message(cls, data: dict, codec: codecs.Codec = codecs.JSON,
+                       compress: bool = False) -> aio_pika.Message:
+        """
+        :param compress: 是否允许压缩（仅当发布路径上所有消费者都能解压时传 True）
+        """
+        # messageType / taskId 同时放在 AMQP 头里，消费端无需解码消息体即可过滤
+        policy = cls._policy(data.get("messageType"))
+        headers = {
+            "messageType": data.get("messageType", "unknown"),
+            "taskId": str(data.get("taskId", "")),
+            "timestamp": str(data.get("timestamp", 0)),
+        }
+        body, content_encoding = codec.encode(data), None
+        if compress:
+            body, content_encoding, dict_version = compression.compress(body)
+            if dict_version:
+                headers[compression.DICT_HEADER] = dict_version
+        return aio_pika.Message(
+            body=body,
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT if policy["persistent"]
+            else aio_pika.DeliveryMode.NOT_PERSISTENT,
+            expiration=policy["ttl_ms"] / 1000 if policy.get("ttl_ms") else None,
+            content_type=codec.content_type,
+            content_encoding=content_encoding,
+            headers=headers,
         )
-        # Fanout 忽略 routing_key，但参数必须给
-        await exchange.publish(message, routing_key="")
+
+    @classmethod
+    async def _broadcast_data(cls, exchange, data: dict):
+        message = cls._build_message(data, cls._codec_for(exchange),
+                                     cls._compress_for(exchange, data.get("messageType")))
+        # Topic 交换机按任务与消息类型路由；Fanout / Headers 交换机忽略 routing_key
+        await exchange.publish(message, routing_key=routing_key(data.get("taskId", ""), data.get("messageType", "unknown")))
+
+    @classmethod
+    async def _broadcast_many(cls, exchange, items: list[dict]):
+        """流水线发布：一次性发出所有消息，再统一等待 publisher confirm"""
+        await asyncio.gather(*(cls._broadcast_data(exchange, data) for data in items))
 
     # --- 三种标准广播 ---
 
     @classmethod
-    async def broadcast_status(cls, exchange, task_id: int, status: str, error: str | None = None):
-        payload = {"status": status, "error": error}
+    async def broadcast_status(cls, exchange, task_id: int, status: str, error: str | None = None, **extra):
+        """
+        status: queued | started | done | stopped | error；extra 并入 payload（如排队位置）
+        发布前先发出该任务被合并暂存的最新进度，保证消费端看到的进度不晚于状态
+        """
+        key = str(task_id)
+        timer = cls._progress_timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        await cls._flush_progress(key)
+        if status in TERMINAL_STATUSES:
+            cls._progress_sent.pop(key, None)
+
+        payload = {"status": status, "error": error, **extra}
         data = cls._envelope("status", task_id, payload)
         await cls._broadcast_data(exchange, data)
 
     @classmethod
-    async def broadcast_progress(cls, exchange, task_id: int, current: int, total: int):
-        payload = {"currentPage": current, "totalPages": total}
+    async def broadcast_progress(cls, exchange, task_id: int, current: int, total: int, **extra):
+        """
+        extra 为附加的运行指标（如 queueDepth），并入 payload
+        同一任务在 coalesce_ms 内只发布一次，期间的更新只保留最新一条，到期后由后台任务发出
+        """
+        payload = {"currentPage": current, "totalPages": total, **extra}
         data = cls._envelope("progress", task_id, payload)
+        interval = cls._policy("progress").get("coalesce_ms", 0) / 1000
+        if interval <= 0:
+            await cls._broadcast_data(exchange, data)
+            return
+
+        key = str(task_id)
+        now = time.monotonic()
+        wait = cls._progress_sent.get(key, now - interval) + interval - now
+        if wait <= 0 and key not in cls._progress_pending:
+            cls._progress_sent[key] = now
+            await cls._broadcast_data(exchange, data)
+            return
+        if key in cls._progress_pending:
+            cls._progress_coalesced += 1
+        cls._progress_pending[key] = (exchange, data)
+        if key not in cls._progress_timers:
+            cls._progress_timers[key] = asyncio.create_task(cls._flush_progress_later(key, max(wait, 0)))
+
+    @classmethod
+    async def _flush_progress_later(cls, key: str, delay: float):
+        await asyncio.sleep(delay)
+        cls._progress_timers.pop(key, None)
+        try:
+            await cls._flush_progress(key)
+        except Exception as e:
+            logger.error("❌ 发布合并进度失败: %s", e, extra={"task_id": key})
+
+    @classmethod
+    async def _flush_progress(cls, key: str):
+        """立即发出该任务暂存的最新进度（没有则什么也不做）"""
+        pending = cls._progress_pending.pop(key, None)
+        if pending is None:
+            return
+        exchange, data = pending
+        cls._progress_sent[key] = time.monotonic()
         await cls._broadcast_data(exchange, data)
 
     @classmethod
-    async def broadcast_result(cls, exchange, task_id: int, data: dict):
+    def stats(cls) -> dict:
+        """返回进度合并统计快照"""
+        return {
+            "pendingProgress": len(cls._progress_pending),
+            "coalescedProgress": cls._progress_coalesced,
+        }
+
+    @classmethod
+    def _result_payload(cls, task_id: int, data: dict) -> dict:
         """
         data 期望包含: keywords(list[str]) / url / title / source / (可选)dateTime
         兼容 keywords 为字符串的历史数据，自动转为数组。
@@ -62,7 +214,7 @@ class Broadcaster:
             except Exception:
                 kw = [s.strip() for s in kw.strip("[]").split(",") if s.strip()]
 
-        payload = {
+        return {
             "taskId": task_id,
             "keywords": kw,
             "url": data.get("url", ""),
@@ -70,9 +222,41 @@ class Broadcaster:
             "source": data.get("source", ""),
             "dateTime": data.get("dateTime") or datetime.now().isoformat(),
         }
-        env = cls._envelope("result", task_id, payload)
+
+    @classmethod
+    async def broadcast_result(cls, exchange, task_id: int, data: dict):
+        """广播单条结果，data 格式见 _result_payload"""
+        env = cls._envelope("result", task_id, cls._result_payload(task_id, data))
         await cls._broadcast_data(exchange, env)
 
+    @classmethod
+    async def broadcast_results(cls, exchange, task_id: int, items: list[dict], split_exchange=None):
+        """
+        批量广播一页结果
+        - mode=batch: 每 max_batch_size 条合成一个 resultBatch 信封发到 exchange；
+          若配置了逐条消费的队列，再把单条 result 流水线发布到 split_exchange
+        - mode=pipelined: 逐条 result 信封流水线发布到 exchange，统一等待确认
+        :param split_exchange: 逐条结果队列所绑定的 Headers 交换机，None 表示无此类队列
+        """
+        if not items:
+            return
+        payloads = [cls._result_payload(task_id, data) for data in items]
+
+        if RESULT_BATCH_CONFIG["mode"] == "pipelined":
+            await cls._broadcast_many(exchange, [cls._envelope("result", task_id, p) for p in payloads])
+            return
+
+        size = RESULT_BATCH_CONFIG["max_batch_size"]
+        batches = [
+            cls._envelope("resultBatch", task_id, {"count": len(chunk), "results": chunk})
+            for chunk in (payloads[i:i + size] for i in range(0, len(payloads), size))
+        ]
+        publishes = [cls._broadcast_many(exchange, batches)]
+        if split_exchange is not None:
+            singles = [cls._envelope("result", task_id, p) for p in payloads]
+            publishes.append(cls._broadcast_many(split_exchange, singles))
+        await asyncio.gather(*publishes)
+
     @staticmethod
     async def broadcast_error(exchange, task_id: str, error_data: dict):
         """广播错误信息"""
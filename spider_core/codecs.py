@@ -0,0 +1,118 @@
+"""
+消息编解码
+- json：安装了 orjson 时用 orjson（直接输出 UTF-8 字节），否则回退标准库；输出都是标准 JSON，互相可解
+- msgpack：紧凑二进制格式（可选依赖）
+编码方式通过 AMQP content_type 声明，消费端按 content_type 选择解码器，缺省按 JSON 处理。
+"""
+import json
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Optional
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖
+    msgpack = None
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+class Codec(ABC):
+    """编解码器：name 用于配置，content_type 写入 AMQP 消息属性"""
+
+    name = ""
+    content_type = ""
+
+    @abstractmethod
+    def encode(self, obj) -> bytes:
+        """对象编码为消息体字节"""
+
+    @abstractmethod
+    def decode(self, body: bytes):
+        """消息体字节解码为对象"""
+
+
+class StdJsonCodec(Codec):
+    name = "json"
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    def decode(self, body: bytes):
+        return json.loads(body)
+
+
+class OrjsonCodec(Codec):
+    name = "json"
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, obj) -> bytes:
+        return orjson.dumps(obj)
+
+    def decode(self, body: bytes):
+        return orjson.loads(body)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def encode(self, obj) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def decode(self, body: bytes):
+        return msgpack.unpackb(body, raw=False)
+
+
+JSON: Codec = OrjsonCodec() if orjson is not None else StdJsonCodec()
+
+CODECS: Dict[str, Codec] = {"json": JSON}
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec()
+
+# content_type -> 解码器（兼容常见别名）
+_DECODERS: Dict[str, Codec] = {JSON_CONTENT_TYPE: JSON, "text/json": JSON}
+if msgpack is not None:
+    _DECODERS[MSGPACK_CONTENT_TYPE] = CODECS["msgpack"]
+    _DECODERS["application/x-msgpack"] = CODECS["msgpack"]
+
+
+def get_codec(name: Optional[str]) -> Codec:
+    """按名称获取编码器；未知或依赖未安装时回退 json"""
+    return CODECS.get(name or "json", JSON)
+
+
+def common_codec(queue_configs: Iterable[dict]) -> Codec:
+    """
+    一条发布路径上所有队列声明的 codec 一致时使用它，否则回退 json
+    （Fanout/Headers 交换机把同一份字节投递给每个队列，无法按队列分别编码）
+    """
+    names = {conf.get("codec", "json") for conf in queue_configs}
+    return get_codec(names.pop()) if len(names) == 1 else JSON
+
+
+def decode(body: bytes, content_type: Optional[str] = None):
+    """按 content_type 解码消息体，缺省或未知类型按 JSON 处理"""
+    codec = _DECODERS.get((content_type or JSON_CONTENT_TYPE).split(";")[0].strip().lower(), JSON)
+    return codec.decode(body)
+
+
+def json_text(obj) -> str:
+    """序列化为 JSON 文本（SSE 等文本通道使用，不转义非 ASCII 字符）"""
+    return JSON.encode(obj).decode("utf-8")
+
+
+def header_str(headers: Optional[dict], key: str) -> Optional[str]:
+    """读取 AMQP 头为字符串（部分客户端把字符串头解析为 bytes）"""
+    if not headers:
+        return None
+    value = headers.get(key)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="ignore")
+    return None if value is None else str(value)
@@ -0,0 +1,117 @@
+"""
+消息体压缩
+- 编码后超过阈值的消息压缩后发布，算法写入 AMQP content_encoding（zstd / gzip）
+- zstd 使用内置的原始内容字典：信封里重复的键名与固定片段，小消息也能有不错的压缩率；
+  字典版本写在 compressionDict 头里，消费端按版本选择字典
+- 未安装 zstandard 时回退 gzip
+"""
+import gzip
+from typing import Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+from .configs import COMPRESSION_CONFIG
+
+DICT_HEADER = "compressionDict"
+
+# 字典内容只能追加新版本，不能修改已发布的版本：历史消息仍需要用旧字典解压
+_DICTIONARIES = {
+    "envelope-v1": (
+        '{"version":"1.0","messageType":"status","taskId":,"timestamp":,"dateTime":"",'
+        '"payload":{"status":"done","error":null}}'
+        '{"version":"1.0","messageType":"progress","taskId":,"timestamp":,"dateTime":"",'
+        '"payload":{"currentPage":,"totalPages":,"queueDepth":,"cacheHits":,"suppressed":,"failedPages":}}'
+        '{"taskId":,"keywords":[],"url":"https://","title":"","source":"","dateTime":""},'
+        '{"version":"1.0","messageType":"resultBatch","taskId":,"timestamp":,"dateTime":"",'
+        '"payload":{"count":,"results":[{"taskId":,"keywords":[],"url":"https://www.","title":"","source":"www.",'
+        '"dateTime":""},'
+    ).encode("utf-8"),
+}
+CURRENT_DICT = "envelope-v1"
+
+_zstd_dicts = {}
+_compressor = None
+_compressor_dict: Optional[str] = None
+_decompressors = {}
+_stats = {"compressed": 0, "skipped": 0, "rawBytes": 0, "compressedBytes": 0}
+
+
+def _zstd_dict(version: str):
+    zdict = _zstd_dicts.get(version)
+    if zdict is None:
+        zdict = _zstd_dicts[version] = zstandard.ZstdCompressionDict(
+            _DICTIONARIES[version], dict_type=zstandard.DICT_TYPE_RAWCONTENT
+        )
+    return zdict
+
+
+def algorithm() -> str:
+    """实际使用的压缩算法（zstd 不可用时回退 gzip）"""
+    if COMPRESSION_CONFIG["algorithm"] == "zstd" and zstandard is not None:
+        return "zstd"
+    return "gzip"
+
+
+def compress(body: bytes) -> Tuple[bytes, Optional[str], Optional[str]]:
+    """
+    超过阈值时压缩消息体
+    :return: (消息体, content_encoding, 字典版本)；未压缩时后两项为 None
+    """
+    global _compressor, _compressor_dict
+    if not COMPRESSION_CONFIG["enabled"] or len(body) < COMPRESSION_CONFIG["min_size"]:
+        _stats["skipped"] += 1
+        return body, None, None
+
+    dict_version = None
+    if algorithm() == "zstd":
+        if _compressor is None:
+            _compressor_dict = CURRENT_DICT if COMPRESSION_CONFIG.get("zstd_dictionary", True) else None
+            _compressor = zstandard.ZstdCompressor(
+                level=COMPRESSION_CONFIG["level"],
+                dict_data=_zstd_dict(_compressor_dict) if _compressor_dict else None,
+            )
+        packed, encoding, dict_version = _compressor.compress(body), "zstd", _compressor_dict
+    else:
+        packed, encoding = gzip.compress(body, compresslevel=min(COMPRESSION_CONFIG["level"], 9)), "gzip"
+
+    if len(packed) >= len(body):
+        # 压不动的内容（如已压缩的数据）原样发布
+        _stats["skipped"] += 1
+        return body, None, None
+    _stats["compressed"] += 1
+    _stats["rawBytes"] += len(body)
+    _stats["compressedBytes"] += len(packed)
+    return packed, encoding, dict_version
+
+
+def decompress(body: bytes, content_encoding: Optional[str], headers: Optional[dict] = None) -> bytes:
+    """按 content_encoding（及 compressionDict 头）解压，未压缩的消息原样返回"""
+    if not content_encoding or content_encoding == "identity":
+        return body
+    if content_encoding == "gzip":
+        return gzip.decompress(body)
+    if content_encoding == "zstd":
+        if zstandard is None:
+            raise ValueError("收到 zstd 压缩消息，但未安装 zstandard")
+        version = (headers or {}).get(DICT_HEADER)
+        if isinstance(version, bytes):
+            version = version.decode("utf-8")
+        decompressor = _decompressors.get(version)
+        if decompressor is None:
+            decompressor = _decompressors[version] = zstandard.ZstdDecompressor(
+                dict_data=_zstd_dict(version) if version else None
+            )
+        return decompressor.decompress(body)
+    raise ValueError(f"不支持的 content_encoding: {content_encoding}")
+
+
+def stats() -> dict:
+    """返回压缩统计快照"""
+    raw = _stats["rawBytes"]
+    return {
+        **_stats,
+        "ratio": round(_stats["compressedBytes"] / raw, 3) if raw else 0,
+    }
@@ -20,20 +20,255 @@ EXCHANGE_CONFIG = {
     "type": aio_pika.ExchangeType.FANOUT,  # Fanout 类型：广播模式
     "durable": True  # 持久化
 }
+# 按任务路由的 Topic 交换机：Broadcaster 以 task.<taskId>.<messageType> 为 routing key 发布到这里，
+# Fanout 交换机以 "#" 绑定在其后，原有队列照常收到全部消息；
+# 只关心某个任务（task.42.*）或某类消息（task.*.status）的消费者可直接绑定临时队列
+# taskId 中的 "." 会替换为 "_"，避免拆成多个单词
+TOPIC_EXCHANGE_CONFIG = {
+    "name": "crawler.topic.exchange",
+    "type": aio_pika.ExchangeType.TOPIC,
+    "durable": True,
+}
+# result_mode: batch 接收 resultBatch 批量信封；single 仍逐条接收 result（经 RESULT_BATCH_CONFIG 的 Headers 交换机）
+# codec: 消息体编码 json | msgpack，通过 content_type 告知消费端
+#        同一交换机投递到的队列收到的是同一份字节：Fanout 路径上所有队列（Headers 路径上所有 single 队列）
+#        的 codec 一致时才生效，否则该路径回退 json
+# compression: 消费端能否解压 content_encoding=zstd/gzip 的消息（见 COMPRESSION_CONFIG），缺省 False；
+#              某条发布路径送达的队列全部为 True 时该路径才压缩，SpringBoot 队列收到的始终是未压缩消息
 QUEUE_CONFIG = {
     "springBootData": {
         "name": "crawler.data.springBoot",  # SpringBoot 队列名
         "durable": True,  # 持久化队列
-        "auto_delete": False  # 不自动删除
-    },
-    "front": {
-        "name": "crawler.data.front",  # 前端队列名
-        "durable": True,
-        "auto_delete": False
+        "auto_delete": False,  # 不自动删除
+        "result_mode": "single",
+        "codec": "json",
+        "compression": False,
     },
     "springBootStatus": {
         "name": "crawler.status.springBoot",  # SpringBoot 队列名
         "durable": True,  # 持久化队列
-        "auto_delete": False  # 不自动删除
+        "auto_delete": False,  # 不自动删除
+        "result_mode": "single",
+        "codec": "json",
+        "compression": False,
+    },
+}
+# 已退役的业务队列：不再声明；crawler 启动时解除它们与 Fanout 交换机的绑定，不再有消息无人消费地堆积在 broker 上
+# crawler.data.front 原由 SSE 视图消费，现由 sse_hub 的进程独占队列取代；队列本身（及已堆积的消息）确认无人使用后手动删除
+RETIRED_QUEUES = ["crawler.data.front"]
+
+# Django 进程内的 SSE 分发中心：每个进程一个 AMQP 消费者（独占临时队列，按订阅的任务绑定 Topic 交换机），
+# 按 taskId 头分发给该任务的 SSE 订阅者
+# subscriber_queue_size: 每个订阅者的缓冲条数；满了先丢进度，结果/状态仍放不下时断开该订阅者（客户端重连）
+# prefetch: 消费者预取条数
+# replay_size / replay_max_age: 每个被订阅过的任务保留最近多少条事件、保留多少秒，供 Last-Event-ID 断线续传；
+#                              任务没有订阅者且 replay_max_age 秒内无新事件时释放
+SSE_HUB_CONFIG = {
+    "subscriber_queue_size": 1000,
+    "prefetch": 1000,
+    "replay_size": 500,
+    "replay_max_age": 300,
+}
+
+# 按消息类型的投递策略
+# persistent: 持久化投递（Broker 落盘）；ttl_ms: 消息在队列中的存活时间，None 表示不过期
+# coalesce_ms: 同一任务的进度在该间隔内最多发布一次，始终保留最新一条，并在发布任何状态消息前先发出
+DELIVERY_POLICY_CONFIG = {
+    "default": {"persistent": True, "ttl_ms": None},
+    "status": {"persistent": True, "ttl_ms": None},
+    "result": {"persistent": True, "ttl_ms": None},
+    "resultBatch": {"persistent": True, "ttl_ms": None},
+    "progress": {"persistent": False, "ttl_ms": 10000, "coalesce_ms": 500},
+}
+
+# 结果发布方式
+# mode: batch 每页结果合成 resultBatch 信封发布；pipelined 逐条发布但并发等待 publisher confirm
+# split_exchange: result_mode=single 的队列绑定到此 Headers 交换机（由 Fanout 交换机转发），
+#                 只接收 split_message_types 中的消息类型，不会收到 resultBatch
+RESULT_BATCH_CONFIG = {
+    "mode": "batch",
+    "max_batch_size": 50,
+    "split_exchange": "crawler.split.exchange",
+    "split_message_types": ["status", "progress", "result", "message"],
+}
+# 消息体压缩：编码后超过 min_size 字节的消息压缩后再发布，通过 content_encoding 声明
+# 只作用于所有消费者都声明 compression 的发布路径（实际上是 resultBatch 所走的 batch 队列 / SSE / 入库路径），
+# 逐条 result、状态与进度会送达 SpringBoot 队列，不压缩
+# algorithm: zstd | gzip（未安装 zstandard 时回退 gzip）
+# zstd_dictionary: 使用内置的信封键字典（消费端须使用同一版本字典，版本号写在 compressionDict 头里）
+COMPRESSION_CONFIG = {
+    "enabled": True,
+    "algorithm": "zstd",
+    "min_size": 1024,
+    "level": 3,
+    "zstd_dictionary": True,
+}
+# 进程级限速：同一搜索引擎（及出口代理）的所有任务共享一个令牌桶
+# rate: 每秒请求数；burst: 允许的突发请求数
+RATE_LIMIT_CONFIG = {
+    "default": {"rate": 2.0, "burst": 2},
+    "bing": {"rate": 3.0, "burst": 3},
+    "baidu": {"rate": 2.0, "burst": 2},
+}
+
+# 按引擎的 AIMD 自适应调节：scale ∈ [min_scale, 1]，任务实际并发 = ceil(concurrency·scale)、实际速率 = 配置速率·scale
+# 每 window 个样本评估一次：p95 延迟 ≤ target_p95 秒且成功率 ≥ min_success_rate 时 scale += increase，否则 scale *= decrease；
+# throttle_statuses、超时与验证码页立即 scale *= decrease（cooldown 秒内只减一次）
+ADAPTIVE_CONFIG = {
+    "enabled": True,
+    "initial_scale": 0.5,
+    "min_scale": 0.1,
+    "increase": 0.1,
+    "decrease": 0.5,
+    "window": 20,
+    "target_p95": 3.0,
+    "min_success_rate": 0.9,
+    "cooldown": 5.0,
+    "throttle_statuses": [429, 503],
+}
+
+# 按引擎的失败重试策略：失败页进入延迟重试堆，等待期间不占用 worker 与请求名额
+# retry_on: 可重试的状态码及 "timeout" / "error"（连接错误）/ "captcha"；max_attempts 含首次请求
+# 第 n 次重试等待 min(max_delay, base_delay·2^(n-1)) 秒，再乘以 [1-jitter, 1] 内的随机系数
+RETRY_CONFIG = {
+    "default": {"retry_on": [429, 500, 502, 503, 504, "timeout", "error"], "max_attempts": 3,
+                "base_delay": 1.0, "max_delay": 30.0, "jitter": 0.5},
+    "bing": {"retry_on": [429, 500, 502, 503, 504, "timeout", "error", "captcha"], "max_attempts": 3,
+             "base_delay": 2.0, "max_delay": 30.0, "jitter": 0.5},
+    "baidu": {"retry_on": [429, 500, 502, 503, 504, "timeout", "error", "captcha"], "max_attempts": 3,
+              "base_delay": 2.0, "max_delay": 30.0, "jitter": 0.5},
+}
+
+# 指标导出：worker 进程在 host:port 上提供 GET /metrics（Prometheus 文本格式），Django 端为 /api/metrics
+METRICS_CONFIG = {
+    "enabled": True,
+    "host": "0.0.0.0",
+    "port": 9108,
+}
+
+# 日志：队列 + 后台线程输出，level 为 spider_core 的默认级别，levels 可单独设置子模块
+# sample_rates: 按 event 采样（0.1 表示保留 1/10），WARNING 及以上不采样；链接明细只在 DEBUG 级别输出
+LOG_CONFIG = {
+    "level": "INFO",
+    "levels": {},
+    "format": "%(asctime)s - %(levelname)s - %(message)s",
+    "queue_size": 10000,
+    "sample_rates": {
+        "page.parsed": 0.1,
+        "page.http_status": 0.2,
+        "retry.scheduled": 0.2,
     },
-}
\ No newline at end of file
+}
+
+# 共享 HTTP 连接池：所有任务复用，limit 为全局连接上限，limit_per_host 为单主机上限
+HTTP_POOL_CONFIG = {
+    "limit": 100,
+    "limit_per_host": 20,
+    "keepalive_timeout": 60,
+    "ttl_dns_cache": 300,
+    "timeout": {
+        "total": 30,  # 总超时
+        "connect": 10,  # 连接超时
+        "sock_read": 20  # 读取超时
+    },
+}
+
+# SERP 解析：backend 为 lxml / selectolax / bs4（参考实现，未安装依赖时自动回退）
+# kind 为 process（默认）或 thread；max_workers 为空时取 CPU 核数
+# max_pending: 同时排队的解析任务上限；inline_threshold: 小于该字节数的页面直接内联解析
+PARSER_CONFIG = {
+    "backend": "lxml",
+    "kind": "process",
+    "max_workers": None,
+    "max_pending": None,
+    "inline_threshold": 16 * 1024,
+    # 流式解析：边下载边解析，每条结果闭合即发布（降低首条结果延迟、限制单页内存）
+    # 仅对提供增量解析器的引擎生效；流式页不经过 SERP 缓存，解析在事件循环内按块进行
+    "streaming": False,
+    "stream_chunk_size": 16 * 1024,
+}
+
+# SERP 响应缓存：按 (引擎, 规范化 URL) 缓存成功页面，并合并并发的相同请求
+# ttl: 秒；max_entries / max_bytes: 内存层上限（LRU 淘汰）；disk_dir 为空则不启用磁盘层
+CACHE_CONFIG = {
+    "enabled": True,
+    "ttl": 600,
+    "max_entries": 2000,
+    "max_bytes": 256 * 1024 * 1024,
+    "disk_dir": None,
+    "disk_max_entries": 20000,
+}
+
+# 发布前 URL 去重（布隆过滤器）
+# task: 每个任务一个过滤器，容量 = 页数 × results_per_page，限制在 [min_capacity, max_capacity]
+# global: 跨任务滚动窗口过滤器，window 秒一代，保留 generations 代；
+#         2000 万容量 / 1% 误判率约 24MB 每代
+DEDUP_CONFIG = {
+    "enabled": True,
+    "task": {
+        "fpr": 0.001,
+        "results_per_page": 10,
+        "min_capacity": 1000,
+        "max_capacity": 1_000_000,
+    },
+    "global": {
+        "enabled": False,
+        "capacity": 20_000_000,
+        "fpr": 0.01,
+        "window": 24 * 3600,
+        "generations": 2,
+    },
+}
+
+# 分布式页任务：start 命令由收到它的进程（协调者）拆成页任务投递到 page_queue，
+# 所有 run.py 进程共同消费；用户的 stop 命令经命令交换机的 cmd.stop 绑定直接送达每个 worker 的控制队列
+# control_exchange: 协调者在任务出错或回执超时时经此 Fanout 交换机广播 stop，各 worker 跳过该任务的剩余页
+# 任务的 concurrency / rateLimitPerSec 由协调者对整个集群生效：在途页数不超过 concurrency，
+# 页任务（含 worker 交还的重试）按 rateLimitPerSec 投递；各 worker 的结果转交协调者按任务统一去重后发布
+# page_prefetch: 每个进程同时持有的页任务数
+# report_timeout: 任务的页开始被 worker 取走后，仍有页在途而协调者超过该秒数未收到任何页回执则判定任务失败，
+#                 并广播 stop 让各 worker 跳过剩余页；页在共享页队列中排队的时间不计入
+# idle_timeout: worker 上空闲页任务执行态的回收时间；stopped_memory: 记住的已停止任务数
+DISTRIBUTED_CONFIG = {
+    "enabled": True,
+    "page_queue": "crawler.page.queue",
+    "control_exchange": "crawler.control.exchange",
+    "page_prefetch": 20,
+    "report_timeout": 300,
+    "idle_timeout": 30,
+    "stopped_memory": 10000,
+}
+
+# 任务准入控制：每个 worker 同时运行的任务上限，超出的 start 命令在本地按 priority 排队
+# 排队命令保持未确认，命令通道 prefetch = max_running_jobs + max_queued_jobs，再多的留在 broker
+ADMISSION_CONFIG = {
+    "max_running_jobs": 4,
+    "max_queued_jobs": 50,
+}
+
+# 批量提交接口（POST api/crawl/start/bulk）：请求体为 JSON 数组或 NDJSON（每行一个任务）
+# max_tasks: 单次请求最多处理的任务数，超出部分不处理并在响应中标记 truncated
+# publish_window: 流水线发布窗口，每个窗口统一等待 publisher confirm，内存占用与窗口大小成正比
+# 两种格式都从请求体流增量读取，不会把整个请求体读入内存；read_chunk_size 为 JSON 数组每次读取的字节数
+# max_body_bytes: 请求体上限，超出时返回 413（已发布的窗口不回滚）
+BULK_SUBMIT_CONFIG = {
+    "max_tasks": 10000,
+    "publish_window": 500,
+    "read_chunk_size": 64 * 1024,
+    "max_body_bytes": 64 * 1024 * 1024,
+}
+
+# 结果入库（python manage.py persist_results）：持久队列绑定到 Topic 交换机的结果消息，按批写入 CrawledResult
+# batch_size / flush_interval: 攒够多少行或距批次第一行多少秒即写入；写入提交后才 ack（multiple）
+# prefetch: 未确认消息上限（resultBatch 一条最多 RESULT_BATCH_CONFIG.max_batch_size 行），须能攒满一个批次
+# retry_delay: 写库失败后消息重新入队，暂停多少秒；report_interval: 输出吞吐 / 批次延迟 / 积压的间隔
+PERSIST_CONFIG = {
+    "queue": "crawler.data.persist",
+    "routing_keys": ["task.*.result", "task.*.resultBatch"],
+    "batch_size": 1000,
+    "flush_interval": 1.0,
+    "prefetch": 2000,
+    "retry_delay": 5,
+    "report_interval": 10,
+    "metrics_port": 9109,
+}
@@ -1,78 +1,143 @@
 import asyncio
-import json
+import codecs
 import time
 import re
 import os
-from typing import Dict, List
-from urllib.parse import quote
+from contextlib import asynccontextmanager
+from typing import Dict, List, Tuple
 from datetime import datetime
-from .configs import AMQP_URL,DEFAULT_HEADERS, EXCHANGE_CONFIG, QUEUE_CONFIG
+from .configs import AMQP_URL,DEFAULT_HEADERS, EXCHANGE_CONFIG, QUEUE_CONFIG, RATE_LIMIT_CONFIG, HTTP_POOL_CONFIG, PARSER_CONFIG, RESULT_BATCH_CONFIG, \
+    TOPIC_EXCHANGE_CONFIG, CACHE_CONFIG, DEDUP_CONFIG, DISTRIBUTED_CONFIG, ADMISSION_CONFIG, ADAPTIVE_CONFIG, RETRY_CONFIG, METRICS_CONFIG, \
+    LOG_CONFIG, RETIRED_QUEUES
 import aiohttp
 import aio_pika
-from bs4 import BeautifulSoup
 from .broadcaster import Broadcaster
+from .codecs import JSON as JSON_CODEC, decode as decode_body
+from .engines import engine_stats, get_engine, parse_links, parse_serp  # parse_links 保留旧的导入路径
+from .rate_limiter import RateLimiterRegistry, TokenBucket
+from .http_pool import HttpClientPool
+from .parse_executor import ParseExecutor
+from .serp_cache import SerpCache
+from .dedup import UrlDeduplicator
+from .distributed import PageTracker, RecentSet
+from .admission import AdmissionController
+from .adaptive import AdaptiveRegistry, AimdController, CAPTCHA, ERROR, OK, TIMEOUT
+from .retry import FetchError, RetryScheduler
+from . import metrics
+from . import log
+from . import compression
 import random
+import socket
 os.environ["PYDEVD_USE_FRAME_EVAL"] = "NO"
+logger = log.get_logger(__name__)
 def build_search_url(keywords: List[str], page_no: int, engine: str = "bing") -> str:
-    """构建搜索引擎 URL"""
-    if not keywords:
+    """构建搜索引擎 URL（由引擎注册表中的插件生成，未知引擎返回空串）"""
+    search_engine = get_engine(engine)
+    if not keywords or search_engine is None:
         return ""
-    encoded_keywords = [quote(kw, safe='', encoding='utf-8') for kw in keywords]
-    query = '+'.join(encoded_keywords)
-
-    if engine == "baidu":
-        pn = (page_no - 1) * 10 if page_no > 1 else 0
-        return f"https://www.baidu.com/s?ie=utf-8&f=8&rsv_bp=1&rsv_idx=1&tn=baidu&wd={query}&pn={pn}"
-    elif engine == "bing":
-        first = (page_no - 1) * 10 + 1 if page_no > 1 else 1
-        return f"https://www.cn.bing.com/search?q={query}&first={first}"
-    return ""
-
-
-def parse_links(html_content: str, engine: str = "bing") -> List[Dict[str, str]]:
-    """从 HTML 中提取链接（同步解析，不做网络请求）"""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    results = []
-
-    if engine == "bing":
-        items = (
-                soup.find_all('li', class_='b_algo') or  # 标准结果
-                soup.find_all('div', class_='b_algo') or  # 备选
-                soup.select('.b_algo')  # CSS 选择器
-        )
-        for item in items:
-            try:
-                title_tag = item.find('h2')
-                if not title_tag:
-                    continue
-                link_tag = title_tag.find('a')
-                if not link_tag or not link_tag.get('href'):
-                    continue
-                source = item.find('cite')  # ⚠️ cite 标签通常包含真实域名
-
-                if title_tag and link_tag:
-                    href = link_tag.get('href', '')
-
-                    # 🔥 方法1：从 cite 标签获取真实链接
-                    real_url = source.get_text(strip=True) if source else href
-
-                    # 🔥 方法2：如果 href 包含真实 URL，尝试提取
-                    if 'bing.com/ck/' in href or not href.startswith('http'):
-                        # 尝试从其他属性获取
-                        real_url = link_tag.get('data-url') or link_tag.get('href')
-                    else:
-                        real_url = href
-
-                    results.append({
-                        'title': title_tag.get_text(strip=True),
-                        'href': real_url,
-                        'source': source.get_text(strip=True) if source else '未知来源',
-                        'engine': 'bing'
-                    })
-            except Exception as e:
-                print(f"解析失败: {e}")
-                continue
-    return results
+    return search_engine.build_url(keywords, page_no)
+
+
+def task_limits(cmd: dict) -> Tuple[int, float]:
+    """命令中的任务级上限：(并发页数, 每秒请求数)"""
+    return max(1, int(cmd.get("concurrency", 1))), cmd.get("rateLimitPerSec", 2)
+
+
+def _incremental_decoder(charset):
+    """按响应声明的字符集创建增量解码器；未声明或 Python 不认识的字符集按 UTF-8 解码，坏字节替换"""
+    try:
+        return codecs.getincrementaldecoder(charset or "utf-8")(errors="ignore")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+class CrawlJob:
+    """
+    单个爬取任务在本进程内的运行态
+    页码通过有界队列 pages 交给 worker，容量为 concurrency 的两倍；
+    队列元素为 (页码, 页任务消息, 第几次尝试, 入队时间)，本地任务的消息为 None，分布式页任务处理完后回执并 ack
+    实际在途请求数与速率由引擎的 AIMD 调节器按 scale 折算，命令中的 concurrency / rateLimitPerSec 为上限；
+    分布式任务的上限由协调者按任务统一控制（见 _dispatch_pages），各 worker 上的执行态只是其中一部分
+    """
+
+    def __init__(self, cmd: dict, stop_event: asyncio.Event, engine_bucket: TokenBucket,
+                 controller: AimdController):
+        self.task_id = cmd["task_id"]
+        self.keywords = cmd["keywords"]
+        self.total_pages = cmd["pageSize"]
+        self.concurrency, self.rate = task_limits(cmd)
+        self.engine = cmd.get("engine", "bing")
+        self.search_engine = get_engine(self.engine)
+        if self.search_engine is None:
+            raise ValueError(f"不支持的搜索引擎: {self.engine}")
+        self.proxy = cmd.get("proxy")
+        self.stop_event = stop_event
+        # 任务自身的速率上限 + 引擎级共享令牌桶，两者都满足才发请求
+        self.bucket = TokenBucket(self.rate, burst=1)
+        self.engine_bucket = engine_bucket
+        self.controller = controller
+        self._applied_scale = None
+        self.in_flight = 0  # 正在进行的网络请求数
+        self._slot_changed = asyncio.Condition()
+        self.pages: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        self.metric_labels = (self.engine,)
+        self.completed = 0
+        self.active = 0  # 正在处理的页数
+        self.retrying = 0  # 在重试堆中等待的页数
+        self.last_active = time.monotonic()
+        self.workers: List[asyncio.Task] = []
+        self.cache_hits = 0  # 由缓存（含合并请求）直接提供的页数
+        self.suppressed = 0  # 去重抑制的结果数
+        # 分布式页任务的协调者（回执与转交结果的去向），本地任务为 None
+        self.reply_to = None
+        self.correlation_id = None
+
+    def iter_pages(self):
+        """按需产出页码，不预先创建任何协程"""
+        return range(1, self.total_pages + 1)
+
+    @property
+    def effective_concurrency(self) -> int:
+        return self.controller.concurrency_for(self.concurrency)
+
+    async def rate_limit(self):
+        """依次通过任务级与引擎级令牌桶（速率随调节器 scale 变化）"""
+        scale = self.controller.scale
+        if scale != self._applied_scale:
+            self._applied_scale = scale
+            self.bucket.set_rate(self.rate * scale)
+            self.engine_bucket.set_rate(self.engine_bucket.base_rate * scale)
+        waited = await self.bucket.acquire() + await self.engine_bucket.acquire()
+        metrics.RATE_LIMIT_WAIT.observe(waited, self.metric_labels)
+
+    @asynccontextmanager
+    async def request_slot(self):
+        """占用一个请求名额（在途数不超过 effective_concurrency），再通过限速"""
+        async with self._slot_changed:
+            await self._slot_changed.wait_for(lambda: self.in_flight < self.effective_concurrency)
+            self.in_flight += 1
+        try:
+            await self.rate_limit()
+            yield
+        finally:
+            async with self._slot_changed:
+                self.in_flight -= 1
+                self._slot_changed.notify_all()
+
+    def limit_stats(self) -> dict:
+        """当前生效的并发与速率上限"""
+        return {
+            "concurrencyLimit": self.effective_concurrency,
+            "rateLimit": round(self.bucket.rate, 3),
+            "adaptiveScale": round(self.controller.scale, 3),
+        }
+
+    def progress_stats(self) -> dict:
+        """附加到进度信封中的调度器状态"""
+        return {"queueDepth": self.pages.qsize(), "cacheHits": self.cache_hits, "suppressed": self.suppressed,
+                **self.limit_stats()}
+
+
 class CrawlerService:
     """
     爬虫服务 - 支持多端消费（Fanout 广播）
@@ -82,8 +147,45 @@ class CrawlerService:
         self.stop_flags: Dict[str, asyncio.Event] = {}
         self.connection = None
         self.channel = None
-        self.exchange = None  # Fanout 交换机
+        self.exchange = None  # 发布用的 Topic 交换机（按任务路由）
+        self.fanout_exchange = None  # Fanout 交换机，绑定在 Topic 交换机之后，业务队列绑定于此
+        self.split_exchange = None  # 逐条结果 Headers 交换机
+        self.cmd_channel = None  # 命令消费通道，prefetch = 运行上限 + 本地排队上限
         self.cmd_queue = None
+        self.page_channel = None  # 页任务消费通道（独立 prefetch）
+        self.control_exchange = None  # 控制广播交换机，协调者在任务出错/超时时经它广播 stop
+        self.report_queue = None  # 本进程作为协调者时接收页回执的独占队列
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.trackers: Dict[str, PageTracker] = {}  # 本进程协调的任务
+        self.remote_jobs: Dict[str, CrawlJob] = {}  # 本进程正在处理其页任务的任务
+        self.stopped_tasks = RecentSet(DISTRIBUTED_CONFIG["stopped_memory"])
+        self.admission = AdmissionController(
+            ADMISSION_CONFIG["max_running_jobs"], ADMISSION_CONFIG["max_queued_jobs"]
+        )
+        self.rate_limiters = RateLimiterRegistry(RATE_LIMIT_CONFIG)  # 按引擎共享的限速器
+        self.adaptive = AdaptiveRegistry(ADAPTIVE_CONFIG)  # 按引擎的 AIMD 自适应调节
+        self.retry_scheduler = RetryScheduler(RETRY_CONFIG)  # 失败页的延迟重试
+        self._retry_task = None
+        self.metrics_server = None
+        self.http_pool = HttpClientPool(HTTP_POOL_CONFIG)  # 跨任务复用的 HTTP 连接池
+        self.parse_executor = ParseExecutor(PARSER_CONFIG)  # 事件循环外的 HTML 解析池
+        self.serp_cache = SerpCache(CACHE_CONFIG)  # 跨任务共享的 SERP 缓存
+        self.deduplicator = UrlDeduplicator(DEDUP_CONFIG)  # 发布前 URL 去重
+        # 各组件的 stats() 在导出指标时采集
+        for prefix, collect, label in (
+                ("rate_limiter", self.rate_limiters.stats, "key"),
+                ("adaptive", self.adaptive.stats, "engine"),
+                ("engine_parse", engine_stats, "engine"),
+                ("serp_cache", self.serp_cache.stats, None),
+                ("dedup", self.deduplicator.stats, None),
+                ("admission", self.admission.stats, None),
+                ("parse_executor", self.parse_executor.stats, None),
+                ("retry", self.retry_scheduler.stats, None),
+                ("log", log.stats, None),
+                ("compression", compression.stats, None),
+                ("broadcaster", Broadcaster.stats, None),
+        ):
+            metrics.REGISTRY.register_collector(prefix, collect, label)
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
@@ -108,17 +210,35 @@ class CrawlerService:
             'DNT': '1'
         }
     async def initialize(self):
-        """初始化 RabbitMQ：Fanout Exchange + 业务队列；Topic Exchange + 命令队列"""
+        """初始化 RabbitMQ：Topic -> Fanout Exchange + 业务队列；命令 Topic Exchange + 命令队列；共享 HTTP 连接池与解析池"""
+        await self.http_pool.start()
+        self.parse_executor.start()
         self.connection = await aio_pika.connect(url=self.amqp_url)
         self.channel = await self.connection.channel()
         await self.channel.set_qos(prefetch_count=50)
 
         # 广播 Exchange
-        self.exchange = await self.channel.declare_exchange(
+        self.fanout_exchange = await self.channel.declare_exchange(
             EXCHANGE_CONFIG["name"],
             EXCHANGE_CONFIG["type"],  # fanout
             durable=EXCHANGE_CONFIG["durable"]
         )
+        # 按任务路由的 Topic Exchange：所有消息发布到这里，再以 "#" 全量转发给 Fanout
+        self.exchange = await self.channel.declare_exchange(
+            TOPIC_EXCHANGE_CONFIG["name"],
+            TOPIC_EXCHANGE_CONFIG["type"],
+            durable=TOPIC_EXCHANGE_CONFIG["durable"]
+        )
+        await self.fanout_exchange.bind(self.exchange, routing_key="#")
+
+        # 逐条结果队列：Fanout -> Headers 交换机，按 messageType 过滤掉 resultBatch
+        if any(c.get("result_mode") == "single" for c in QUEUE_CONFIG.values()):
+            self.split_exchange = await self.channel.declare_exchange(
+                RESULT_BATCH_CONFIG["split_exchange"],
+                aio_pika.ExchangeType.HEADERS,
+                durable=True
+            )
+            await self.split_exchange.bind(self.fanout_exchange, routing_key="")
 
         # 绑定所有消费队列
         for queue_key, config in QUEUE_CONFIG.items():
@@ -127,180 +247,796 @@ class CrawlerService:
                 durable=config["durable"],
                 auto_delete=config["auto_delete"]
             )
-            await queue.bind(self.exchange, routing_key="")
-            print(f"✅ 队列已创建并绑定: {config['name']} ({queue_key})")
+            if config.get("result_mode") == "single":
+                # 移除旧版本遗留的直接绑定，避免重复收到消息
+                await queue.unbind(self.fanout_exchange, routing_key="")
+                for message_type in RESULT_BATCH_CONFIG["split_message_types"]:
+                    await queue.bind(
+                        self.split_exchange,
+                        routing_key="",
+                        arguments={"x-match": "any", "messageType": message_type}
+                    )
+            else:
+                await queue.bind(self.fanout_exchange, routing_key="")
+            logger.info("✅ 队列已创建并绑定: %s (%s, %s)", config['name'], queue_key, config.get('result_mode', 'batch'))
+        await self._unbind_retired_queues()
 
-        # 命令通道（Topic）
-        cmd_exchange = await self.channel.declare_exchange(
+        # 命令通道（Topic）：独立 channel，未确认的 start 命令占用 prefetch，形成 broker 侧背压
+        self.cmd_channel = await self.connection.channel()
+        await self.cmd_channel.set_qos(
+            prefetch_count=ADMISSION_CONFIG["max_running_jobs"] + ADMISSION_CONFIG["max_queued_jobs"]
+        )
+        cmd_exchange = await self.cmd_channel.declare_exchange(
             "crawler.command.exchange",
             aio_pika.ExchangeType.TOPIC,
             durable=True
         )
-        self.cmd_queue = await self.channel.declare_queue(
+        self.cmd_queue = await self.cmd_channel.declare_queue(
             "crawler.command.queue",
             durable=True,
         )
         await self.cmd_queue.bind(cmd_exchange, routing_key="cmd.*")
-        print("✅ 命令队列已创建: crawler.command.queue")
+        logger.info("✅ 命令队列已创建: crawler.command.queue")
+
+        # 控制队列：每个 worker 一个独占队列，stop 命令必须到达所有持有该任务页的进程
+        # - 直接绑定命令交换机的 cmd.stop / cmd.log_level：用户命令送达所有 worker，不会排在被积压的 start 命令之后
+        # - 绑定控制广播交换机（Fanout）：协调者判定任务出错或超时后自行广播 stop（见 _abort_pages），
+        #   不经过命令队列
+        self.control_exchange = await self.channel.declare_exchange(
+            DISTRIBUTED_CONFIG["control_exchange"],
+            aio_pika.ExchangeType.FANOUT,
+            durable=True
+        )
+        control_queue = await self.channel.declare_queue(exclusive=True, auto_delete=True)
+        await control_queue.bind(self.control_exchange, routing_key="")
+        await control_queue.bind(cmd_exchange, routing_key="cmd.stop")
+        await control_queue.bind(cmd_exchange, routing_key="cmd.log_level")
+        await control_queue.consume(self._on_control_message)
+
+        # 页任务队列：任意数量的 run.py 进程共同消费，prefetch 决定每个进程同时持有的页数
+        if DISTRIBUTED_CONFIG["enabled"]:
+            self.page_channel = await self.connection.channel()
+            await self.page_channel.set_qos(prefetch_count=DISTRIBUTED_CONFIG["page_prefetch"])
+            page_queue = await self.page_channel.declare_queue(DISTRIBUTED_CONFIG["page_queue"], durable=True)
+            self.report_queue = await self.channel.declare_queue(exclusive=True, auto_delete=True)
+            await self.report_queue.consume(self._on_page_report)
+            await page_queue.consume(self._on_page_item)
+            logger.info("✅ 页任务队列已就绪: %s", DISTRIBUTED_CONFIG['page_queue'], extra={"worker": self.worker_id})
+
+    async def _unbind_retired_queues(self):
+        """
+        解除已退役队列与 Fanout 交换机的绑定，队列不存在时跳过
+        被动声明失败会关闭 channel，因此每个队列在临时 channel 上处理
+        """
+        for name in RETIRED_QUEUES:
+            channel = await self.connection.channel()
+            try:
+                queue = await channel.declare_queue(name, passive=True)
+                await queue.unbind(EXCHANGE_CONFIG["name"], routing_key="")
+                logger.warning("🧹 已解除退役队列的绑定: %s（剩余 %s 条消息，确认无人使用后可删除该队列）",
+                               name, queue.declaration_result.message_count)
+            except aio_pika.exceptions.ChannelNotFoundEntity:
+                pass
+            finally:
+                if not channel.is_closed:
+                    await channel.close()
+
+    async def close(self):
+        """释放资源：重试调度、HTTP 连接池、解析池与 RabbitMQ 连接"""
+        if self._retry_task is not None:
+            self._retry_task.cancel()
+        if self.metrics_server is not None:
+            await self.metrics_server.cleanup()
+        await self.http_pool.close()
+        self.parse_executor.shutdown()
+        if self.connection and not self.connection.is_closed:
+            await self.connection.close()
+        log.shutdown_logging()
 
     async def run(self):
         """运行主循环：监听命令队列"""
+        log.configure_logging(LOG_CONFIG)
         await self.initialize()
+        await self._start_metrics_server()
 
-        print("🚀 爬虫服务已启动（多端消费模式）")
-        print(f"📡 广播交换机: {EXCHANGE_CONFIG['name']}")
-        print(f"📮 消费队列: {', '.join([c['name'] for c in QUEUE_CONFIG.values()])}\n")
-
-        async with self.cmd_queue.iterator() as queue_iter:
-            async for msg in queue_iter:
-                async with msg.process():
-                    try:
-                        cmd = json.loads(msg.body)
-                        task_id = cmd["task_id"]
-                        if cmd["cmd"] == "start":
-                            print(f"📝 收到启动命令: {task_id}")
-                            self.stop_flags[task_id] = asyncio.Event()
-                            asyncio.create_task(
-                                self._start_job(self.exchange, cmd, self.stop_flags[task_id])
-                            )
-                        elif cmd["cmd"] == "stop":
-                            print(f"🛑 收到停止命令: {task_id}")
-                            if task_id in self.stop_flags:
-                                self.stop_flags[task_id].set()
-                    except Exception as e:
-                        print(f"❌ 处理命令失败: {e}")
+        logger.info("🚀 爬虫服务已启动（多端消费模式）")
+        logger.info("📡 广播交换机: %s", EXCHANGE_CONFIG['name'])
+        logger.info("📮 消费队列: %s", ', '.join([c['name'] for c in QUEUE_CONFIG.values()]))
 
-    async def _start_job(self, exchange, cmd, stop_event: asyncio.Event):
-        """启动爬取任务"""
+        reaper = asyncio.create_task(self._reap_remote_jobs())
+        try:
+            async with self.cmd_queue.iterator() as queue_iter:
+                async for msg in queue_iter:
+                    await self._on_command(msg)
+        finally:
+            reaper.cancel()
+
+    async def _on_command(self, msg):
+        """
+        处理命令队列中的一条消息；除进入本地等待队列的 start 外，每条消息都在这里确认或拒绝，
+        否则它会一直占用命令通道的 prefetch 名额，逐渐把准入容量耗尽
+        """
+        try:
+            cmd = decode_body(msg.body, msg.content_type)
+            task_id = cmd["task_id"]
+        except Exception as e:
+            logger.error("❌ 处理命令失败: %s", e)
+            await msg.reject()
+            return
+        try:
+            command = cmd.get("cmd")
+            if command == "start":
+                logger.info("📝 收到启动命令", extra={"task_id": task_id})
+                await self._admit(cmd, msg)
+            elif command in ("stop", "log_level"):
+                # 已经通过控制队列直接送达每个 worker
+                await msg.ack()
+            else:
+                logger.warning("⚠️ 未知命令已拒绝: %s", command, extra={"task_id": task_id})
+                await msg.reject()
+        except Exception as e:
+            logger.error("❌ 处理命令失败: %s", e, extra={"task_id": task_id})
+            if not msg.processed and not self.admission.holds(task_id, msg):
+                try:
+                    await msg.reject()
+                except Exception as e:
+                    logger.error("❌ 拒绝命令消息失败: %s", e, extra={"task_id": task_id})
+
+    async def _start_metrics_server(self):
+        """启动 worker 的指标 HTTP 监听；端口被占用（同机多 worker）时只打印警告"""
+        if not METRICS_CONFIG.get("enabled"):
+            return
+        try:
+            self.metrics_server = await metrics.start_http_server(
+                metrics.REGISTRY, METRICS_CONFIG["host"], METRICS_CONFIG["port"]
+            )
+            logger.info("📊 指标监听: http://%s:%s/metrics", METRICS_CONFIG['host'], METRICS_CONFIG['port'])
+        except OSError as e:
+            logger.warning("⚠️ 指标监听启动失败: %s", e)
+
+    async def _admit(self, cmd: dict, msg):
+        """准入控制：有名额则立即启动并确认消息，否则保持未确认进入本地等待队列"""
         task_id = cmd["task_id"]
-        keywords = cmd["keywords"]
-        total_pages = cmd["pageSize"]
-        concurrency = cmd.get("concurrency", 1)
-        rate = cmd.get("rateLimitPerSec", 2)
-        engine = cmd.get("engine", "bing")
+        if str(task_id) in self.stopped_tasks:
+            await msg.ack()
+            await Broadcaster.broadcast_status(self.exchange, task_id, "stopped")
+            return
+        if self.admission.is_duplicate(task_id):
+            # 同一任务已在本进程运行或排队：拒绝重复的 start，不让它占着 prefetch 名额
+            logger.warning("⚠️ 重复的启动命令已拒绝: %s", self.admission.stats(), extra={"task_id": task_id})
+            await msg.reject()
+            return
+        if self.admission.try_acquire(task_id):
+            await msg.ack()
+            self._launch(cmd)
+            return
+        position = self.admission.push(cmd, msg)
+        logger.info("⏳ 任务排队中: 位置=%s, %s", position, self.admission.stats(), extra={"task_id": task_id})
+        await Broadcaster.broadcast_status(self.exchange, task_id, "queued",
+                                           queuePosition=position, **self.admission.stats())
 
-        print(f"🎯 开始任务 {task_id}: 关键词={keywords}, 页数={total_pages}")
+    def _launch(self, cmd: dict):
+        """启动一个已获得名额的任务"""
+        stop_event = self.stop_flags[str(cmd["task_id"])] = asyncio.Event()
+        if DISTRIBUTED_CONFIG["enabled"]:
+            job = self._coordinate_job(self.exchange, cmd, stop_event)
+        else:
+            job = self._start_job(self.exchange, cmd, stop_event)
+        asyncio.create_task(self._run_admitted(cmd["task_id"], job))
 
-        sem = asyncio.Semaphore(concurrency)
-        last_ts = [time.time()]
+    async def _run_admitted(self, task_id, job):
+        """运行任务，结束后释放名额并启动等待队列中的下一个"""
+        try:
+            await job
+        finally:
+            self.admission.release(task_id)
+            entry = self.admission.pop()
+            if entry is not None:
+                cmd, msg = entry
+                try:
+                    await msg.ack()
+                except Exception as e:
+                    logger.warning("⚠️ 确认排队命令失败: %s", e)
+                self._launch(cmd)
 
-        async def rate_limit():
-            delta = time.time() - last_ts[0]
-            if delta < 1.0 / rate:
-                await asyncio.sleep(1.0 / rate - delta)
-            last_ts[0] = time.time()
+    async def _on_control_message(self, message):
+        """
+        处理控制广播
+        - stop：同时作用于本进程协调的任务与正在处理的页任务
+        - log_level：运行时调整日志级别 {"cmd": "log_level", "level": "DEBUG", "logger": 可选}
+        """
+        async with message.process():
+            try:
+                cmd = decode_body(message.body, message.content_type)
+                if cmd.get("cmd") == "log_level":
+                    log.set_level(cmd["level"], cmd.get("logger") or log.ROOT_LOGGER)
+                    logger.warning("🔧 日志级别已调整: %s=%s", cmd.get("logger") or log.ROOT_LOGGER, cmd["level"])
+                elif cmd.get("cmd") == "stop":
+                    key = str(cmd["task_id"])
+                    logger.info("🛑 收到停止命令", extra={"task_id": key})
+                    self.stopped_tasks.add(key)
+                    if key in self.stop_flags:
+                        self.stop_flags[key].set()
+                    if key in self.remote_jobs:
+                        self.remote_jobs[key].stop_event.set()
+                    # 重试堆中等待的页立即交还，worker 按停止处理，pages.join() 不必等到重试到期
+                    self.retry_scheduler.stop(key)
+                    queued = self.admission.remove(key)
+                    if queued is not None:
+                        # 仍在本地排队的任务：确认命令消息，直接报告已停止
+                        cmd, msg = queued
+                        await msg.ack()
+                        await Broadcaster.broadcast_status(self.exchange, cmd["task_id"], "stopped")
+            except Exception as e:
+                logger.error("❌ 处理控制命令失败: %s", e)
 
+    async def _coordinate_job(self, exchange, cmd, stop_event: asyncio.Event):
+        """
+        协调分布式任务：把任务拆成页任务投递到页队列，汇总各 worker 的页回执，
+        全部页完成（或停止、超时）后只发一次终态
+        """
+        task_id = cmd["task_id"]
+        key = str(task_id)
+        concurrency, _ = task_limits(cmd)
+        tracker = PageTracker(task_id, cmd["pageSize"], concurrency, cmd["keywords"], cmd.get("engine", "bing"))
+        self.trackers[key] = tracker
+        dispatcher = None
+
+        logger.info("🎯 开始分布式任务: 关键词=%s, 页数=%s", cmd['keywords'], tracker.total_pages, extra={"task_id": task_id})
         try:
-            connector = aiohttp.TCPConnector(
-                ssl=False,  # 或者使用 ssl=ssl.create_default_context()
-                limit=10,  # 限制并发连接数
-                ttl_dns_cache=300
+            if get_engine(tracker.engine) is None:
+                raise ValueError(f"不支持的搜索引擎: {tracker.engine}")
+            # 各 worker 转交的结果在协调者处按任务统一去重
+            self.deduplicator.open_task(task_id, tracker.total_pages)
+            await Broadcaster.broadcast_status(exchange, task_id, "started")
+            await Broadcaster.broadcast_progress(exchange, task_id, current=0, total=tracker.total_pages,
+                                                 **tracker.progress_stats())
+
+            dispatcher = asyncio.create_task(self._dispatch_pages(cmd, tracker, stop_event))
+            if await self._wait_tracker(tracker, stop_event, dispatcher):
+                await Broadcaster.broadcast_status(exchange, task_id, "done")
+                logger.info("✅ 分布式任务完成 (worker 数=%s)", tracker.progress_stats()['workers'], extra={"task_id": task_id})
+            else:
+                await Broadcaster.broadcast_status(exchange, task_id, "stopped")
+                logger.info("⏹️ 分布式任务已停止", extra={"task_id": task_id})
+        except Exception as e:
+            logger.error("❌ 分布式任务失败: %s", e, extra={"task_id": task_id})
+            await self._abort_pages(task_id)
+            await Broadcaster.broadcast_status(exchange, task_id, "error", str(e))
+        finally:
+            if dispatcher is not None:
+                dispatcher.cancel()
+                await asyncio.gather(dispatcher, return_exceptions=True)
+            self.deduplicator.close_task(task_id)
+            self.trackers.pop(key, None)
+            self.stop_flags.pop(key, None)
+
+    async def _abort_pages(self, task_id):
+        """
+        任务出错或超时：记为已停止，并经控制交换机通知所有 worker，
+        页队列里剩余的页任务被跳过，已在处理的页不再发布结果
+        """
+        self.stopped_tasks.add(str(task_id))
+        try:
+            await self.control_exchange.publish(
+                aio_pika.Message(
+                    body=JSON_CODEC.encode({"cmd": "stop", "task_id": task_id}),
+                    content_type=JSON_CODEC.content_type,
+                ),
+                routing_key=""
             )
-            async with aiohttp.ClientSession(
-                    connector=connector,
-                    timeout=aiohttp.ClientTimeout(
-                        total=30,  # 增加总超时
-                        connect=10,  # 连接超时
-                        sock_read=20  # 读取超时
-                    ),
-                    headers=self.get_headers(),
-                    cookie_jar=aiohttp.CookieJar()
-            ) as session:
-                # 开始状态 + 初始进度
-                await Broadcaster.broadcast_status(exchange, task_id, "started")
-                await Broadcaster.broadcast_progress(exchange, task_id, current=0, total=total_pages)
-
-                tasks = []
-                for page_no in range(1, total_pages + 1):
-                    if stop_event.is_set():
-                        break
-                    url = build_search_url(keywords, page_no, engine=engine)
-
-                    task = asyncio.create_task(
-                        self._crawl_one(
-                            session=session,
-                            url=url,
-                            page_no=page_no,
-                            task_id=task_id,
-                            exchange=exchange,
-                            sem=sem,
-                            rate_limit=rate_limit,
-                            stop_event=stop_event,
-                            engine=engine,
-                            keywords=keywords,
-                            total_pages=total_pages
+        except Exception as e:
+            logger.error("❌ 广播停止命令失败: %s", e, extra={"task_id": task_id})
+
+    async def _dispatch_pages(self, cmd: dict, tracker: PageTracker, stop_event: asyncio.Event):
+        """
+        按任务上限投递页任务（含 worker 交还的重试）：
+        在途页数不超过 concurrency，投递速率不超过 rateLimitPerSec，与 worker 进程数无关
+        """
+        _, rate = task_limits(cmd)
+        bucket = TokenBucket(rate, burst=1)
+        while not stop_event.is_set():
+            page = await tracker.next_page()
+            if page is None:
+                return
+            await bucket.acquire()
+            if stop_event.is_set():
+                return
+            await self._publish_page_item(cmd, *page)
+
+    async def _publish_page_item(self, cmd: dict, page_no: int, attempt: int = 1):
+        """投递一个页任务，回执发往本进程的 report_queue"""
+        body = {"cmd": cmd, "pageNo": page_no, "attempt": attempt}
+        await self.channel.default_exchange.publish(
+            aio_pika.Message(
+                body=JSON_CODEC.encode(body),
+                content_type=JSON_CODEC.content_type,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                reply_to=self.report_queue.name,
+                correlation_id=str(cmd["task_id"]),
+            ),
+            routing_key=DISTRIBUTED_CONFIG["page_queue"]
+        )
+
+    async def _wait_tracker(self, tracker: PageTracker, stop_event: asyncio.Event, dispatcher: asyncio.Task) -> bool:
+        """
+        等待所有页回执
+        :param dispatcher: 投递页任务的后台任务，投递失败时异常在此抛出
+        :return: True 全部完成；False 被停止
+        :raises TimeoutError: 页已开始被 worker 取走后，仍有页在途却超过 report_timeout 秒没有任何回执
+        """
+        timeout = DISTRIBUTED_CONFIG["report_timeout"]
+        waiters = [asyncio.create_task(tracker.finished.wait()), asyncio.create_task(stop_event.wait())]
+        try:
+            while True:
+                await asyncio.wait([*waiters, dispatcher], timeout=min(5, timeout),
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if tracker.finished.is_set():
+                    return True
+                if stop_event.is_set():
+                    return False
+                if dispatcher.done() and not dispatcher.cancelled() and dispatcher.exception() is not None:
+                    raise dispatcher.exception()
+                if tracker.stalled(timeout):
+                    raise TimeoutError(f"{timeout} 秒内未收到任何页回执，已完成 {tracker.completed}/{tracker.total_pages}")
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def _on_page_report(self, message):
+        """
+        协调者收到页回执：
+        - links：worker 转交的一批结果，按任务去重后发布
+        - retry：worker 交还的失败页，到期后重新投递
+        - 其余：按页去重计数并广播汇总进度
+        同一任务的回执按到达顺序处理，页的结果总是先于该页的完成进度（及任务终态）发布
+        """
+        async with message.process():
+            try:
+                report = decode_body(message.body, message.content_type)
+                tracker = self.trackers.get(str(report["taskId"]))
+                if tracker is None:
+                    return
+                async with tracker.lock:
+                    status = report.get("status")
+                    if status == "links":
+                        await self._publish_forwarded(tracker, report["links"])
+                    elif status == "retry":
+                        tracker.retry(report["pageNo"], report["attempt"], report["delay"])
+                    elif tracker.record(report):
+                        await Broadcaster.broadcast_progress(
+                            self.exchange, tracker.task_id, current=tracker.completed,
+                            total=tracker.total_pages, **tracker.progress_stats()
                         )
-                    )
-                    tasks.append(task)
+            except Exception as e:
+                logger.error("❌ 处理页回执失败: %s", e)
 
-                await asyncio.gather(*tasks, return_exceptions=True)
+    async def _publish_forwarded(self, tracker: PageTracker, links: List[Dict[str, str]]):
+        """发布 worker 转交的结果：同一任务在所有 worker 上找到的 URL 只在这里去重一次"""
+        links, suppressed = self.deduplicator.filter(tracker.task_id, links)
+        tracker.record_links(len(links), suppressed)
+        if str(tracker.task_id) in self.stopped_tasks:
+            return
+        await self._broadcast_links(tracker.task_id, tracker.keywords, links, self.exchange, (tracker.engine,))
 
-                if not stop_event.is_set():
-                    await Broadcaster.broadcast_status(exchange, task_id, "done")
-                    print(f"✅ 任务完成: {task_id}")
-                else:
-                    await Broadcaster.broadcast_status(exchange, task_id, "stopped")
-                    print(f"⏹️ 任务已停止: {task_id}")
+    async def _on_page_item(self, message):
+        """worker 收到页任务：交给该任务在本进程的 CrawlJob，处理完成后再 ack"""
+        try:
+            item = decode_body(message.body, message.content_type)
+            cmd = item["cmd"]
+            page_no = item["pageNo"]
+            attempt = item.get("attempt", 1)
+        except Exception as e:
+            logger.error("❌ 无效页任务，已丢弃: %s", e)
+            await message.reject()
+            return
+        if str(cmd["task_id"]) in self.stopped_tasks:
+            await message.ack()
+            return
+        delivered = str(cmd["task_id"]) not in self.remote_jobs
+        try:
+            job = self._remote_job(cmd, message)
+        except ValueError as e:
+            logger.error("❌ 无效页任务，已丢弃: %s", e)
+            await message.reject()
+            return
+        if delivered:
+            # 本进程首次取到该任务的页：通知协调者从此刻开始计算回执超时
+            try:
+                await self._send_report(job, {"pageNo": page_no, "status": "delivered"})
+            except Exception as e:
+                logger.warning("⚠️ 发送页回执失败: %s", e, extra={"task_id": job.task_id, "page_no": page_no})
+        await job.pages.put((page_no, message, attempt, time.monotonic()))
+
+    def _new_job(self, cmd: dict, stop_event: asyncio.Event) -> "CrawlJob":
+        """创建任务运行态，绑定引擎共享的令牌桶与调节器"""
+        engine = cmd.get("engine", "bing")
+        return CrawlJob(cmd, stop_event, self.rate_limiters.get(engine, cmd.get("proxy")), self.adaptive.get(engine))
+
+    def _remote_job(self, cmd: dict, message) -> "CrawlJob":
+        """
+        获取（或创建）某任务在本进程的页任务执行态
+        不在本进程去重：结果转交给协调者，由它按任务统一去重
+        :param message: 页任务消息，其 reply_to 为该任务协调者的回执队列
+        """
+        key = str(cmd["task_id"])
+        job = self.remote_jobs.get(key)
+        if job is None:
+            job = self._new_job(cmd, asyncio.Event())
+            job.reply_to, job.correlation_id = message.reply_to, message.correlation_id
+            session = self.http_pool.session(job.task_id)
+            job.workers = [
+                asyncio.create_task(self._page_worker(session, job, self.exchange))
+                for _ in range(job.concurrency)
+            ]
+            self.remote_jobs[key] = job
+        job.last_active = time.monotonic()
+        return job
+
+    async def _reap_remote_jobs(self):
+        """定期回收空闲的页任务执行态"""
+        idle_timeout = DISTRIBUTED_CONFIG["idle_timeout"]
+        while True:
+            await asyncio.sleep(idle_timeout / 2)
+            now = time.monotonic()
+            for key, job in list(self.remote_jobs.items()):
+                if (job.pages.empty() and job.active == 0 and job.retrying == 0
+                        and now - job.last_active > idle_timeout):
+                    for worker in job.workers:
+                        worker.cancel()
+                    del self.remote_jobs[key]
+                    await self.http_pool.release(job.task_id)
+
+    async def _start_job(self, exchange, cmd, stop_event: asyncio.Event):
+        """启动爬取任务：页码由生产者按需入队，concurrency 个 worker 消费"""
+        task_id = cmd["task_id"]
+        logger.info("🎯 开始任务: 关键词=%s, 页数=%s", cmd['keywords'], cmd['pageSize'], extra={"task_id": task_id})
+
+        workers = []
+        try:
+            job = self._new_job(cmd, stop_event)
+            self.deduplicator.open_task(task_id, job.total_pages)
+
+            # 任务独立的会话（独立 CookieJar），复用共享连接器，不再为每个任务新建连接器
+            session = self.http_pool.session(task_id)
+
+            # 开始状态 + 初始进度
+            await Broadcaster.broadcast_status(exchange, task_id, "started")
+            await Broadcaster.broadcast_progress(exchange, task_id, current=0, total=job.total_pages,
+                                                 **job.progress_stats())
+
+            workers = [
+                asyncio.create_task(self._page_worker(session, job, exchange))
+                for _ in range(job.concurrency)
+            ]
+            # 有界队列：队列满时生产者在此等待，内存占用与 concurrency 成正比
+            for page_no in job.iter_pages():
+                if stop_event.is_set():
+                    break
+                await job.pages.put((page_no, None, 1, time.monotonic()))
+            await job.pages.join()
+
+            logger.info("⏱️ 限速统计: 任务=%s, 引擎=%s", job.bucket.stats(), job.engine_bucket.stats(), extra={"task_id": task_id})
+            logger.info("🗃️ SERP 缓存统计: %s", self.serp_cache.stats(), extra={"task_id": task_id})
+            logger.info("🧩 引擎解析统计: %s", job.search_engine.stats(), extra={"task_id": task_id, "engine": job.engine})
+            logger.info("📈 自适应调节: %s", job.controller.stats(), extra={"task_id": task_id, "engine": job.engine})
+            logger.info("🔁 重试统计: %s", self.retry_scheduler.stats(), extra={"task_id": task_id})
+            if not stop_event.is_set():
+                await Broadcaster.broadcast_status(exchange, task_id, "done")
+                logger.info("✅ 任务完成", extra={"task_id": task_id})
+            else:
+                await Broadcaster.broadcast_status(exchange, task_id, "stopped")
+                logger.info("⏹️ 任务已停止", extra={"task_id": task_id})
 
         except Exception as e:
-            print(f"❌ 任务失败 {task_id}: {e}")
+            logger.error("❌ 任务失败: %s", e, extra={"task_id": task_id})
             await Broadcaster.broadcast_status(exchange, task_id, "error", str(e))
         finally:
-            if task_id in self.stop_flags:
-                del self.stop_flags[task_id]
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await self.http_pool.release(task_id)
+            self.deduplicator.close_task(task_id)
+            self.stop_flags.pop(str(task_id), None)
+
+    async def _page_worker(self, session, job: "CrawlJob", exchange):
+        """
+        从任务队列取页码并爬取；任务停止后只出队不抓取，使队列尽快排空
+        可重试的失败交给重试调度器延后重新入队，worker 立即去处理下一页
+        """
+        while True:
+            page_no, message, attempt, enqueued = await job.pages.get()
+            metrics.QUEUE_WAIT.observe(time.monotonic() - enqueued, job.metric_labels)
+            job.active += 1
+            report = {"pageNo": page_no, "status": "skipped"}
+            try:
+                if not job.stop_event.is_set():
+                    report = {"pageNo": page_no, "status": "failed"}
+                    report = await self._crawl_one(session, job, page_no, exchange)
+            except Exception as e:
+                logger.exception("❌ 页面处理异常: %s", e, extra={"task_id": job.task_id, "page_no": page_no})
+
+            if report["status"] == "failed" and self._schedule_retry(job, page_no, message, attempt, report):
+                # 原条目的 task_done 推迟到重新入队时，pages.join() 不会在重试等待期间返回
+                job.active -= 1
+                job.last_active = time.monotonic()
+                continue
+            if report["status"] != "retry":
+                metrics.PAGES.inc(1, (job.engine, report["status"]))
+            if report["status"] == "ok":
+                metrics.RESULTS_PER_PAGE.observe(report["results"], job.metric_labels)
+            try:
+                await self._page_finished(job, report, message, exchange)
+            except Exception as e:
+                logger.error("❌ 页面回执失败: %s", e, extra={"task_id": job.task_id, "page_no": page_no})
+            finally:
+                job.active -= 1
+                job.last_active = time.monotonic()
+                job.pages.task_done()
+
+    def _schedule_retry(self, job: "CrawlJob", page_no: int, message, attempt: int, report: dict) -> bool:
+        """
+        按引擎重试策略安排延迟重试
+        分布式页任务不在本地重试：回执改为 retry 交还协调者，到期后由它重新投递，重试同样受任务的速率与并发上限约束
+        :param attempt: 本次是第几次尝试
+        :return: True 表示已在本地安排重试
+        """
+        reason = report.get("retry")
+        if reason is None or job.stop_event.is_set():
+            return False
+        delay = self.retry_scheduler.policy(job.engine).delay(reason, attempt)
+        if delay is None:
+            self.retry_scheduler.record_exhausted()
+            logger.warning("❌ 页面最终失败: %s", reason, extra={"task_id": job.task_id, "page_no": page_no, "attempt": attempt})
+            return False
+        logger.info("⚠️ 页面失败: %s, %.1f秒后重试", reason, delay, extra={
+            "task_id": job.task_id, "page_no": page_no, "attempt": attempt, "event": "retry.scheduled"})
+        metrics.RETRIES.inc(1, (job.engine, str(reason)))
+        if message is not None:
+            report.update(status="retry", attempt=attempt + 1, delay=delay)
+            return False
+        if self._retry_task is None:
+            self._retry_task = asyncio.create_task(self.retry_scheduler.run(self._requeue))
+        job.retrying += 1
+        self.retry_scheduler.schedule(delay, job, (page_no, message, attempt + 1))
+        return True
+
+    async def _requeue(self, job: "CrawlJob", item: tuple):
+        """重试到期：页重新入队（再次经过限速），并结清原条目的 task_done"""
+        try:
+            await job.pages.put((*item, time.monotonic()))
+        finally:
+            job.retrying -= 1
+            job.pages.task_done()
 
-    async def _crawl_one(self, session, url, page_no, task_id,
-                         exchange, sem, rate_limit, stop_event, engine, keywords, total_pages):
-        """爬取单个搜索结果页，并广播每条链接"""
-        if stop_event.is_set():
+    async def _page_finished(self, job: "CrawlJob", report: dict, message, exchange):
+        """
+        页处理结束：本地任务直接广播进度；分布式页任务把回执发给协调者后 ack
+        :param report: _crawl_one 返回的页回执
+        :param message: 页任务消息，本地任务为 None
+        """
+        if message is None:
+            if report["status"] == "skipped":
+                return
+            job.completed += 1
+            await Broadcaster.broadcast_progress(exchange, job.task_id, current=job.completed,
+                                                 total=job.total_pages, **job.progress_stats())
             return
 
-        async with sem:
-            await rate_limit()
+        await self._send_report(job, report)
+        await message.ack()
+
+    async def _send_report(self, job: "CrawlJob", report: dict):
+        """把页回执（或转交的结果）发给页任务消息 reply_to 指定的协调者"""
+        if not job.reply_to:
+            return
+        await self.channel.default_exchange.publish(
+            aio_pika.Message(
+                body=JSON_CODEC.encode({**report, "taskId": job.task_id, "worker": self.worker_id,
+                                        "limits": job.limit_stats()}),
+                content_type=JSON_CODEC.content_type,
+                correlation_id=job.correlation_id,
+            ),
+            routing_key=job.reply_to
+        )
+
+    async def _crawl_one(self, session, job: "CrawlJob", page_no: int, exchange) -> dict:
+        """
+        爬取单个搜索结果页（单次尝试），并广播每条链接
+        :return: 页回执 {pageNo, status(ok/failed/skipped), results, suppressed, cacheHit}，
+                 失败时 retry 为失败原因（状态码或 timeout/error/captcha），由重试策略决定是否重试
+        """
+        report = {"pageNo": page_no, "status": "failed", "results": 0, "suppressed": 0, "cacheHit": False}
+        if job.stop_event.is_set():
+            report["status"] = "skipped"
+            return report
+        search_engine = job.search_engine
+        url = search_engine.build_url(job.keywords, page_no)
+        log_fields = {"task_id": job.task_id, "page_no": page_no}
+
+        async def fetch():
+            # 只有缓存未命中才占用请求名额、消耗令牌；验证码页与非 200 抛出 FetchError，不进缓存
+            async with job.request_slot(), self._observe(job) as observe:
+                async with session.get(url, headers=self.get_headers(), proxy=job.proxy) as resp:
+                    if resp.status != 200:
+                        logger.info("⚠️ 页面返回状态码: %s", resp.status, extra={**log_fields, "event": "page.http_status"})
+                        observe(job.controller.outcome_for_status(resp.status))
+                        raise FetchError(resp.status)
+                    body = await resp.read()
+                    metrics.DOWNLOADED_BYTES.inc(len(body), job.metric_labels)
+                    html = body.decode(resp.get_encoding(), errors="ignore")
+                if search_engine.is_captcha(html):
+                    logger.warning("🧱 页面命中验证码页", extra=log_fields)
+                    observe(CAPTCHA)
+                    raise FetchError(CAPTCHA)
+                return html
+
+        try:
+            # 流式模式：引擎提供增量解析器时边下载边发布
+            parser = search_engine.stream_parser() if PARSER_CONFIG.get("streaming") else None
+            if parser is not None:
+                return await self._stream_page(session, job, page_no, url, parser, exchange, report)
+
+            html, source = await self.serp_cache.get_or_fetch(job.engine, url, fetch)
+            if source != "fetch":
+                job.cache_hits += 1
+                report["cacheHit"] = True
+
+            # 解析交给执行器，不阻塞事件循环
+            links, parse_seconds = await self.parse_executor.run(parse_serp, html, search_engine)
+            search_engine.record_parse(parse_seconds, len(links))
+            metrics.PARSE_SECONDS.observe(parse_seconds, job.metric_labels)
+            logger.info("📄 页面找到 %d 个链接", len(links), extra={**log_fields, "event": "page.parsed"})
+            logger.debug("🔗 链接详情: %s", links, extra={**log_fields, "event": "page.links"})
+
+            # 整页结果一次批量发布
+            await self._publish_links(job, links, exchange, report)
+            report["status"] = "ok"
+        except FetchError as e:
+            report["retry"] = e.reason
+        except asyncio.TimeoutError:
+            report["retry"] = TIMEOUT
+        except (aiohttp.ClientError, ConnectionError) as e:
+            logger.info("⚠️ 页面请求失败: %s", e, extra=log_fields)
+            report["retry"] = ERROR
+        except Exception as e:
+            logger.exception("❌ 页面未知错误: %s", e, extra=log_fields)
+        return report
+
+    async def _stream_page(self, session, job: "CrawlJob", page_no: int, url: str, parser, exchange,
+                           report: dict) -> dict:
+        """
+        流式抓取单页：响应按块喂给引擎的增量解析器，每块中新闭合的结果交给发布协程去重发布
+        请求名额与耗时统计只覆盖下载；发布与下载并行，名额释放后再等待剩余批次发布完成
+        不经过 SERP 缓存；单页内存只保留未闭合部分的 DOM；下载中途收到停止时回执为 skipped
+        :param parser: 引擎的增量解析器
+        """
+        search_engine = job.search_engine
+        log_fields = {"task_id": job.task_id, "page_no": page_no}
+        parse_seconds = 0.0
+        found = 0
+        stopped = False
+        batches: asyncio.Queue = asyncio.Queue()
+
+        async def publish():
+            # 单个协程按解析顺序逐批发布
+            while (links := await batches.get()) is not None:
+                await self._publish_links(job, links, exchange, report)
+
+        publisher = asyncio.create_task(publish())
+        try:
+            async with job.request_slot(), self._observe(job) as observe, \
+                    session.get(url, headers=self.get_headers(), proxy=job.proxy) as resp:
+                if resp.status != 200:
+                    logger.info("⚠️ 页面返回状态码: %s", resp.status, extra={**log_fields, "event": "page.http_status"})
+                    observe(job.controller.outcome_for_status(resp.status))
+                    raise FetchError(resp.status)
+                decoder = _incremental_decoder(resp.charset)
+                captcha = search_engine.captcha_scanner()
+                chunk_size = PARSER_CONFIG.get("stream_chunk_size", 16 * 1024)
+                async for chunk in resp.content.iter_chunked(chunk_size):
+                    if job.stop_event.is_set():
+                        stopped = True
+                        break
+                    metrics.DOWNLOADED_BYTES.inc(len(chunk), job.metric_labels)
+                    text = decoder.decode(chunk)
+                    if captcha.feed(text):
+                        logger.warning("🧱 页面命中验证码页", extra=log_fields)
+                        observe(CAPTCHA)
+                        raise FetchError(CAPTCHA)
+                    start = time.perf_counter()
+                    links = parser.feed(text)
+                    parse_seconds += time.perf_counter() - start
+                    found += len(links)
+                    batches.put_nowait(links)
+                else:
+                    start = time.perf_counter()
+                    links = parser.feed(decoder.decode(b"", final=True)) + parser.close()
+                    parse_seconds += time.perf_counter() - start
+                    found += len(links)
+                    batches.put_nowait(links)
+        except BaseException:
+            publisher.cancel()
+            raise
+        batches.put_nowait(None)
+        await publisher
+        search_engine.record_parse(parse_seconds, found)
+        metrics.PARSE_SECONDS.observe(parse_seconds, job.metric_labels)
+        if stopped:
+            logger.info("⏹️ 页面下载中途停止，已发布 %d 个链接", report["results"], extra=log_fields)
+            report["status"] = "skipped"
+            return report
+        logger.info("📄 页面流式解析找到 %d 个链接", found, extra={**log_fields, "event": "page.parsed"})
+        report["status"] = "ok"
+        return report
+
+    @asynccontextmanager
+    async def _observe(self, job: "CrawlJob"):
+        """
+        把一次请求的结果与耗时记入引擎调节器
+        块内调用 observe(outcome) 标记失败类型；未标记且正常结束记为成功，超时/连接异常自动归类
+        """
+        outcome = []
+        start = time.monotonic()
+        try:
+            yield outcome.append
+        except asyncio.TimeoutError:
+            outcome.append(TIMEOUT)
+            raise
+        except (aiohttp.ClientError, ConnectionError):
+            outcome.append(ERROR)
+            raise
+        except asyncio.CancelledError:
+            outcome.append(None)  # 任务取消不计入
+            raise
+        finally:
+            if not outcome or outcome[0] is not None:
+                latency = time.monotonic() - start
+                job.controller.record(outcome[0] if outcome else OK, latency)
+                metrics.FETCH_SECONDS.observe(latency, (job.engine, outcome[0] if outcome else OK))
+
+    async def _publish_links(self, job: "CrawlJob", links: List[Dict[str, str]], exchange, report: dict):
+        """
+        发布前去重并批量发布一组链接，累加到页回执
+        分布式页任务把链接原样转交协调者，由它按任务去重后发布（report 中的 results 为转交条数）
+        """
+        if not links:
+            return
+        if job.reply_to is not None:
+            report["results"] += len(links)
+            if not job.stop_event.is_set():
+                await self._send_report(job, {"pageNo": report["pageNo"], "status": "links", "links": links})
+            return
+        # 发布前去重：同任务内重复、或（开启全局时）近期已发布的 URL 不再发送
+        links, suppressed = self.deduplicator.filter(job.task_id, links)
+        job.suppressed += suppressed
+        report["results"] += len(links)
+        report["suppressed"] += suppressed
+        if job.stop_event.is_set():
+            return
+        await self._broadcast_links(job.task_id, job.keywords, links, exchange, job.metric_labels)
+
+    async def _broadcast_links(self, task_id, keywords, links: List[Dict[str, str]], exchange, metric_labels):
+        """把已去重的链接组装成结果批量发布"""
+        if not links:
+            return
+        now = datetime.now().isoformat()
+        items = [
+            {
+                "task_id": task_id,
+                "keywords": keywords,
+                "url": link['href'],
+                "title": link['title'],
+                "source": link['source'],
+                "dateTime": now,
+            }
+            for link in links
+        ]
+        start = time.monotonic()
+        await Broadcaster.broadcast_results(exchange, task_id, items, split_exchange=self.split_exchange)
+        metrics.PUBLISH_SECONDS.observe(time.monotonic() - start, metric_labels)
+
 
-            # 🔥 添加重试机制
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    async with session.get(url) as resp:
-                        if resp.status != 200:
-                            print(f"⚠️ 页面 {page_no} 返回状态码: {resp.status}")
-                            await Broadcaster.broadcast_progress(exchange, task_id, current=page_no, total=total_pages)
-                            return
-                        html = await resp.text(errors="ignore")
-
-
-                    links = parse_links(html, engine)
-                    print(f"📄 页面 {page_no} 找到 {len(links)} 个链接")
-                    print(f"🔗 链接详情: {links}")  # 🔥 确保打印
-
-                    for link in links:
-                        if stop_event.is_set():
-                            break
-                        data = {
-                            "task_id": task_id,
-                            "keywords": keywords,
-                            "url": link['href'],
-                            "title": link['title'],
-                            "source": link['source'],
-                            "dateTime": datetime.now().isoformat(),
-                        }
-                        await Broadcaster.broadcast_result(exchange, task_id, data)
-
-                    await Broadcaster.broadcast_progress(exchange, task_id, current=page_no, total=total_pages)
-                    return  # 🔥 成功后直接返回
-
-                except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError) as e:
-                    if attempt < max_retries - 1:
-                        wait_time = 2 ** attempt  # 指数退避: 1s, 2s, 4s
-                        print(f"⚠️ 页面 {page_no} 失败 (尝试 {attempt + 1}/{max_retries}): {e}, {wait_time}秒后重试...")
-                        await asyncio.sleep(wait_time)
-                    else:
-                        print(f"❌ 页面 {page_no} 最终失败: {e}")
-                        return
-                except Exception as e:
-                    print(f"❌ 页面 {page_no} 未知错误: {e}")
-                    return
 async def main():
     svc = CrawlerService(AMQP_URL)
     await svc.run()
@@ -0,0 +1,152 @@
+import hashlib
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .serp_cache import normalize_url
+
+
+class BloomFilter:
+    """
+    布隆过滤器：按容量 capacity 与误判率 fpr 计算位数组大小与哈希次数
+    位数 m = -n·ln(p) / ln(2)²，哈希次数 k = m/n·ln(2)；1% 误判率约 9.6 bit/条
+    """
+
+    def __init__(self, capacity: int, fpr: float):
+        self.capacity = max(1, int(capacity))
+        self.fpr = fpr
+        self.size = max(8, math.ceil(-self.capacity * math.log(fpr) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        """双重哈希：一次 blake2b 拆成两个 64 位值，派生 k 个位置"""
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def add(self, item: str) -> bool:
+        """
+        加入元素
+        :return: True 表示此前不存在（新元素），False 表示（可能）已存在
+        """
+        bits = self._bits
+        added = False
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class RollingBloomFilter:
+    """
+    滚动时间窗口的布隆过滤器：每 window 秒新开一代，最多保留 generations 代
+    查询覆盖所有保留的代，内存上限为 generations 个过滤器之和
+    """
+
+    def __init__(self, capacity: int, fpr: float, window: float, generations: int):
+        self.capacity = capacity
+        self.fpr = fpr
+        self.window = window
+        self.generations = max(1, generations)
+        self._filters: List[BloomFilter] = [BloomFilter(capacity, fpr)]
+        self._rotated_at = time.monotonic()
+
+    def _maybe_rotate(self) -> None:
+        now = time.monotonic()
+        if now - self._rotated_at < self.window and self._filters[-1].count < self.capacity:
+            return
+        self._filters.append(BloomFilter(self.capacity, self.fpr))
+        del self._filters[:-self.generations]
+        self._rotated_at = now
+
+    def add(self, item: str) -> bool:
+        """加入元素，任一代中已存在则返回 False"""
+        self._maybe_rotate()
+        if any(item in f for f in self._filters[:-1]):
+            return False
+        return self._filters[-1].add(item)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(f.nbytes for f in self._filters)
+
+
+class UrlDeduplicator:
+    """
+    发布前的 URL 去重
+    - 任务级：每个任务一个布隆过滤器，容量按页数估算，任务结束时释放
+    - 全局级（可选）：跨任务的滚动窗口过滤器，抑制近期任意任务已发布过的 URL
+    """
+
+    def __init__(self, config: dict):
+        self._config = config
+        self._tasks: Dict[str, BloomFilter] = {}
+        task_conf = config["task"]
+        self._task_fpr = task_conf["fpr"]
+        self._task_min = task_conf["min_capacity"]
+        self._task_max = task_conf["max_capacity"]
+        self._per_page = task_conf["results_per_page"]
+        global_conf = config["global"]
+        self._global: Optional[RollingBloomFilter] = None
+        if global_conf.get("enabled"):
+            self._global = RollingBloomFilter(
+                global_conf["capacity"], global_conf["fpr"],
+                global_conf["window"], global_conf["generations"]
+            )
+        self.suppressed = 0
+
+    def open_task(self, task_id, total_pages: int) -> None:
+        """为任务创建过滤器，容量按 页数 × 每页结果数 估算"""
+        capacity = min(self._task_max, max(self._task_min, total_pages * self._per_page))
+        self._tasks[str(task_id)] = BloomFilter(capacity, self._task_fpr)
+
+    def close_task(self, task_id) -> None:
+        """任务结束，释放其过滤器"""
+        self._tasks.pop(str(task_id), None)
+
+    def filter(self, task_id, links: List[dict], key: str = "href") -> Tuple[List[dict], int]:
+        """
+        过滤掉已发布过的链接
+        :param task_id: 任务 ID
+        :param links: 解析出的链接列表
+        :param key: 作为去重依据的字段
+        :return: (保留的链接, 被抑制的条数)
+        """
+        if not self._config.get("enabled", True):
+            return links, 0
+        task_filter = self._tasks.get(str(task_id))
+        kept = []
+        for link in links:
+            url = normalize_url(link[key])
+            if task_filter is not None and not task_filter.add(url):
+                continue
+            if self._global is not None and not self._global.add(url):
+                continue
+            kept.append(link)
+        suppressed = len(links) - len(kept)
+        self.suppressed += suppressed
+        return kept, suppressed
+
+    def stats(self) -> dict:
+        """返回去重统计快照"""
+        return {
+            "suppressed": self.suppressed,
+            "activeTasks": len(self._tasks),
+            "taskBytes": sum(f.nbytes for f in self._tasks.values()),
+            "globalBytes": self._global.nbytes if self._global is not None else 0,
+        }
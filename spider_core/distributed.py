@@ -0,0 +1,153 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Tuple
+
+
+class PageTracker:
+    """
+    协调者侧的任务进度汇总与页投递名额
+    按页码去重 worker 回执（消息重投时同一页可能回报多次），保证每页只计一次，
+    全部页完成时 finished 被置位，由协调者只发一次终态。
+    在途页（已投递、尚未回执）不超过 concurrency：任务的并发上限对整个集群生效，与 worker 进程数无关；
+    worker 交还的重试页到期后重新排入投递。
+    worker 首次取到某任务的页时先回报 delivered；此前页任务仍排在共享页队列里，不计入回执超时。
+    """
+
+    def __init__(self, task_id, total_pages: int, concurrency: Optional[int] = None,
+                 keywords=(), engine: str = "bing"):
+        self.task_id = task_id
+        self.total_pages = total_pages
+        self.concurrency = max(1, concurrency or total_pages)
+        # worker 转交的结果由协调者去重后发布，需要任务的关键词与引擎
+        self.keywords = keywords
+        self.engine = engine
+        self.finished = asyncio.Event()
+        self.lock = asyncio.Lock()  # 按到达顺序逐条处理回执，保证结果先于完成进度与终态发布
+        self.last_report = None  # 最近一条回执（含 delivered）的时间，None 表示还没有页被 worker 取走
+        self._done_pages = set()
+        self._in_flight = set()
+        self._next_page = 1
+        self._retries: deque = deque()  # 到期待重新投递的 (页码, 第几次尝试)
+        self._changed = asyncio.Event()
+        self._workers = set()
+        self.results = 0
+        self.suppressed = 0
+        self.cache_hits = 0
+        self.failed = 0
+        self.retried = 0
+        self.limits = {}  # 最近一条回执中 worker 的自适应限额
+        if total_pages <= 0:
+            self.finished.set()
+
+    @property
+    def completed(self) -> int:
+        return len(self._done_pages)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def next_page(self) -> Optional[Tuple[int, int]]:
+        """
+        等待一个投递名额
+        :return: (页码, 第几次尝试)；所有页都已完成时返回 None
+        """
+        while not self.finished.is_set():
+            if len(self._in_flight) < self.concurrency:
+                page = None
+                if self._retries:
+                    page = self._retries.popleft()
+                elif self._next_page <= self.total_pages:
+                    page = (self._next_page, 1)
+                    self._next_page += 1
+                if page is not None:
+                    if not self._in_flight and self.last_report is not None:
+                        # 在途页从无到有：回执超时从此刻重新计时，限速造成的投递空档不算停滞
+                        self.last_report = time.monotonic()
+                    self._in_flight.add(page[0])
+                    return page
+            self._changed.clear()
+            await self._changed.wait()
+        return None
+
+    def retry(self, page_no: int, attempt: int, delay: float) -> bool:
+        """
+        worker 交还一页：释放其名额，delay 秒后重新排入投递
+        :return: False 表示该页已完成或不在途（重复的回执）
+        """
+        self.last_report = time.monotonic()
+        if page_no not in self._in_flight:
+            return False
+        self._in_flight.discard(page_no)
+        self.retried += 1
+        asyncio.get_running_loop().call_later(delay, self._requeue, page_no, attempt)
+        self._changed.set()
+        return True
+
+    def _requeue(self, page_no: int, attempt: int):
+        if not self.finished.is_set() and page_no not in self._done_pages:
+            self._retries.append((page_no, attempt))
+            self._changed.set()
+
+    def record_links(self, published: int, suppressed: int) -> None:
+        """累计协调者去重后发布的结果数与抑制数"""
+        self.last_report = time.monotonic()
+        self.results += published
+        self.suppressed += suppressed
+
+    def record(self, report: dict) -> bool:
+        """
+        记录一条页回执
+        :param report: worker 上报的 {pageNo, status, cacheHit, worker}，
+                       status 为 delivered 时只表示页已被取走；结果数由 record_links 单独累计
+        :return: True 表示首次完成该页（需要更新进度）
+        """
+        self.last_report = time.monotonic()
+        page_no = report.get("pageNo")
+        if report.get("status") in ("delivered", "skipped") or page_no in self._done_pages:
+            return False
+        self._done_pages.add(page_no)
+        self._in_flight.discard(page_no)
+        self._changed.set()
+        self._workers.add(report.get("worker"))
+        self.limits = report.get("limits") or self.limits
+        self.cache_hits += 1 if report.get("cacheHit") else 0
+        self.failed += 1 if report.get("status") == "failed" else 0
+        if self.completed >= self.total_pages:
+            self.finished.set()
+        return True
+
+    def stalled(self, timeout: float) -> bool:
+        """已有页被取走，仍有页在途，且超过 timeout 秒没有新的回执"""
+        return (self.last_report is not None and bool(self._in_flight)
+                and time.monotonic() - self.last_report > timeout)
+
+    def progress_stats(self) -> dict:
+        """附加到进度信封中的汇总指标"""
+        return {
+            "cacheHits": self.cache_hits,
+            "suppressed": self.suppressed,
+            "failedPages": self.failed,
+            "retriedPages": self.retried,
+            "inFlightPages": len(self._in_flight),
+            "workers": len(self._workers),
+            **self.limits,
+        }
+
+
+class RecentSet:
+    """容量有限的集合，超出时淘汰最早加入的元素（用于记录已停止的任务）"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[str, None]" = OrderedDict()
+
+    def add(self, item: str) -> None:
+        self._items[item] = None
+        self._items.move_to_end(item)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def __contains__(self, item: str) -> bool:
+        return item in self._items
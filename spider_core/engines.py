@@ -0,0 +1,163 @@
+"""
+搜索引擎插件注册表
+每个引擎声明 URL 构建、翻页规则与解析函数（选择器/正则在 parsers 模块导入时预编译）。
+新增引擎只需继承 SearchEngine、实现 build_url 与 parse 并 register_engine，无需改动 CrawlerService 的爬取循环；
+漏实现抽象方法的插件在实例化（即注册前）就会报 TypeError。
+"""
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from .parsers import bing_stream_parser, parse_baidu_links, parse_bing_links
+
+
+class CaptchaScanner:
+    """
+    流式下载时逐块检查验证码标记
+    保留上一块末尾（最长标记长度 - 1）个字符与新块拼接后再检查，跨块边界的标记也能命中
+    """
+
+    def __init__(self, markers: Tuple[str, ...]):
+        self.markers = markers
+        self._keep = max(map(len, markers), default=1) - 1
+        self._tail = ""
+
+    def feed(self, text: str) -> bool:
+        """喂入一块已解码文本，命中任一标记返回 True"""
+        window = self._tail + text
+        self._tail = window[-self._keep:] if self._keep else ""
+        return any(marker in window for marker in self.markers)
+
+
+class SearchEngine(ABC):
+    """搜索引擎插件基类"""
+
+    name = ""
+    results_per_page = 10
+    captcha_markers: Tuple[str, ...] = ()  # 出现任一标记即视为验证码/风控页
+
+    def __init__(self):
+        # 解析耗时统计（在主进程中累计）
+        self.parse_count = 0
+        self.parse_seconds = 0.0
+        self.parse_results = 0
+
+    def encode_query(self, keywords: List[str]) -> str:
+        """关键词 URL 编码后以 + 连接"""
+        return '+'.join(quote(kw, safe='', encoding='utf-8') for kw in keywords)
+
+    def page_offset(self, page_no: int) -> int:
+        """第 page_no 页（从 1 开始）对应的结果偏移量"""
+        return (max(1, page_no) - 1) * self.results_per_page
+
+    @abstractmethod
+    def build_url(self, keywords: List[str], page_no: int) -> str:
+        """构建第 page_no 页的搜索 URL"""
+
+    @abstractmethod
+    def parse(self, html_content: str) -> List[Dict[str, str]]:
+        """从结果页 HTML 中提取链接"""
+
+    def is_captcha(self, html_content: str) -> bool:
+        """判断页面是否为验证码/风控页"""
+        return any(marker in html_content for marker in self.captcha_markers)
+
+    def captcha_scanner(self) -> CaptchaScanner:
+        """创建流式下载用的验证码检查器（每页一个）"""
+        return CaptchaScanner(self.captcha_markers)
+
+    def stream_parser(self):
+        """
+        创建增量解析器（需提供 feed(chunk) / close()，均返回新闭合的结果列表）
+        :return: 不支持流式解析时返回 None
+        """
+        return None
+
+    def record_parse(self, seconds: float, results: int) -> None:
+        """累计一次解析的耗时与结果数"""
+        self.parse_count += 1
+        self.parse_seconds += seconds
+        self.parse_results += results
+
+    def stats(self) -> dict:
+        """返回解析统计快照"""
+        return {
+            "pages": self.parse_count,
+            "results": self.parse_results,
+            "parseSeconds": round(self.parse_seconds, 4),
+            "avgParseMs": round(self.parse_seconds / self.parse_count * 1000, 3) if self.parse_count else 0.0,
+        }
+
+
+class BingEngine(SearchEngine):
+    """Bing：first 参数从 1 开始"""
+
+    name = "bing"
+    base_url = "https://www.cn.bing.com/search"
+    captcha_markers = ('id="b_captcha"', '/challenge/verify')
+
+    def build_url(self, keywords: List[str], page_no: int) -> str:
+        return f"{self.base_url}?q={self.encode_query(keywords)}&first={self.page_offset(page_no) + 1}"
+
+    def parse(self, html_content: str) -> List[Dict[str, str]]:
+        return parse_bing_links(html_content)
+
+    def stream_parser(self):
+        return bing_stream_parser()
+
+
+class BaiduEngine(SearchEngine):
+    """百度：pn 参数从 0 开始"""
+
+    name = "baidu"
+    base_url = "https://www.baidu.com/s"
+    captcha_markers = ("wappass.baidu.com", "百度安全验证")
+
+    def build_url(self, keywords: List[str], page_no: int) -> str:
+        return (f"{self.base_url}?ie=utf-8&f=8&rsv_bp=1&rsv_idx=1&tn=baidu"
+                f"&wd={self.encode_query(keywords)}&pn={self.page_offset(page_no)}")
+
+    def parse(self, html_content: str) -> List[Dict[str, str]]:
+        return parse_baidu_links(html_content)
+
+
+ENGINES: Dict[str, SearchEngine] = {}
+
+
+def register_engine(engine: SearchEngine) -> SearchEngine:
+    """注册（或替换）一个引擎实例"""
+    if not isinstance(engine, SearchEngine):
+        raise TypeError(f"引擎应为 SearchEngine 实例，实际为 {type(engine).__name__}")
+    ENGINES[engine.name] = engine
+    return engine
+
+
+def get_engine(name: str) -> Optional[SearchEngine]:
+    """按名称获取引擎，不存在时返回 None"""
+    return ENGINES.get(name)
+
+
+def parse_serp(html_content: str, engine: SearchEngine) -> Tuple[List[Dict[str, str]], float]:
+    """
+    解析结果页并计时（模块级函数，可交给进程池执行）
+    :return: (链接列表, 解析耗时秒数)
+    """
+    start = time.perf_counter()
+    links = engine.parse(html_content)
+    return links, time.perf_counter() - start
+
+
+def parse_links(html_content: str, engine: str = "bing") -> List[Dict[str, str]]:
+    """从 HTML 中提取链接（同步解析，不做网络请求）；未知引擎返回空列表"""
+    search_engine = get_engine(engine)
+    return search_engine.parse(html_content) if search_engine else []
+
+
+def engine_stats() -> Dict[str, dict]:
+    """所有引擎的解析统计"""
+    return {name: engine.stats() for name, engine in ENGINES.items()}
+
+
+register_engine(BingEngine())
+register_engine(BaiduEngine())
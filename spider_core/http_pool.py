@@ -0,0 +1,72 @@
+from typing import Dict, Optional
+
+import aiohttp
+
+
+class HttpClientPool:
+    """
+    进程级 HTTP 客户端池
+    - 所有引擎共用一个 TCPConnector：limit 为全局连接上限，limit_per_host 为单主机上限，
+      连接在任务之间 keep-alive 复用，DNS/TCP/TLS 握手只付一次
+    - 每个任务一个 ClientSession（独立 CookieJar，与原先每任务一个会话的 Cookie 语义一致），
+      只是复用共享连接器；任务结束时 release 关闭会话，不关闭连接器。
+      不绑定默认请求头，请求头由调用方逐请求传入
+    """
+
+    def __init__(self, config: dict):
+        self._config = config
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+
+    async def start(self) -> None:
+        """创建共享连接器（需在事件循环中调用）"""
+        if self._connector is not None and not self._connector.closed:
+            return
+        self._connector = aiohttp.TCPConnector(
+            ssl=False,
+            limit=self._config["limit"],
+            limit_per_host=self._config["limit_per_host"],
+            ttl_dns_cache=self._config["ttl_dns_cache"],
+            keepalive_timeout=self._config["keepalive_timeout"],
+        )
+
+    def session(self, task_id) -> aiohttp.ClientSession:
+        """
+        获取某任务的会话，不存在时懒创建；Cookie 只在该任务内保留，不会带到后续任务
+        :param task_id: 任务 id
+        :return: 复用共享连接器的 ClientSession
+        """
+        if self._connector is None:
+            raise RuntimeError("HttpClientPool 尚未 start()")
+        key = str(task_id)
+        session = self._sessions.get(key)
+        if session is None or session.closed:
+            timeout_conf = self._config["timeout"]
+            session = aiohttp.ClientSession(
+                connector=self._connector,
+                connector_owner=False,  # 连接器由池统一关闭
+                timeout=aiohttp.ClientTimeout(
+                    total=timeout_conf["total"],
+                    connect=timeout_conf["connect"],
+                    sock_read=timeout_conf["sock_read"],
+                ),
+                cookie_jar=aiohttp.CookieJar(),
+            )
+            self._sessions[key] = session
+        return session
+
+    async def release(self, task_id) -> None:
+        """任务结束：关闭其会话（连同 Cookie），连接留在共享连接器中复用"""
+        session = self._sessions.pop(str(task_id), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def close(self) -> None:
+        """关闭所有会话与共享连接器"""
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        self._sessions.clear()
+        if self._connector is not None and not self._connector.closed:
+            await self._connector.close()
+        self._connector = None
@@ -0,0 +1,147 @@
+"""
+结构化异步日志
+- 调用方只把 LogRecord 放进有界内存队列，格式化与写 stdout 在 QueueListener 后台线程完成；
+  日志管道堵塞时事件循环不会被卡住，队列满则丢弃并计数
+- 按 event（消息类型）采样：高频事件只保留 1/N，WARNING 及以上从不采样
+- task_id / page_no 等通过 extra 传入，作为 key=value 字段附加在行尾
+- 级别与采样率可在运行时调整（set_level / set_sample_rate，或控制广播 log_level 命令）
+"""
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Dict, Optional
+
+ROOT_LOGGER = "spider_core"
+
+# 以结构化字段输出的 extra 键
+STRUCTURED_FIELDS = ("task_id", "page_no", "engine", "attempt", "reason", "worker", "event")
+
+
+class StructuredFormatter(logging.Formatter):
+    """在常规格式后追加 ` | task_id=.. page_no=..` 结构化字段"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = [f"{key}={getattr(record, key)}" for key in STRUCTURED_FIELDS if hasattr(record, key)]
+        return f"{line} | {' '.join(fields)}" if fields else line
+
+
+class SamplingFilter(logging.Filter):
+    """
+    按 event 采样：rate=0.1 表示每 10 条保留 1 条（计数采样，无随机数开销）
+    未带 event 或未配置采样率的记录全部保留
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._seen: Dict[str, int] = {}
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        event = getattr(record, "event", None)
+        rate = self.rates.get(event, 1.0) if event else 1.0
+        if rate >= 1.0:
+            return True
+        seen = self._seen.get(event, 0)
+        self._seen[event] = seen + 1
+        if rate > 0 and seen % round(1 / rate) == 0:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃记录而不是阻塞调用方；消息格式化推迟到监听线程"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 只有异常信息需要在当前线程展开（traceback 对象不能跨线程延后处理），其余原样入队
+        if record.exc_info:
+            return super().prepare(record)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: Optional[DroppingQueueHandler] = None
+_sampler: Optional[SamplingFilter] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """获取 spider_core 下的模块 logger"""
+    return logging.getLogger(name if name.startswith(ROOT_LOGGER) else f"{ROOT_LOGGER}.{name}")
+
+
+def configure_logging(config: dict) -> None:
+    """
+    为 spider_core 日志安装队列处理器与后台监听线程（重复调用时先关闭旧的）
+    :param config: LOG_CONFIG
+    """
+    global _handler, _sampler, _listener
+    shutdown_logging()
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(StructuredFormatter(config["format"]))
+    _handler = DroppingQueueHandler(queue.Queue(maxsize=config["queue_size"]))
+    _sampler = SamplingFilter(config.get("sample_rates", {}))
+    _handler.addFilter(_sampler)
+    _listener = logging.handlers.QueueListener(_handler.queue, stream)
+    _listener.start()
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.handlers = [_handler]
+    logger.propagate = False
+    for name, level in config.get("levels", {}).items():
+        set_level(level, name)
+    set_level(config["level"])
+
+
+def shutdown_logging() -> None:
+    """停止监听线程，输出队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def reset_child_logging() -> None:
+    """进程池子进程初始化：继承来的队列没有监听线程消费，改为直接写 stderr"""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(StructuredFormatter("%(asctime)s - %(levelname)s - %(message)s"))
+    logging.getLogger(ROOT_LOGGER).handlers = [handler]
+
+
+def set_level(level, name: str = ROOT_LOGGER) -> None:
+    """
+    运行时调整日志级别
+    :param level: 级别名（"DEBUG"）或数值
+    :param name: logger 名，默认整个 spider_core
+    """
+    logging.getLogger(name).setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def set_sample_rate(event: str, rate: float) -> None:
+    """运行时调整某类事件的采样率（1 为全部保留，0 为全部丢弃）"""
+    if _sampler is not None:
+        _sampler.rates[event] = rate
+
+
+def stats() -> dict:
+    """返回日志管道统计快照"""
+    return {
+        "queued": _handler.queue.qsize() if _handler is not None else 0,
+        "dropped": _handler.dropped if _handler is not None else 0,
+        "sampledOut": _sampler.sampled_out if _sampler is not None else 0,
+    }
@@ -0,0 +1,42 @@
+"""
+python manage.py persist_results [--batch-size N] [--flush-interval S]
+消费结果消息并按批写入 CrawledResult，见 spider_core.persistence
+"""
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from spider_core import log, metrics
+from spider_core.configs import LOG_CONFIG, METRICS_CONFIG, PERSIST_CONFIG
+from spider_core.persistence import ResultPersister
+
+
+class Command(BaseCommand):
+    help = "消费爬取结果消息，按批写入 CrawledResult"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=PERSIST_CONFIG["batch_size"], help="每批最多写入的行数")
+        parser.add_argument("--flush-interval", type=float, default=PERSIST_CONFIG["flush_interval"],
+                            help="批次最长等待秒数")
+
+    def handle(self, *args, **options):
+        config = {**PERSIST_CONFIG, "batch_size": options["batch_size"], "flush_interval": options["flush_interval"]}
+        log.configure_logging(LOG_CONFIG)
+        try:
+            asyncio.run(self._run(config))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            log.shutdown_logging()
+
+    async def _run(self, config: dict):
+        persister = ResultPersister(config)
+        metrics.REGISTRY.register_collector("persist", persister.stats)
+        runner = None
+        if METRICS_CONFIG["enabled"]:
+            runner = await metrics.start_http_server(metrics.REGISTRY, METRICS_CONFIG["host"], config["metrics_port"])
+        try:
+            await persister.run()
+        finally:
+            if runner is not None:
+                await runner.cleanup()
@@ -0,0 +1,211 @@
+"""
+进程内指标：计数器、直方图与 Prometheus 文本格式导出
+- 热路径上只做一次字典查找与加法（直方图多一次 bisect），不加锁：所有记录都在事件循环线程内完成
+- 已有组件的 stats() 快照通过 register_collector 在导出时才采集，平时零开销
+"""
+import re
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# 延迟类直方图的默认分桶（秒）
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 每页结果数分桶
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_CAMEL = re.compile(r'(?<=[a-z0-9])([A-Z])')
+
+
+def _snake(name: str) -> str:
+    """cacheHits -> cache_hits"""
+    return _CAMEL.sub(r'_\1', name).lower()
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """单调递增计数器，labels 以元组形式按 labelnames 顺序传入"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, labels: Tuple = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self):
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """累积分桶直方图，输出 _bucket / _sum / _count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [各桶计数..., +Inf 桶计数, 总和]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, labels: Tuple = ()) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, labels: Tuple = ()) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self):
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class MetricsRegistry:
+    """指标注册表：持有本进程的计数器、直方图与 stats() 采集器"""
+
+    def __init__(self, namespace: str = "crawler"):
+        self.namespace = namespace
+        self._metrics: Dict[str, object] = {}
+        self._collectors: Dict[str, Tuple[Callable[[], dict], Optional[str]]] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(f"{self.namespace}_{name}", documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(f"{self.namespace}_{name}", documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        # 同名指标重复定义时返回已有实例（模块重载、多个服务实例）
+        return self._metrics.setdefault(metric.name, metric)
+
+    def register_collector(self, prefix: str, collect: Callable[[], dict], label: Optional[str] = None) -> None:
+        """
+        注册 stats() 采集器，导出时把数值字段转成 gauge：<namespace>_<prefix>_<字段>
+        :param prefix: 指标名前缀，同名前缀重复注册时覆盖
+        :param collect: 返回 {字段: 数值}；指定 label 时返回 {标签值: {字段: 数值}}
+        :param label: 标签名
+        """
+        self._collectors[prefix] = (collect, label)
+
+    def _render_collectors(self):
+        gauges: Dict[str, list] = {}
+        for prefix, (collect, label) in self._collectors.items():
+            try:
+                stats = collect()
+            except Exception:
+                continue
+            groups = stats.items() if label else [(None, stats)]
+            for label_value, fields in groups:
+                for field, value in fields.items():
+                    if isinstance(value, bool):
+                        value = int(value)
+                    if not isinstance(value, (int, float)):
+                        continue
+                    name = f"{self.namespace}_{prefix}_{_snake(field)}"
+                    labels = f'{{{label}="{_escape(label_value)}"}}' if label else ""
+                    gauges.setdefault(name, []).append(f"{name}{labels} {_format_value(value)}")
+        for name, lines in gauges.items():
+            yield f"# TYPE {name} gauge"
+            yield from lines
+
+    def render(self) -> str:
+        """按 Prometheus 文本格式（0.0.4）导出全部指标"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        lines.extend(self._render_collectors())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = MetricsRegistry()
+
+# ---------------------------------------------------------------------------
+# 爬虫 worker 的流水线指标
+# ---------------------------------------------------------------------------
+
+QUEUE_WAIT = REGISTRY.histogram("queue_wait_seconds", "页从入队到被 worker 取出的等待时间", ["engine"])
+RATE_LIMIT_WAIT = REGISTRY.histogram("rate_limit_wait_seconds", "请求在令牌桶上的等待时间", ["engine"])
+FETCH_SECONDS = REGISTRY.histogram("fetch_seconds", "SERP 请求耗时", ["engine", "outcome"])
+DOWNLOADED_BYTES = REGISTRY.counter("downloaded_bytes_total", "下载的响应体字节数", ["engine"])
+PARSE_SECONDS = REGISTRY.histogram("parse_seconds", "单页解析耗时", ["engine"])
+PUBLISH_SECONDS = REGISTRY.histogram("publish_seconds", "一批结果发布到交换机的耗时", ["engine"])
+RESULTS_PER_PAGE = REGISTRY.histogram("results_per_page", "每页去重后发布的结果数", ["engine"], COUNT_BUCKETS)
+PAGES = REGISTRY.counter("pages_total", "处理完成的页数", ["engine", "status"])
+RETRIES = REGISTRY.counter("retries_total", "安排的重试次数", ["engine", "reason"])
+
+# ---------------------------------------------------------------------------
+# Django 端指标
+# ---------------------------------------------------------------------------
+
+COMMANDS_PUBLISHED = REGISTRY.counter("commands_published_total", "发布到命令交换机的命令数", ["cmd"])
+COMMAND_PUBLISH_SECONDS = REGISTRY.histogram("command_publish_seconds", "命令发布耗时（含建连）", ["cmd"])
+SSE_CONNECTIONS = REGISTRY.counter("sse_connections_total", "SSE 连接数", ["state"])
+SSE_EVENTS = REGISTRY.counter("sse_events_total", "推送给 SSE 客户端的事件数", ["event"])
+SSE_HUB_MESSAGES = REGISTRY.counter("sse_hub_messages_total", "SSE 分发中心收到的消息数", ["outcome"])
+SSE_DROPPED = REGISTRY.counter("sse_dropped_total", "因订阅者过慢丢弃的事件数与断开的订阅者数", ["reason"])
+
+# ---------------------------------------------------------------------------
+# 结果入库指标
+# ---------------------------------------------------------------------------
+
+PERSIST_BATCH_SECONDS = REGISTRY.histogram("persist_batch_seconds", "一批结果写库（含事务提交）的耗时")
+PERSIST_ROWS = REGISTRY.counter("persist_rows_total", "处理的结果行数", ["outcome"])
+PERSIST_BATCHES = REGISTRY.counter("persist_batches_total", "写库批次数", ["status"])
+
+
+async def start_http_server(registry: MetricsRegistry, host: str, port: int):
+    """
+    启动只提供 GET /metrics 的小型 HTTP 监听（aiohttp）
+    :return: AppRunner，关闭时调用 cleanup()
+    """
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(body=registry.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,74 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from .log import reset_child_logging
+
+
+class ParseExecutor:
+    """
+    HTML 解析执行器：把 CPU 密集的解析移出事件循环
+    - kind="process"（默认）使用进程池，吞吐随 CPU 核数扩展；kind="thread" 使用线程池
+    - max_pending 限制同时排队/执行的解析任务数，超出时调用方在此等待（背压）
+    - 小于 inline_threshold 字节的页面直接在当前线程解析，省去跨进程传输开销
+    """
+
+    def __init__(self, config: dict):
+        self.kind = config.get("kind", "process")
+        self.max_workers = config.get("max_workers") or os.cpu_count() or 1
+        self.max_pending = config.get("max_pending") or self.max_workers * 4
+        self.inline_threshold = config.get("inline_threshold", 0)
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        # 统计指标
+        self.inline_count = 0
+        self.offloaded_count = 0
+        self.pending = 0
+
+    def start(self) -> None:
+        """创建执行器（需在事件循环中调用）"""
+        if self._executor is not None:
+            return
+        if self.kind == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="parse")
+        else:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=reset_child_logging)
+        self._slots = asyncio.Semaphore(self.max_pending)
+
+    async def run(self, func: Callable[..., List[dict]], html: str, *args) -> List[dict]:
+        """
+        执行解析函数
+        :param func: 模块级解析函数（进程池要求可 pickle），签名 func(html, *args)
+        :param html: 页面 HTML
+        :return: 解析函数的返回值
+        """
+        if self._executor is None or len(html) < self.inline_threshold:
+            self.inline_count += 1
+            return func(html, *args)
+
+        self.pending += 1
+        try:
+            async with self._slots:
+                self.offloaded_count += 1
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, func, html, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        """关闭执行器，丢弃尚未开始的解析任务"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        """返回执行器统计快照"""
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "pending": self.pending,
+            "inline": self.inline_count,
+            "offloaded": self.offloaded_count,
+        }
@@ -0,0 +1,385 @@
+"""
+SERP 解析
+Bing 有三个可选后端：
+- bs4: BeautifulSoup + html.parser，参考实现，行为以它为准
+- lxml: libxml2 解析 + 预编译 XPath
+- selectolax: lexbor 解析 + CSS 选择器
+所有后端输出与 bs4 完全一致的 dict 列表；通过 PARSER_CONFIG["backend"] 按部署选择。
+BingStreamParser 基于 lxml 增量解析，供流式抓取在结果闭合时立即产出。
+百度使用 BeautifulSoup，匹配用的正则在导入时编译一次。
+"""
+import re
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from .configs import PARSER_CONFIG
+from .log import get_logger
+
+try:
+    from lxml import etree
+except ImportError:  # 可选依赖
+    etree = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # 可选依赖
+    LexborHTMLParser = None
+
+# get_text 不计入的标签（与 bs4 的 Script/Stylesheet/TemplateString 对齐）
+_SKIP_TEXT_TAGS = frozenset({"script", "style", "template"})
+
+logger = get_logger(__name__)
+
+
+def _bing_link(title: str, href: str, data_url: Optional[str], source: Optional[str]) -> Dict[str, str]:
+    """
+    按 Bing 规则组装一条结果（各后端共用，保证输出一致）
+    :param title: 标题文本
+    :param href: h2 > a 的 href
+    :param data_url: a 的 data-url 属性
+    :param source: cite 文本，None 表示无 cite
+    """
+    # href 为 bing.com/ck/ 跳转或相对地址时，优先用 data-url
+    if 'bing.com/ck/' in href or not href.startswith('http'):
+        real_url = data_url or href
+    else:
+        real_url = href
+    return {
+        'title': title,
+        'href': real_url,
+        'source': source if source is not None else '未知来源',
+        'engine': 'bing'
+    }
+
+
+def _join_stripped(parts: List[str]) -> str:
+    """等价于 bs4 get_text(strip=True)：逐段 strip、丢弃空段、直接拼接"""
+    return ''.join(s for s in (p.strip() for p in parts) if s)
+
+
+# ---------------------------------------------------------------------------
+# bs4 参考实现
+# ---------------------------------------------------------------------------
+
+def parse_links_bs4(html_content: str, engine: str = "bing") -> List[Dict[str, str]]:
+    """从 HTML 中提取链接（BeautifulSoup 参考实现）"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    results = []
+
+    if engine == "bing":
+        items = (
+                soup.find_all('li', class_='b_algo') or  # 标准结果
+                soup.find_all('div', class_='b_algo') or  # 备选
+                soup.select('.b_algo')  # CSS 选择器
+        )
+        for item in items:
+            try:
+                title_tag = item.find('h2')
+                if not title_tag:
+                    continue
+                link_tag = title_tag.find('a')
+                if not link_tag or not link_tag.get('href'):
+                    continue
+                source = item.find('cite')  # ⚠️ cite 标签通常包含真实域名
+                results.append(_bing_link(
+                    title_tag.get_text(strip=True),
+                    link_tag.get('href', ''),
+                    link_tag.get('data-url'),
+                    source.get_text(strip=True) if source else None,
+                ))
+            except Exception as e:
+                logger.warning("解析失败: %s", e)
+                continue
+    return results
+
+
+# ---------------------------------------------------------------------------
+# lxml 后端：XPath 在导入时编译一次
+# ---------------------------------------------------------------------------
+
+if etree is not None:
+    # 以 UTF-8 字节喂入：str 输入遇到 <?xml ... encoding=...?> 声明时 lxml 会直接抛 ValueError
+    _HTML_PARSER = etree.HTMLParser(encoding="utf-8")
+    _CLASS_B_ALGO = "contains(concat(' ', normalize-space(@class), ' '), ' b_algo ')"
+    _XP_BING_ITEMS = (
+        etree.XPath(f"//li[{_CLASS_B_ALGO}]"),
+        etree.XPath(f"//div[{_CLASS_B_ALGO}]"),
+        etree.XPath(f"//*[{_CLASS_B_ALGO}]"),
+    )
+    _XP_FIRST_H2 = etree.XPath("(.//h2)[1]")
+    _XP_FIRST_A = etree.XPath("(.//a)[1]")
+    _XP_FIRST_CITE = etree.XPath("(.//cite)[1]")
+
+
+def _lxml_text(el) -> str:
+    """lxml 元素的 get_text(strip=True) 等价实现（跳过注释与脚本/样式）"""
+    parts: List[str] = []
+
+    def walk(node):
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            # 注释/处理指令的 tag 不是字符串；脚本与样式整棵跳过，但其 tail 属于父节点文本
+            if isinstance(child.tag, str) and child.tag not in _SKIP_TEXT_TAGS:
+                walk(child)
+            if child.tail:
+                parts.append(child.tail)
+
+    walk(el)
+    return _join_stripped(parts)
+
+
+def _lxml_bing_item(item) -> Optional[Dict[str, str]]:
+    """从一个 b_algo 元素提取结果，缺少标题或链接时返回 None"""
+    try:
+        title_tag = _XP_FIRST_H2(item)
+        if not title_tag:
+            return None
+        link_tag = _XP_FIRST_A(title_tag[0])
+        if not link_tag or not link_tag[0].get('href'):
+            return None
+        source = _XP_FIRST_CITE(item)
+        return _bing_link(
+            _lxml_text(title_tag[0]),
+            link_tag[0].get('href'),
+            link_tag[0].get('data-url'),
+            _lxml_text(source[0]) if source else None,
+        )
+    except Exception as e:
+        logger.warning("解析失败: %s", e)
+        return None
+
+
+def parse_links_lxml(html_content: str, engine: str = "bing") -> List[Dict[str, str]]:
+    """从 HTML 中提取链接（lxml 后端）"""
+    results = []
+    if engine != "bing" or not html_content:
+        return results
+    root = etree.fromstring(html_content.encode("utf-8"), _HTML_PARSER)
+    if root is None:
+        return results
+
+    items = []
+    for xpath in _XP_BING_ITEMS:
+        items = xpath(root)
+        if items:
+            break
+    for item in items:
+        link = _lxml_bing_item(item)
+        if link is not None:
+            results.append(link)
+    return results
+
+
+class BingStreamParser:
+    """
+    Bing 结果页的增量解析器
+    feed() 分块喂入 HTML，返回本块中可以确定的结果；close() 返回其余结果。
+    选择规则与 parse_links_bs4 一致：全文有 li.b_algo 时只取 li.b_algo，否则取 div.b_algo，
+    再否则取任意标签的 .b_algo；嵌套的 b_algo 各算一条，按开始标签的文档顺序输出。
+    li.b_algo 一旦闭合即可确定产出（按文档顺序，等待先开始的外层闭合）；
+    div 与其他标签的结果要到全文结束才知道是否轮到它们，先提取成 dict 缓存，close() 时再决定。
+    不在任何 b_algo 内部的已闭合元素立即清空并从父节点摘除，整页 HTML 与完整 DOM 不会同时驻留内存。
+    """
+
+    def __init__(self):
+        self._parser = etree.HTMLPullParser(events=("start", "end"))
+        self._open = []  # 未闭合的 b_algo 的结果槽（栈）
+        # 各层级按开始顺序排列的结果槽 [结果, 是否已闭合]；li 槽产出后即移除
+        self._slots = {"li": deque(), "div": [], "other": []}
+        self._seen_li = False
+
+    def feed(self, chunk: str) -> List[Dict[str, str]]:
+        """喂入一块 HTML，返回新确定的结果"""
+        if chunk:
+            self._parser.feed(chunk)
+        self._drain()
+        return self._flush_li()
+
+    def close(self) -> List[Dict[str, str]]:
+        """输入结束，返回剩余结果"""
+        self._parser.close()
+        self._drain()
+        if self._seen_li:
+            return self._flush_li()
+        tier = self._slots["div"] or self._slots["other"]
+        return [slot[0] for slot in tier if slot[0] is not None]
+
+    def _drain(self) -> None:
+        for event, el in self._parser.read_events():
+            if not isinstance(el.tag, str):
+                continue
+            if 'b_algo' in el.get('class', '').split():
+                if event == "start":
+                    slot = [None, False]
+                    self._open.append(slot)
+                    if el.tag == "li":
+                        if not self._seen_li:
+                            # 有 li.b_algo 时 div 与其他标签的结果都不会被采用
+                            self._seen_li = True
+                            self._slots["div"].clear()
+                            self._slots["other"].clear()
+                        self._slots["li"].append(slot)
+                    elif not self._seen_li:
+                        self._slots["div" if el.tag == "div" else "other"].append(slot)
+                    continue
+                slot = self._open.pop()
+                slot[:] = _lxml_bing_item(el), True
+            elif event == "start":
+                continue
+            if not self._open:
+                # 不在结果内部的已闭合子树不再需要：清空内容并摘除前面的兄弟节点
+                el.clear(keep_tail=True)
+                parent = el.getparent()
+                if parent is not None:
+                    while el.getprevious() is not None:
+                        del parent[0]
+
+    def _flush_li(self) -> List[Dict[str, str]]:
+        """按文档顺序产出开头连续已闭合的 li.b_algo 结果（嵌套时等外层闭合）"""
+        slots = self._slots["li"]
+        results = []
+        while slots and slots[0][1]:
+            link = slots.popleft()[0]
+            if link is not None:
+                results.append(link)
+        return results
+
+
+# ---------------------------------------------------------------------------
+# selectolax 后端
+# ---------------------------------------------------------------------------
+
+_CSS_BING_ITEMS = ("li.b_algo", "div.b_algo", ".b_algo")
+
+
+def _selectolax_text(node) -> str:
+    """selectolax 节点的 get_text(strip=True) 等价实现（跳过注释与脚本/样式）"""
+    parts: List[str] = []
+
+    def walk(n):
+        for child in n.iter(include_text=True):
+            tag = child.tag
+            if tag == '-text':
+                parts.append(child.text(deep=False))
+            elif not tag.startswith('-') and tag not in _SKIP_TEXT_TAGS:
+                walk(child)
+
+    walk(node)
+    return _join_stripped(parts)
+
+
+def parse_links_selectolax(html_content: str, engine: str = "bing") -> List[Dict[str, str]]:
+    """从 HTML 中提取链接（selectolax/lexbor 后端）"""
+    results = []
+    if engine != "bing" or not html_content:
+        return results
+    tree = LexborHTMLParser(html_content)
+
+    items = []
+    for selector in _CSS_BING_ITEMS:
+        items = tree.css(selector)
+        if items:
+            break
+    for item in items:
+        try:
+            title_tag = item.css_first('h2')
+            if title_tag is None:
+                continue
+            link_tag = title_tag.css_first('a')
+            if link_tag is None or not link_tag.attributes.get('href'):
+                continue
+            source = item.css_first('cite')
+            results.append(_bing_link(
+                _selectolax_text(title_tag),
+                link_tag.attributes.get('href'),
+                link_tag.attributes.get('data-url'),
+                _selectolax_text(source) if source is not None else None,
+            ))
+        except Exception as e:
+            logger.warning("解析失败: %s", e)
+            continue
+    return results
+
+
+# ---------------------------------------------------------------------------
+# 后端选择
+# ---------------------------------------------------------------------------
+
+PARSER_BACKENDS: Dict[str, Callable[[str, str], List[Dict[str, str]]]] = {"bs4": parse_links_bs4}
+if etree is not None:
+    PARSER_BACKENDS["lxml"] = parse_links_lxml
+if LexborHTMLParser is not None:
+    PARSER_BACKENDS["selectolax"] = parse_links_selectolax
+
+
+def get_parser(backend: Optional[str] = None) -> Callable[[str, str], List[Dict[str, str]]]:
+    """
+    获取解析后端；未安装对应依赖时回退到 bs4 参考实现
+    :param backend: 后端名，None 时取 PARSER_CONFIG["backend"]
+    """
+    name = backend or PARSER_CONFIG.get("backend", "bs4")
+    return PARSER_BACKENDS.get(name, parse_links_bs4)
+
+
+def parse_bing_links(html_content: str) -> List[Dict[str, str]]:
+    """从 Bing 结果页提取链接，使用配置的后端"""
+    return get_parser()(html_content, "bing")
+
+
+def bing_stream_parser() -> Optional["BingStreamParser"]:
+    """创建 Bing 增量解析器；未安装 lxml 时返回 None"""
+    return BingStreamParser() if etree is not None else None
+
+
+# ---------------------------------------------------------------------------
+# 百度（BeautifulSoup，正则预编译）
+# ---------------------------------------------------------------------------
+
+_RE_BAIDU_RESULT = re.compile(r'result')
+_RE_BAIDU_TITLE = re.compile(r'tts-title-content')
+_RE_BAIDU_LINK = re.compile(r'c-link')
+_RE_BAIDU_SHOWURL = re.compile(r'c-showurl|c-color-url')
+_RE_BAIDU_BLOCK = re.compile(r'block')
+_RE_BAIDU_SOURCE = re.compile(r'source')
+
+
+def parse_baidu_links(html_content: str) -> List[Dict[str, str]]:
+    """从百度结果页提取链接（容器 class 经常变，保留多选择器兜底策略）"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    results = []
+    for item in soup.find_all('div', class_=_RE_BAIDU_RESULT):
+        try:
+            title_tag = (item.find('span', class_=_RE_BAIDU_TITLE)
+                         or item.find('h3')
+                         or item.find('a'))
+
+            link_tag = (item.find('a', class_=_RE_BAIDU_LINK)
+                        or item.find('a', class_=_RE_BAIDU_SHOWURL)
+                        or item.find('a', class_=_RE_BAIDU_BLOCK))
+
+            if not link_tag:
+                # 兜底：找第一个非 baidu 域的外链
+                for a in item.find_all('a', href=True):
+                    if 'baidu.com' not in a['href']:
+                        link_tag = a
+                        break
+            if not link_tag:
+                link_tag = item.find('a', href=True)
+
+            source = item.find('span', class_=_RE_BAIDU_SOURCE) or item.find('cite')
+
+            if title_tag and link_tag and link_tag.get('href'):
+                results.append({
+                    'title': title_tag.get_text(strip=True),
+                    'href': link_tag['href'],
+                    'source': source.get_text(strip=True) if source else '未知来源',
+                    'engine': 'baidu'
+                })
+        except Exception as e:
+            logger.warning("解析百度结果项时出错: %s", e)
+            continue
+    return results
+
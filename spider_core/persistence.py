@@ -0,0 +1,212 @@
+"""
+结果入库：消费结果消息，按批写入 CrawledResult
+- 持久队列绑定 Topic 交换机的 task.*.result / task.*.resultBatch，与 SSE、SpringBoot 队列互不影响
+- 攒够 batch_size 行或距批次第一行超过 flush_interval 秒即写入；bulk_create(ignore_conflicts=True)
+  吸收 (task, url) 重复，事务提交后对批次最后一条消息 ack(multiple=True)，写库失败则整批重新入队
+- ORM 是同步的：写库放在单线程执行器里（复用同一个数据库连接），事件循环继续接收下一批
+- ON CONFLICT 不覆盖外键约束：所属 SpiderTask 不存在的行在写入前过滤掉并计数；
+  缓存中已确认的任务随后被删除时，写入触发 IntegrityError，丢弃本批次的任务缓存、重新过滤后重试一次，
+  避免整批无限重新入队
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import aio_pika
+from django.db import IntegrityError, close_old_connections, transaction
+
+from . import codecs, compression, metrics
+from .configs import AMQP_URL, TOPIC_EXCHANGE_CONFIG
+from .log import get_logger
+from .models import CrawledResult, SpiderTask
+
+logger = get_logger(__name__)
+
+# 已确认存在的任务 id 缓存上限，超出后清空重建
+_KNOWN_TASKS_LIMIT = 100000
+
+
+def result_rows(data: dict) -> Tuple[List[dict], int]:
+    """
+    从 result / resultBatch 信封中取出待入库的行
+    :return: (行列表, 无效条数)
+    """
+    message_type = data.get("messageType")
+    payload = data.get("payload") or {}
+    if message_type == "resultBatch":
+        items = payload.get("results", [])
+    elif message_type == "result":
+        items = [payload]
+    else:
+        return [], 0
+
+    rows, invalid = [], 0
+    for item in items:
+        try:
+            task_id = int(item.get("taskId", data.get("taskId")))
+        except (TypeError, ValueError):
+            invalid += 1
+            continue
+        url = item.get("url")
+        if not url:
+            invalid += 1
+            continue
+        rows.append({"task_id": task_id, "url": url[:2000], "title": (item.get("title") or "")[:500]})
+    return rows, invalid
+
+
+class ResultPersister:
+    """结果入库消费者"""
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.connection = None
+        self.channel = None
+        self._rows: List[dict] = []
+        self._last_message = None
+        self._batch_started: Optional[float] = None
+        self._flush_lock = asyncio.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist")
+        # 只在写库线程内访问
+        self._known_tasks = set()
+        self._backlog = 0
+        self._stats = {"messages": 0, "rows": 0, "written": 0, "missingTask": 0, "invalid": 0,
+                       "batches": 0, "failedBatches": 0}
+
+    async def run(self):
+        self.connection = await aio_pika.connect_robust(AMQP_URL)
+        self.channel = await self.connection.channel()
+        await self.channel.set_qos(prefetch_count=self.config["prefetch"])
+        exchange = await self.channel.declare_exchange(
+            TOPIC_EXCHANGE_CONFIG["name"],
+            TOPIC_EXCHANGE_CONFIG["type"],
+            durable=TOPIC_EXCHANGE_CONFIG["durable"]
+        )
+        queue = await self.channel.declare_queue(self.config["queue"], durable=True)
+        for key in self.config["routing_keys"]:
+            await queue.bind(exchange, routing_key=key)
+        await queue.consume(self._on_message)
+        logger.info("💾 结果入库已启动: %s (batch_size=%s, flush_interval=%ss)",
+                    queue.name, self.config["batch_size"], self.config["flush_interval"])
+
+        last_report = time.monotonic()
+        last_rows = 0
+        try:
+            while True:
+                await asyncio.sleep(min(0.1, self.config["flush_interval"]))
+                if self._batch_started is not None and \
+                        time.monotonic() - self._batch_started >= self.config["flush_interval"]:
+                    await self.flush()
+                if time.monotonic() - last_report >= self.config["report_interval"]:
+                    self._backlog = await self._queue_depth()
+                    elapsed = time.monotonic() - last_report
+                    logger.info("💾 入库 %.0f 行/秒，批次 %s（失败 %s），跳过 %s 行（任务不存在 %s），积压 %s 条消息",
+                                (self._stats["written"] - last_rows) / elapsed, self._stats["batches"],
+                                self._stats["failedBatches"], self._stats["missingTask"] + self._stats["invalid"],
+                                self._stats["missingTask"], self._backlog)
+                    last_report, last_rows = time.monotonic(), self._stats["written"]
+        finally:
+            await self.flush()
+            await self.connection.close()
+            self._executor.shutdown(wait=True)
+
+    async def _queue_depth(self) -> int:
+        try:
+            declared = await self.channel.declare_queue(self.config["queue"], passive=True)
+            return declared.declaration_result.message_count
+        except Exception:
+            return self._backlog
+
+    async def _on_message(self, message):
+        self._stats["messages"] += 1
+        try:
+            body = compression.decompress(message.body, message.content_encoding, message.headers)
+            rows, invalid = result_rows(codecs.decode(body, message.content_type))
+        except Exception as e:
+            logger.warning("⚠️ 无法解析的结果消息，已丢弃: %s", e)
+            self._stats["invalid"] += 1
+            metrics.PERSIST_ROWS.inc(1, ("invalid",))
+            await message.reject()
+            return
+        if invalid:
+            self._stats["invalid"] += invalid
+            metrics.PERSIST_ROWS.inc(invalid, ("invalid",))
+
+        # 追加与记录 last_message 之间没有 await：批次内的消息总是投递序号最小的那些
+        if self._batch_started is None:
+            self._batch_started = time.monotonic()
+        self._rows.extend(rows)
+        self._last_message = message
+        if len(self._rows) >= self.config["batch_size"]:
+            await self.flush()
+
+    async def flush(self):
+        """写入当前批次并确认其消息；批次按顺序写入，写库期间新消息进入下一批"""
+        async with self._flush_lock:
+            rows, last_message = self._rows, self._last_message
+            self._rows, self._last_message, self._batch_started = [], None, None
+            if last_message is None:
+                return
+
+            start = time.monotonic()
+            try:
+                written, missing = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self._write_batch, rows)
+            except Exception as e:
+                self._stats["failedBatches"] += 1
+                metrics.PERSIST_BATCHES.inc(1, ("failed",))
+                logger.error("❌ 写库失败，%s 行重新入队: %s", len(rows), e)
+                await last_message.nack(multiple=True, requeue=True)
+                await asyncio.sleep(self.config["retry_delay"])
+                return
+
+            elapsed = time.monotonic() - start
+            await last_message.ack(multiple=True)
+            metrics.PERSIST_BATCH_SECONDS.observe(elapsed)
+            metrics.PERSIST_BATCHES.inc(1, ("ok",))
+            metrics.PERSIST_ROWS.inc(written, ("written",))
+            if missing:
+                metrics.PERSIST_ROWS.inc(missing, ("missing_task",))
+            self._stats["batches"] += 1
+            self._stats["rows"] += len(rows)
+            self._stats["written"] += written
+            self._stats["missingTask"] += missing
+
+    def _write_batch(self, rows: List[dict]) -> Tuple[int, int]:
+        """
+        在写库线程中执行：过滤不存在的任务，单个事务内 bulk_create
+        :return: (写入行数（含被忽略的重复行）, 因任务不存在跳过的行数)
+        """
+        close_old_connections()
+        try:
+            return self._insert(rows)
+        except IntegrityError as e:
+            stale = {row["task_id"] for row in rows} & self._known_tasks
+            logger.warning("⚠️ 写库违反约束，重新确认 %s 个任务后重试: %s", len(stale), e)
+            self._known_tasks -= stale
+            return self._insert(rows)
+
+    def _insert(self, rows: List[dict]) -> Tuple[int, int]:
+        """查询缓存中没有的任务 id，过滤后单个事务内 bulk_create"""
+        task_ids = {row["task_id"] for row in rows}
+        unknown = task_ids - self._known_tasks
+        if unknown:
+            if len(self._known_tasks) > _KNOWN_TASKS_LIMIT:
+                self._known_tasks.clear()
+            self._known_tasks.update(SpiderTask.objects.filter(pk__in=unknown).values_list("pk", flat=True))
+
+        # 同一批次内 (task, url) 去重，保留最后一条
+        unique = {(row["task_id"], row["url"]): row for row in rows if row["task_id"] in self._known_tasks}
+        objs = [CrawledResult(task_id=row["task_id"], url=row["url"], title=row["title"]) for row in unique.values()]
+        with transaction.atomic():
+            CrawledResult.objects.bulk_create(objs, batch_size=self.config["batch_size"], ignore_conflicts=True)
+        return len(objs), sum(1 for row in rows if row["task_id"] not in self._known_tasks)
+
+    def stats(self) -> dict:
+        """返回入库统计快照"""
+        return {
+            **self._stats,
+            "pendingRows": len(self._rows),
+            "backlog": self._backlog,
+        }
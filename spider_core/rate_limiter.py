@@ -0,0 +1,113 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """
+    令牌桶限速器
+    - rate: 每秒补充的令牌数（<=0 表示不限速）
+    - burst: 桶容量，允许的最大突发请求数
+    等待者通过 asyncio.Lock 按到达顺序（FIFO）依次取令牌，检查与扣减在同一把锁内完成，不会出现并发穿透。
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.base_rate = self.rate  # 配置速率，自适应调节以它为上限
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+        # 统计指标
+        self.acquired = 0        # 已发放令牌数
+        self.delayed = 0         # 需要等待的次数
+        self.total_wait = 0.0    # 累计等待秒数
+        self.max_wait = 0.0      # 单次最长等待秒数
+        self.waiting = 0         # 当前排队中的协程数
+
+    def _refill(self) -> None:
+        """按流逝时间补充令牌"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate: float) -> None:
+        """动态调整速率（先按旧速率结算已流逝时间）"""
+        self._refill()
+        self.rate = float(rate)
+
+    async def acquire(self) -> float:
+        """
+        获取一个令牌，必要时排队等待。
+        :return: 本次等待的秒数
+        """
+        if self.rate <= 0:
+            self.acquired += 1
+            return 0.0
+
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                self._refill()
+                if self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    self._refill()
+                self._tokens -= 1
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.acquired += 1
+        if waited > 0.001:
+            self.delayed += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def stats(self) -> dict:
+        """返回限速器统计快照"""
+        return {
+            "rate": round(self.rate, 3),
+            "baseRate": self.base_rate,
+            "burst": self.burst,
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "waiting": self.waiting,
+            "totalWaitSec": round(self.total_wait, 3),
+            "avgWaitSec": round(self.total_wait / self.acquired, 4) if self.acquired else 0.0,
+            "maxWaitSec": round(self.max_wait, 3),
+        }
+
+
+class RateLimiterRegistry:
+    """
+    进程级限速器注册表：按 (engine, proxy) 共享令牌桶。
+    同一搜索引擎（同一出口代理）的所有任务共用一个桶，总速率不会随任务数成倍放大。
+    """
+
+    def __init__(self, config: Dict[str, dict]):
+        self._config = config
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def get(self, engine: str, proxy: Optional[str] = None) -> TokenBucket:
+        """
+        获取（或懒创建）某引擎/代理对应的令牌桶
+        :param engine: 搜索引擎名
+        :param proxy: 出口代理地址，None 表示直连
+        """
+        key = (engine, proxy or "")
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            conf = self._config.get(engine) or self._config["default"]
+            bucket = TokenBucket(conf["rate"], conf.get("burst", 1))
+            self._buckets[key] = bucket
+        return bucket
+
+    def stats(self) -> Dict[str, dict]:
+        """所有令牌桶的统计，键为 engine 或 engine@proxy"""
+        return {
+            f"{engine}@{proxy}" if proxy else engine: bucket.stats()
+            for (engine, proxy), bucket in self._buckets.items()
+        }
@@ -0,0 +1,141 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Set, Tuple, Union
+
+# 失败原因：HTTP 状态码，或 adaptive 模块中的 TIMEOUT / ERROR / CAPTCHA（与调节器的请求结果分类一致）
+Reason = Union[int, str]
+
+
+class FetchError(Exception):
+    """抓取失败（非 200 或验证码页），reason 为状态码或失败类型，由重试策略决定是否重试"""
+
+    def __init__(self, reason: Reason):
+        super().__init__(f"抓取失败: {reason}")
+        self.reason = reason
+
+
+class RetryPolicy:
+    """
+    单个搜索引擎的重试策略
+    - retry_on: 可重试的原因（状态码与 timeout/error/captcha）
+    - max_attempts: 含首次在内的最多尝试次数
+    - 第 n 次重试的等待为 min(max_delay, base_delay·2^(n-1))，再乘以 [1-jitter, 1] 内的随机系数
+    """
+
+    def __init__(self, config: dict):
+        self.retry_on = frozenset(config["retry_on"])
+        self.max_attempts = max(1, config["max_attempts"])
+        self.base_delay = config["base_delay"]
+        self.max_delay = config["max_delay"]
+        self.jitter = config["jitter"]
+
+    def delay(self, reason: Reason, attempt: int):
+        """
+        :param reason: 本次失败原因
+        :param attempt: 本次是第几次尝试（从 1 开始）
+        :return: 重试前等待的秒数；不再重试时返回 None
+        """
+        if reason not in self.retry_on or attempt >= self.max_attempts:
+            return None
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(1 - self.jitter, 1)
+
+
+class RetryScheduler:
+    """
+    延迟重试调度
+    失败页按到期时间放入最小堆，立即释放其 worker 与请求名额；
+    单个调度协程每次只弹出堆顶已到期的条目，调用 requeue 把页重新放回任务队列，重新经过限速器。
+    任务停止时由 stop(task_id) 唤醒调度协程，只交还该任务的条目（由 worker 按停止处理），
+    它们在堆中的位置成为墓碑，到期弹出时跳过。
+    """
+
+    def __init__(self, config: Dict[str, dict]):
+        self._config = config
+        self._policies: Dict[str, RetryPolicy] = {}
+        self._heap: List[Tuple[float, int]] = []  # (到期时间, 序号)
+        self._entries: Dict[int, Tuple[object, tuple]] = {}  # 序号 -> (job, item)，交还后移除
+        self._by_task: Dict[str, Set[int]] = {}  # task_id -> 等待中的序号
+        self._stopped: Set[str] = set()  # 待交还条目的已停止任务
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._tasks = set()
+        self.scheduled = 0
+        self.exhausted = 0
+
+    def policy(self, engine: str) -> RetryPolicy:
+        """获取（或懒创建）某引擎的重试策略"""
+        policy = self._policies.get(engine)
+        if policy is None:
+            conf = self._config.get(engine) or self._config["default"]
+            policy = self._policies[engine] = RetryPolicy(conf)
+        return policy
+
+    def schedule(self, delay: float, job, item: tuple) -> None:
+        """
+        安排一次延迟重试
+        :param job: 所属 CrawlJob（需有 task_id）
+        :param item: 重新入队的页任务元素
+        """
+        seq = next(self._seq)
+        self._entries[seq] = (job, item)
+        self._by_task.setdefault(str(job.task_id), set()).add(seq)
+        heapq.heappush(self._heap, (time.monotonic() + delay, seq))
+        self.scheduled += 1
+        if self._heap[0][1] == seq:
+            # 只有新条目成为最早到期者时，调度协程才需要重新计算等待时间
+            self._wakeup.set()
+
+    def stop(self, task_id) -> None:
+        """任务已停止：唤醒调度协程，立即交还该任务所有等待中的条目"""
+        key = str(task_id)
+        if key in self._by_task:
+            self._stopped.add(key)
+            self._wakeup.set()
+
+    def record_exhausted(self) -> None:
+        """记录一次重试次数用尽后的最终失败"""
+        self.exhausted += 1
+
+    def _take(self, seq: int) -> Tuple[object, tuple]:
+        """取出一个等待中的条目"""
+        job, item = self._entries.pop(seq)
+        key = str(job.task_id)
+        seqs = self._by_task[key]
+        seqs.discard(seq)
+        if not seqs:
+            del self._by_task[key]
+        return job, item
+
+    def _hand_over(self, requeue: Callable[[object, tuple], Awaitable[None]], seq: int) -> None:
+        job, item = self._take(seq)
+        task = asyncio.create_task(requeue(job, item))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def run(self, requeue: Callable[[object, tuple], Awaitable[None]]) -> None:
+        """调度主循环：到期（或所属任务已停止）的条目交给 requeue"""
+        while True:
+            while self._stopped:
+                for seq in list(self._by_task.get(self._stopped.pop(), ())):
+                    self._hand_over(requeue, seq)
+
+            now = time.monotonic()
+            while self._heap and (self._heap[0][0] <= now or self._heap[0][1] not in self._entries):
+                _, seq = heapq.heappop(self._heap)
+                if seq in self._entries:
+                    self._hand_over(requeue, seq)
+
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        """返回重试统计快照"""
+        return {"pending": len(self._entries), "scheduled": self.scheduled, "exhausted": self.exhausted}
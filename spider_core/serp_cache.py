@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+def normalize_url(url: str) -> str:
+    """规范化 URL：scheme/host 小写、查询参数排序、去掉锚点"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ""))
+
+
+class SerpCache:
+    """
+    SERP 响应缓存
+    - 内存层：按 (engine, 规范化 URL) 缓存 HTML，TTL 过期 + LRU 淘汰（条数与字节数双上限）
+    - 磁盘层（可选）：disk_dir 非空时启用，跨进程重启保留，读写放到线程池
+    - single-flight：同一 key 的并发请求只发一次 HTTP，其余等待同一个结果
+    只缓存成功页面；fetch 返回 None 表示本次不可缓存（如非 200）。
+    """
+
+    def __init__(self, config: dict):
+        self.enabled = config.get("enabled", True)
+        self.ttl = config["ttl"]
+        self.max_entries = config["max_entries"]
+        self.max_bytes = config["max_bytes"]
+        self.disk_dir = Path(config["disk_dir"]) if config.get("disk_dir") else None
+        self.disk_max_entries = config.get("disk_max_entries", 0)
+
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._disk_writes = 0
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+        # 统计指标
+        self.hits = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(engine: str, url: str) -> str:
+        """缓存键：引擎 + 规范化 URL"""
+        return f"{engine}|{normalize_url(url)}"
+
+    async def get_or_fetch(self, engine: str, url: str,
+                           fetch: Callable[[], Awaitable[Optional[str]]]) -> Tuple[Optional[str], str]:
+        """
+        读缓存，未命中时调用 fetch 并写回
+        :param engine: 搜索引擎名
+        :param url: 请求 URL
+        :param fetch: 真正发请求的协程函数，返回 HTML 或 None
+        :return: (html, 来源) 来源为 memory / disk / coalesced / fetch
+        """
+        if not self.enabled:
+            return await fetch(), "fetch"
+
+        key = self.make_key(engine, url)
+        html = self._memory_get(key)
+        if html is not None:
+            self.hits += 1
+            return html, "memory"
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight), "coalesced"
+
+        future = asyncio.get_running_loop().create_future()
+        # 没有跟随者时也要取走异常，避免 "exception was never retrieved"
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            source = "disk"
+            html = await self._disk_get(key)
+            if html is None:
+                source = "fetch"
+                self.misses += 1
+                html = await fetch()
+            else:
+                self.disk_hits += 1
+            if html is not None:
+                self._memory_put(key, html)
+                if source == "fetch":
+                    await self._disk_put(key, html)
+            future.set_result(html)
+            return html, source
+        except asyncio.CancelledError:
+            future.set_exception(ConnectionError("合并请求的发起方已取消"))
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    # --- 内存层 ---
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, html = entry
+        if expires_at < time.time():
+            self._memory_pop(key)
+            return None
+        self._memory.move_to_end(key)
+        return html
+
+    def _memory_put(self, key: str, html: str) -> None:
+        if key in self._memory:
+            self._memory_pop(key)
+        self._memory[key] = (time.time() + self.ttl, html)
+        self._memory_bytes += len(html)
+        while self._memory and (len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes):
+            self._memory_pop(next(iter(self._memory)))
+
+    def _memory_pop(self, key: str) -> None:
+        _, html = self._memory.pop(key)
+        self._memory_bytes -= len(html)
+
+    # --- 磁盘层 ---
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / (hashlib.sha1(key.encode("utf-8")).hexdigest() + ".html")
+
+    async def _disk_get(self, key: str) -> Optional[str]:
+        if self.disk_dir is None:
+            return None
+        return await asyncio.to_thread(self._disk_read, self._disk_path(key))
+
+    async def _disk_put(self, key: str, html: str) -> None:
+        if self.disk_dir is None:
+            return
+        self._disk_writes += 1
+        cleanup = self.disk_max_entries and self._disk_writes % 100 == 0
+        await asyncio.to_thread(self._disk_write, self._disk_path(key), html, cleanup)
+
+    def _disk_read(self, path: Path) -> Optional[str]:
+        """读取磁盘缓存，首行为过期时间戳"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                expires_at = float(f.readline())
+                if expires_at < time.time():
+                    return None
+                return f.read()
+        except (OSError, ValueError):
+            return None
+
+    def _disk_write(self, path: Path, html: str, cleanup: bool) -> None:
+        """写入磁盘缓存（先写临时文件再替换），必要时清理过期与超量文件"""
+        tmp = path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(f"{time.time() + self.ttl}\n")
+                f.write(html)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("⚠️ 写入磁盘缓存失败: %s", e)
+            return
+        if cleanup:
+            try:
+                self._disk_cleanup()
+            except OSError as e:
+                logger.warning("⚠️ 清理磁盘缓存失败: %s", e)
+
+    def _disk_cleanup(self) -> None:
+        """删除过期文件，超出条数上限时按修改时间淘汰最旧的"""
+        files = sorted(self.disk_dir.glob("*.html"), key=lambda p: p.stat().st_mtime)
+        expired_before = time.time() - self.ttl
+        keep = []
+        for path in files:
+            if path.stat().st_mtime < expired_before:
+                path.unlink(missing_ok=True)
+            else:
+                keep.append(path)
+        for path in keep[:max(0, len(keep) - self.disk_max_entries)]:
+            path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        """返回缓存统计快照"""
+        lookups = self.hits + self.disk_hits + self.coalesced + self.misses
+        return {
+            "entries": len(self._memory),
+            "bytes": self._memory_bytes,
+            "hits": self.hits,
+            "diskHits": self.disk_hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hitRate": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+        }
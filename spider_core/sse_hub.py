@@ -0,0 +1,358 @@
+"""
+Django 进程内的 SSE 分发中心
+- 每个进程一个 AMQP 消费者：独占临时队列按任务绑定到 Topic 交换机（task.<taskId>.*），
+  只收本进程有订阅者（或保留重放缓冲）的任务的消息；多进程部署时互不争抢
+- 按 taskId 头分发：只解码、渲染 SSE 文本一次，同一任务的所有订阅者共享同一份帧
+- 每个订阅者一个有界缓冲：满了先丢进度；结果/状态从不丢，仍放不下时断开该订阅者，由客户端重连
+- 被订阅过的任务保留最近事件的环形缓冲，事件 id 为 "<进程纪元>-<任务内序号>"；
+  重连时按 Last-Event-ID 只补发错过的事件（从缓冲尾部向前取，开销与错过的条数成正比）
+"""
+import asyncio
+import time
+from collections import deque, namedtuple
+from typing import Dict, List, Optional, Set
+
+import aio_pika
+
+from . import codecs, compression, metrics
+from .broadcaster import TERMINAL_STATUSES, routing_key
+from .configs import AMQP_URL, SSE_HUB_CONFIG, TOPIC_EXCHANGE_CONFIG
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# 订阅所有任务（调试用）
+WILDCARD = "*"
+
+# event: SSE 事件名；frame: 渲染好的 SSE 文本；count: 包含的事件条数；status: 终态状态，否则 None
+HubEvent = namedtuple("HubEvent", "event frame count status")
+
+
+def _frame(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {codecs.json_text(data)}\n\n"
+
+
+def _with_id(item: HubEvent, event_id: str) -> HubEvent:
+    """给帧加上 id 行：resultBatch 拆出的多条事件只在最后一条带 id，中途断开时整批重放"""
+    pos = item.frame.rfind("event: ")
+    return item._replace(frame=f"{item.frame[:pos]}id: {event_id}\n{item.frame[pos:]}")
+
+
+def render_events(data: dict) -> HubEvent:
+    """把一条 Envelope 渲染成 SSE 帧；resultBatch 拆回逐条 result 事件，前端无需改动"""
+    event_type = data.get("messageType", "message")
+    if event_type == "resultBatch":
+        items = (data.get("payload") or {}).get("results", [])
+        frame = "".join(_frame("result", {**data, "messageType": "result", "payload": item}) for item in items)
+        return HubEvent("result", frame, len(items), None)
+    status = None
+    if event_type == "status":
+        payload = data.get("payload") or {}
+        st = payload.get("status") or data.get("status")
+        status = st if st in TERMINAL_STATUSES else None
+    return HubEvent(event_type, _frame(event_type, data), 1, status)
+
+
+class Subscription:
+    """单个 SSE 连接的有界事件缓冲"""
+
+    def __init__(self, task_id: str, maxsize: int):
+        self.task_id = task_id
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.closed = False
+        self._items: deque = deque()
+        self._wakeup = asyncio.Event()
+
+    def offer(self, item: HubEvent) -> bool:
+        """
+        放入一条事件（由消费回调调用，不阻塞）
+        :return: False 表示订阅者过慢已被断开
+        """
+        if self.closed:
+            return False
+        if len(self._items) >= self.maxsize:
+            if item.event == "progress":
+                self._drop_progress(1)
+                return True
+            if not self._evict_progress():
+                self.close()
+                return False
+        self._items.append(item)
+        self._wakeup.set()
+        return True
+
+    def _evict_progress(self) -> bool:
+        """为结果/状态腾位置：移除最早的一条进度"""
+        for i, queued in enumerate(self._items):
+            if queued.event == "progress":
+                del self._items[i]
+                self._drop_progress(1)
+                return True
+        return False
+
+    def _drop_progress(self, n: int):
+        self.dropped += n
+        metrics.SSE_DROPPED.inc(n, ("progress",))
+
+    async def get(self) -> Optional[HubEvent]:
+        """取下一条事件；订阅者被断开时返回 None"""
+        while not self._items:
+            if self.closed:
+                return None
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        return self._items.popleft()
+
+    def close(self):
+        self.closed = True
+        self._items.clear()
+        self._wakeup.set()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ReplayBuffer:
+    """单个任务最近事件的环形缓冲，序号单调递增"""
+
+    def __init__(self, size: int, max_age: float):
+        self.max_age = max_age
+        self.seq = 0
+        self.last_active = time.monotonic()
+        # (序号, 时间, 带 id 的事件)
+        self._events: deque = deque(maxlen=size)
+
+    def append(self, epoch: str, item: HubEvent) -> HubEvent:
+        self.seq += 1
+        self.last_active = now = time.monotonic()
+        item = _with_id(item, f"{epoch}-{self.seq}")
+        self._events.append((self.seq, now, item))
+        return item
+
+    def since(self, last_seq: int) -> List[HubEvent]:
+        """返回序号大于 last_seq 且未过期的事件，从尾部向前遍历，只触及错过的部分"""
+        cutoff = time.monotonic() - self.max_age
+        missed = []
+        for seq, ts, item in reversed(self._events):
+            if seq <= last_seq or ts < cutoff:
+                break
+            missed.append(item)
+        missed.reverse()
+        return missed
+
+    def expired(self, now: float) -> bool:
+        return now - self.last_active > self.max_age
+
+    def __len__(self):
+        return len(self._events)
+
+
+class SseHub:
+    """进程级分发中心：首次订阅时建立 AMQP 消费者，之后所有 SSE 连接共享"""
+
+    def __init__(self, config: dict):
+        self.config = config
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._buffers: Dict[str, ReplayBuffer] = {}
+        self._last_sweep = time.monotonic()
+        # 进程纪元：事件 id 只在同一进程（同一次启动）内可比
+        self.epoch = format(int(time.time() * 1000), "x")
+        self._connection = None
+        self._queue = None
+        self._exchange = None
+        self._bound: Set[str] = set()
+        self._background: Set[asyncio.Task] = set()
+        self._loop = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._bind_lock: Optional[asyncio.Lock] = None
+        self._stats = {"received": 0, "dispatched": 0, "buffered": 0, "skipped": 0, "errors": 0,
+                       "disconnected": 0, "replayed": 0}
+
+    async def start(self):
+        """建立连接与消费者（已启动时直接返回）"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 连接绑定在事件循环上，换了循环（如测试中多次 asyncio.run）需要重建
+            self._loop, self._connection, self._start_lock, self._bind_lock = loop, None, asyncio.Lock(), asyncio.Lock()
+            self._bound.clear()
+            self._buffers.clear()
+        if self._connection is not None:
+            return
+        async with self._start_lock:
+            if self._connection is not None:
+                return
+            connection = await aio_pika.connect_robust(AMQP_URL)
+            channel = await connection.channel()
+            await channel.set_qos(prefetch_count=self.config["prefetch"])
+            self._exchange = await channel.declare_exchange(
+                TOPIC_EXCHANGE_CONFIG["name"],
+                TOPIC_EXCHANGE_CONFIG["type"],
+                durable=TOPIC_EXCHANGE_CONFIG["durable"]
+            )
+            # 绑定随订阅增减（robust 队列重连后会恢复现有绑定）
+            self._queue = await channel.declare_queue(exclusive=True, auto_delete=True)
+            await self._queue.consume(self._on_message)
+            self._connection = connection
+            logger.info("📡 SSE 分发中心已启动: %s", self._queue.name)
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+        for subs in self._subscribers.values():
+            for sub in subs:
+                sub.close()
+        self._subscribers.clear()
+        self._buffers.clear()
+        self._bound.clear()
+
+    async def _bind(self, key: str):
+        async with self._bind_lock:
+            if key not in self._bound:
+                await self._queue.bind(self._exchange, routing_key=key)
+                self._bound.add(key)
+
+    async def _unbind(self, key: str):
+        async with self._bind_lock:
+            # 排队期间可能又有了新订阅，解绑前再确认一次
+            if key in self._bound and not self._needs_binding(key):
+                await self._queue.unbind(self._exchange, routing_key=key)
+                self._bound.discard(key)
+
+    def _needs_binding(self, key: str) -> bool:
+        if key == "#":
+            return WILDCARD in self._subscribers
+        return any(routing_key(task_id) == key for task_id in self._buffers)
+
+    def _schedule_unbind(self, key: str):
+        task = asyncio.create_task(self._unbind(key))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def subscribe(self, task_id: str, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        订阅某任务的事件（WILDCARD 订阅全部任务）
+        :param last_event_id: 客户端最后收到的事件 id，先补发其后的缓冲事件；
+                              非本进程纪元的 id 补发整个缓冲（可能有重复）
+        """
+        await self.start()
+        sub = Subscription(str(task_id), self.config["subscriber_queue_size"])
+        if sub.task_id == WILDCARD:
+            await self._bind("#")
+        else:
+            buffer = self._buffers.get(sub.task_id)
+            if buffer is None:
+                buffer = self._buffers[sub.task_id] = ReplayBuffer(
+                    self.config["replay_size"], self.config["replay_max_age"])
+            await self._bind(routing_key(sub.task_id))
+            last_seq = self._parse_event_id(last_event_id)
+            if last_seq is not None:
+                # 补发与加入订阅之间没有 await，不会漏掉或重复实时事件
+                missed = buffer.since(last_seq)
+                self._stats["replayed"] += len(missed)
+                for item in missed:
+                    if not sub.offer(item):
+                        break
+        self._subscribers.setdefault(sub.task_id, set()).add(sub)
+        return sub
+
+    def _parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """事件 id "<纪元>-<序号>" -> 序号；其他进程或旧纪元的 id 视为 0（补发整个缓冲）"""
+        if not event_id:
+            return None
+        epoch, _, seq = event_id.strip().rpartition("-")
+        try:
+            seq = int(seq)
+        except ValueError:
+            return None
+        return seq if epoch in ("", self.epoch) else 0
+
+    def unsubscribe(self, sub: Subscription):
+        sub.close()
+        subs = self._subscribers.get(sub.task_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subscribers[sub.task_id]
+                if sub.task_id == WILDCARD:
+                    self._schedule_unbind("#")
+        buffer = self._buffers.get(sub.task_id)
+        if buffer is not None:
+            buffer.last_active = time.monotonic()
+
+    def _sweep(self):
+        """释放没有订阅者且已闲置的任务缓冲（最多每秒一次）"""
+        now = time.monotonic()
+        if now - self._last_sweep < 1:
+            return
+        self._last_sweep = now
+        for task_id in [t for t, b in self._buffers.items() if t not in self._subscribers and b.expired(now)]:
+            del self._buffers[task_id]
+            self._schedule_unbind(routing_key(task_id))
+
+    def _targets(self, task_id: Optional[str]) -> List[Subscription]:
+        return [*self._subscribers.get(task_id, ()), *self._subscribers.get(WILDCARD, ())]
+
+    async def _on_message(self, message):
+        self._stats["received"] += 1
+        try:
+            self._sweep()
+            task_id = codecs.header_str(message.headers, "taskId")
+            if task_id is not None and task_id not in self._buffers and not self._targets(task_id):
+                self._stats["skipped"] += 1
+                metrics.SSE_HUB_MESSAGES.inc(1, ("skipped",))
+                return
+            if task_id is None and not self._subscribers and not self._buffers:
+                self._stats["skipped"] += 1
+                metrics.SSE_HUB_MESSAGES.inc(1, ("skipped",))
+                return
+
+            body = compression.decompress(message.body, message.content_encoding, message.headers)
+            data = codecs.decode(body, message.content_type)
+            if task_id is None:
+                # 没有头的旧消息：按 Envelope 的 taskId（兼容老的 task_id）分发
+                task_id = str(data.get("taskId", data.get("task_id")))
+            self.dispatch(task_id, render_events(data))
+        except Exception as e:
+            self._stats["errors"] += 1
+            metrics.SSE_HUB_MESSAGES.inc(1, ("error",))
+            logger.warning("⚠️ SSE 分发失败: %s", e)
+        finally:
+            await message.ack()
+
+    def dispatch(self, task_id: str, item: HubEvent):
+        """记入任务的重放缓冲并放入所有订阅者的缓冲，过慢的订阅者被断开"""
+        buffer = self._buffers.get(task_id)
+        if buffer is not None:
+            item = buffer.append(self.epoch, item)
+        targets = self._targets(task_id)
+        if not targets:
+            outcome = "buffered" if buffer is not None else "skipped"
+            self._stats[outcome] += 1
+            metrics.SSE_HUB_MESSAGES.inc(1, (outcome,))
+            return
+        self._stats["dispatched"] += 1
+        metrics.SSE_HUB_MESSAGES.inc(1, ("dispatched",))
+        for sub in targets:
+            if not sub.offer(item):
+                self._stats["disconnected"] += 1
+                metrics.SSE_DROPPED.inc(1, ("disconnect",))
+                logger.warning("⚠️ SSE 订阅者过慢，已断开", extra={"task_id": sub.task_id})
+                self.unsubscribe(sub)
+
+    def stats(self) -> dict:
+        """返回分发中心统计快照"""
+        return {
+            **self._stats,
+            "tasks": len(self._subscribers),
+            "subscribers": sum(len(subs) for subs in self._subscribers.values()),
+            "queuedEvents": sum(len(sub) for subs in self._subscribers.values() for sub in subs),
+            "replayTasks": len(self._buffers),
+            "replayEvents": sum(len(b) for b in self._buffers.values()),
+            "bindings": len(self._bound),
+        }
+
+
+HUB = SseHub(SSE_HUB_CONFIG)
+metrics.REGISTRY.register_collector("sse_hub", HUB.stats)
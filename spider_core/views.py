@@ -1,11 +1,17 @@
+import asyncio
+import codecs
 import json
-from django.http import JsonResponse, StreamingHttpResponse
+import time
+from django.core.exceptions import RequestDataTooBig
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import aio_pika
 import json as _json
 import re
-from spider_core.configs import AMQP_URL, QUEUE_CONFIG, EXCHANGE_CONFIG
+from spider_core.broadcaster import routing_key
+from spider_core.configs import AMQP_URL, BULK_SUBMIT_CONFIG, QUEUE_CONFIG, EXCHANGE_CONFIG, TOPIC_EXCHANGE_CONFIG
+from spider_core import metrics, sse_hub
 
 _crawler_connection = None
 _crawler_channel = None
@@ -51,45 +57,57 @@ async def get_rabbitmq_connection():
     return _crawler_connection, _crawler_channel, _cmd_exchange
 
 
+def build_start_cmd(body: dict) -> dict:
+    """
+    由请求体构造 start 命令（单个提交与批量提交共用）
+    :raises ValueError: 参数无效
+    """
+    keywords = normalize_keywords(body.get('keywords', []))
+    if not keywords:
+        raise ValueError('keywords 参数不能为空')
+    cmd = {
+        "cmd": "start",
+        "task_id": body.get("taskId"),
+        "keywords": keywords,
+        "pageSize": body.get('pageSize', 1),
+        "engine": body.get('engine', 'bing'),
+        "concurrency": body.get('concurrency', 1),
+        "rateLimitPerSec": body.get('rateLimitPerSec', 2.0)
+    }
+    if body.get("priority") is not None:
+        cmd["priority"] = body["priority"]
+    return cmd
+
+
+def _command_message(cmd: dict) -> aio_pika.Message:
+    return aio_pika.Message(
+        body=json.dumps(cmd, ensure_ascii=False).encode(),
+        content_type="application/json",
+        delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+    )
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 async def start_crawl(request):
     """启动爬取任务"""
     try:
         body = json.loads(request.body)
-        task_id = body.get("taskId")
-        keywords = normalize_keywords(body.get('keywords', []))
-        page_size = body.get('pageSize', 1)
-        engine = body.get('engine', 'bing')
-        concurrency = body.get('concurrency', 1)
-        rate_limit = body.get('rateLimitPerSec', 2.0)
-
-        if not keywords:
-            return JsonResponse({'error': 'keywords 参数不能为空'}, status=400)
-
-        cmd = {
-            "cmd": "start",
-            "task_id": task_id,
-            "keywords": keywords,
-            "pageSize": page_size,
-            "engine": engine,
-            "concurrency": concurrency,
-            "rateLimitPerSec": rate_limit
-        }
+        try:
+            cmd = build_start_cmd(body)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
+        start = time.monotonic()
         _, _, cmd_exchange = await get_rabbitmq_connection()
-        await cmd_exchange.publish(
-            aio_pika.Message(
-                body=json.dumps(cmd, ensure_ascii=False).encode(),
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-            ),
-            routing_key="cmd.start"
-        )
+        await cmd_exchange.publish(_command_message(cmd), routing_key="cmd.start")
+        metrics.COMMAND_PUBLISH_SECONDS.observe(time.monotonic() - start, ("start",))
+        metrics.COMMANDS_PUBLISHED.inc(1, ("start",))
 
         return JsonResponse({
-            "taskId": task_id,
+            "taskId": cmd["task_id"],
             "status": "queued",
-            "keywords": keywords,
+            "keywords": cmd["keywords"],
             "consumers": list(QUEUE_CONFIG.keys()),
             "message": "数据将同时发送到所有消费者"
         })
@@ -100,12 +118,181 @@ async def start_crawl(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def _iter_bulk_tasks(request):
+    """
+    逐条产出 (序号, 任务)；无法解析的行（含非 UTF-8 字节）产出异常对象，只拒绝该行
+    两种格式都从请求体流增量读取，不把整个请求体读入内存或解析成一个大列表
+    :raises ValueError: JSON 数组格式错误（数组内无法定位下一条任务，整个请求体按格式错误处理）
+    :raises RequestDataTooBig: 请求体超过 BULK_SUBMIT_CONFIG.max_body_bytes
+    """
+    limit = BULK_SUBMIT_CONFIG["max_body_bytes"]
+    if request.content_type in NDJSON_CONTENT_TYPES:
+        index = 0
+        size = 0
+        for line in request:
+            size += len(line)
+            if size > limit:
+                raise RequestDataTooBig("请求体超过上限")
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except ValueError as e:
+                # JSONDecodeError 与 UnicodeDecodeError 都是 ValueError
+                yield index, e
+            index += 1
+        return
+    yield from enumerate(_iter_json_array(request, BULK_SUBMIT_CONFIG["read_chunk_size"], limit))
+
+
+_JSON_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+
+
+def _iter_json_array(stream, chunk_size: int, limit: int):
+    """
+    从流中增量解析顶层 JSON 数组，逐个产出元素；缓冲区只保留尚未解析完的一个元素
+    :param stream: 提供 read(size) 的请求体流
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buf, pos, size, eof = "", 0, 0, False
+
+    def fill():
+        # 丢弃已解析的部分，再读入一块
+        nonlocal buf, pos, size, eof
+        chunk = stream.read(chunk_size)
+        size += len(chunk)
+        if size > limit:
+            raise RequestDataTooBig("请求体超过上限")
+        eof = not chunk
+        buf = buf[pos:] + decoder.decode(chunk, final=eof)
+        pos = 0
+
+    def next_char():
+        # pos 跳过空白，返回其后的字符但不消费（流结束时返回空串）
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos < len(buf) or eof:
+                return buf[pos:pos + 1]
+            fill()
+
+    if next_char() != "[":
+        raise ValueError("请求体应为任务数组")
+    pos += 1
+    sep = next_char()
+    while sep != "]":
+        while True:
+            try:
+                item, end = _JSON_DECODER.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if end < len(buf) or eof:
+                break
+            fill()  # 元素恰好停在缓冲区末尾：数字等可能还没读完，读入更多再解析
+        pos = end
+        yield item
+        sep = next_char()
+        if sep not in (",", "]"):
+            raise ValueError("任务数组格式错误")
+        if sep == ",":
+            pos += 1
+            next_char()
+    pos += 1
+    if next_char():
+        raise ValueError("任务数组之后有多余内容")
+
+
+async def _publish_start_window(cmd_exchange, window: list) -> list:
+    """流水线发布一个窗口的 start 命令：先全部发出，再统一等待 publisher confirm"""
+    start = time.monotonic()
+    outcomes = await asyncio.gather(
+        *(cmd_exchange.publish(_command_message(cmd), routing_key="cmd.start") for _, cmd in window),
+        return_exceptions=True
+    )
+    metrics.COMMAND_PUBLISH_SECONDS.observe(time.monotonic() - start, ("start_bulk",))
+    results = []
+    for (index, cmd), outcome in zip(window, outcomes):
+        if isinstance(outcome, BaseException):
+            results.append({"index": index, "taskId": cmd["task_id"], "status": "rejected", "error": str(outcome)})
+        else:
+            results.append({"index": index, "taskId": cmd["task_id"], "status": "queued"})
+    metrics.COMMANDS_PUBLISHED.inc(sum(r["status"] == "queued" for r in results), ("start",))
+    return results
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def start_crawl_bulk(request):
+    """
+    批量启动爬取任务：请求体为任务数组，或 NDJSON（Content-Type: application/x-ndjson），均按流增量解析
+    每个任务的字段与 start_crawl 相同，taskId 必填且不能重复；
+    按 BULK_SUBMIT_CONFIG.publish_window 分窗口流水线发布，返回每个任务的受理结果
+    """
+    max_tasks = BULK_SUBMIT_CONFIG["max_tasks"]
+    window_size = BULK_SUBMIT_CONFIG["publish_window"]
+    results, window, seen = [], [], set()
+    truncated = False
+    try:
+        _, _, cmd_exchange = await get_rabbitmq_connection()
+        for index, task in _iter_bulk_tasks(request):
+            if index >= max_tasks:
+                truncated = True
+                break
+            task_id = task.get("taskId") if isinstance(task, dict) else None
+            try:
+                if not isinstance(task, dict):
+                    raise ValueError('无效的 JSON 格式' if isinstance(task, Exception) else '任务应为 JSON 对象')
+                if task_id is None:
+                    raise ValueError('taskId 不能为空')
+                if str(task_id) in seen:
+                    raise ValueError('taskId 重复')
+                cmd = build_start_cmd(task)
+            except ValueError as e:
+                results.append({"index": index, "taskId": task_id, "status": "rejected", "error": str(e)})
+                continue
+            seen.add(str(task_id))
+            window.append((index, cmd))
+            if len(window) >= window_size:
+                results.extend(await _publish_start_window(cmd_exchange, window))
+                window = []
+        if window:
+            results.extend(await _publish_start_window(cmd_exchange, window))
+    except RequestDataTooBig as e:
+        return JsonResponse({'error': f'请求体过大: {e}', "results": results}, status=413)
+    except ValueError as e:
+        if not any(r["status"] == "queued" for r in results):
+            # 整个请求体无法解析时什么也没有发布；已发布过窗口则与其他异常一样带上已处理部分的结果
+            return JsonResponse({'error': f'无效的请求体: {e}'}, status=400)
+        return JsonResponse({'error': str(e), "results": results}, status=500)
+    except Exception as e:
+        # 已发布的窗口不会回滚，响应里带上已处理部分的结果
+        return JsonResponse({'error': str(e), "results": results}, status=500)
+
+    # 校验失败的任务先于所在窗口记入结果，按序号还原顺序
+    results.sort(key=lambda r: r["index"])
+    accepted = sum(r["status"] == "queued" for r in results)
+    return JsonResponse({
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "truncated": truncated,
+        "results": results,
+    })
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 async def stop_crawl(request, task_id):
     """停止爬取任务"""
     try:
         cmd = {"cmd": "stop", "task_id": task_id}
+        start = time.monotonic()
         _, _, cmd_exchange = await get_rabbitmq_connection()
         await cmd_exchange.publish(
             aio_pika.Message(
@@ -114,6 +301,8 @@ async def stop_crawl(request, task_id):
             ),
             routing_key="cmd.stop"
         )
+        metrics.COMMAND_PUBLISH_SECONDS.observe(time.monotonic() - start, ("stop",))
+        metrics.COMMANDS_PUBLISHED.inc(1, ("stop",))
         return JsonResponse({"task_id": task_id, "status": "任务已停止"})
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -121,75 +310,42 @@ async def stop_crawl(request, task_id):
 
 async def stream_results(request, task_id):
     """
-    SSE: 前端消费 Envelope。支持 '?debug=1' 调试。
-    - 过滤使用 envelope.taskId（兼容老的 task_id）
+    SSE: 前端消费 Envelope。支持 '?debug=1' 调试（接收所有任务的事件，不随状态结束）。
+    - 事件由进程内的 sse_hub 按 taskId 分发，所有连接共享一个 AMQP 消费者
     - 事件名使用 envelope.messageType
+    - 事件带 id；重连时浏览器自动发送 Last-Event-ID，只补发错过的事件。
+      页面刷新后可通过 '?lastEventId=' 传入保存的 id（'0' 表示补发缓冲中的全部事件）
     """
     debug_mode = request.GET.get("debug") == "1"
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("lastEventId")
 
     async def event_generator():
-        conn = None
+        sub = None
+        metrics.SSE_CONNECTIONS.inc(1, ("opened",))
         try:
-            conn = await aio_pika.connect_robust(AMQP_URL)
-            channel = await conn.channel()
-
-            exchange_type = getattr(
-                aio_pika.ExchangeType,
-                EXCHANGE_CONFIG.get("type", "fanout").upper()
-            )
-            result_exchange = await channel.declare_exchange(
-                EXCHANGE_CONFIG["name"],
-                exchange_type,
-                durable=True
-            )
-
-            queue = await channel.declare_queue(
-                QUEUE_CONFIG["front"]["name"],
-                durable=True
-            )
-            routing_key = EXCHANGE_CONFIG.get("routing_key", "")
-            await queue.bind(result_exchange, routing_key=routing_key)
-
+            sub = await sse_hub.HUB.subscribe(sse_hub.WILDCARD if debug_mode else str(task_id), last_event_id)
             yield f"data: {json.dumps({'type': 'connected', 'task_id': task_id})}\n\n"
 
-            wanted_task_id = str(task_id)
-
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    async with message.process():
-                        try:
-                            data = json.loads(message.body)
-                        except Exception as e:
-                            if debug_mode:
-                                yield "event: debug\n"
-                                yield f"data: {json.dumps({'reason':'parse_error','error':str(e)}, ensure_ascii=False)}\n\n"
-                            continue
-
-                        # Envelope 过滤：优先 taskId，兼容老的 task_id
-                        got_tid = data.get("taskId", data.get("task_id"))
-                        if not debug_mode and str(got_tid) != wanted_task_id:
-                            continue
-                        if debug_mode and str(got_tid) != wanted_task_id:
-                            yield "event: debug\n"
-                            yield f"data: {json.dumps({'reason':'task_id_mismatch','wanted':wanted_task_id,'got':got_tid}, ensure_ascii=False)}\n\n"
-
-                        event_type = data.get("messageType", "message")
-                        yield f"event: {event_type}\n"
-                        yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
-
-                        if event_type == "status":
-                            payload = (data.get("payload") or {})
-                            st = payload.get("status") or data.get("status")
-                            if st in ["done", "error", "stopped"]:
-                                yield "event: end\n"
-                                yield f"data: {json.dumps({'status': st})}\n\n"
-                                break
+            while True:
+                item = await sub.get()
+                if item is None:
+                    # 缓冲满且无进度可丢：断开，由客户端重连
+                    yield "event: error\n"
+                    yield f"data: {json.dumps({'error': 'slow_consumer'})}\n\n"
+                    break
+                metrics.SSE_EVENTS.inc(item.count, (item.event,))
+                yield item.frame
+                if item.status and not debug_mode:
+                    yield "event: end\n"
+                    yield f"data: {json.dumps({'status': item.status})}\n\n"
+                    break
         except Exception as e:
             yield "event: error\n"
             yield f"data: {json.dumps({'error': str(e)})}\n\n"
         finally:
-            if conn:
-                await conn.close()
+            metrics.SSE_CONNECTIONS.inc(1, ("closed",))
+            if sub is not None:
+                sse_hub.HUB.unsubscribe(sub)
 
     response = StreamingHttpResponse(event_generator(), content_type="text/event-stream")
     response["Cache-Control"] = "no-cache"
@@ -204,10 +360,11 @@ async def index(request):
         "architecture": "Fanout Exchange",
         "consumers": {
             "springBoot": QUEUE_CONFIG["springBootData"]["name"],
-            "front": QUEUE_CONFIG["front"]["name"]
+            "front": "SSE: GET /api/crawl/stream/<task_id>（每个 Django 进程一个独占队列，绑定 Topic Exchange）"
         },
         "endpoints": {
             "start": "POST /api/crawl/start",
+            "startBulk": "POST /api/crawl/start/bulk",
             "stop": "POST /api/crawl/stop/<task_id>",
             "stream": "GET /api/crawl/stream/<task_id>"
         }
@@ -218,26 +375,24 @@ async def index(request):
 async def queue_info(request):
     return JsonResponse({
         "exchange": EXCHANGE_CONFIG,
+        "topicExchange": TOPIC_EXCHANGE_CONFIG,
         "queues": QUEUE_CONFIG,
-        "description": "所有队列都绑定到同一个 Fanout Exchange，消息会广播到所有队列"
+        "description": "消息按 task.<taskId>.<messageType> 发布到 Topic Exchange，"
+                       "再全量转发到 Fanout Exchange，所有队列都绑定在 Fanout Exchange 上"
     })
 
 
 @require_http_methods(["POST"])
 async def debug_publish(request, task_id):
-    """发送一条 Envelope 测试消息到广播 Exchange"""
+    """发送一条 Envelope 测试消息到 Topic Exchange（同时经 Fanout 广播到所有队列）"""
     try:
         conn = await aio_pika.connect_robust(AMQP_URL)
         async with conn:
             ch = await conn.channel()
-            exchange_type = getattr(
-                aio_pika.ExchangeType,
-                EXCHANGE_CONFIG.get("type", "fanout").upper()
-            )
             ex = await ch.declare_exchange(
-                EXCHANGE_CONFIG["name"],
-                exchange_type,
-                durable=True
+                TOPIC_EXCHANGE_CONFIG["name"],
+                TOPIC_EXCHANGE_CONFIG["type"],
+                durable=TOPIC_EXCHANGE_CONFIG["durable"]
             )
 
             envelope = {
@@ -254,9 +409,16 @@ async def debug_publish(request, task_id):
                     body=json.dumps(envelope, ensure_ascii=False).encode(),
                     delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
                     content_type="application/json",
+                    headers={"messageType": "message", "taskId": str(envelope["taskId"])},
                 ),
-                routing_key=EXCHANGE_CONFIG.get("routing_key", "")
+                routing_key=routing_key(envelope["taskId"], "message")
             )
         return JsonResponse({"ok": True})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+async def metrics_view(request):
+    """Prometheus 文本格式的指标（本进程）"""
+    return HttpResponse(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import pytest
+
+from spider_core.admission import AdmissionController
+from spider_core.configs import AMQP_URL
+from spider_core.crawler import CrawlerService
+
+
+def _cmd(task_id, priority=0):
+    return {"cmd": "start", "task_id": task_id, "priority": priority}
+
+
+def test_priority_then_fifo():
+    admission = AdmissionController(max_running=1, max_queued=10)
+    assert admission.try_acquire(1)
+    assert not admission.try_acquire(2)
+    for task_id, priority in ((2, 0), (3, 5), (4, 0), (5, 5)):
+        admission.push(_cmd(task_id, priority), f"msg{task_id}")
+
+    admission.release(1)
+    order = []
+    while (entry := admission.pop()) is not None:
+        order.append(entry[0]["task_id"])
+        admission.release(entry[0]["task_id"])
+    assert order == [3, 5, 2, 4]
+
+
+def test_duplicates_are_detected_while_queued_and_running():
+    admission = AdmissionController(max_running=1, max_queued=10)
+    assert not admission.is_duplicate(1)
+    admission.try_acquire(1)
+    assert admission.is_duplicate(1)
+
+    admission.push(_cmd(2), "first")
+    assert admission.is_duplicate("2")
+    with pytest.raises(ValueError):
+        admission.push(_cmd(2), "second")
+    assert admission.stats()["duplicates"] == 2
+
+    # 第一条排队消息没有被覆盖
+    admission.release(1)
+    assert admission.pop() == (_cmd(2), "first")
+    assert admission.is_duplicate(2)
+    admission.release(2)
+    assert not admission.is_duplicate(2)
+
+
+def test_removed_entry_is_skipped_by_pop():
+    admission = AdmissionController(max_running=1, max_queued=10)
+    admission.try_acquire(1)
+    admission.push(_cmd(2), "m2")
+    admission.push(_cmd(3), "m3")
+    assert admission.remove(2) == (_cmd(2), "m2")
+    admission.release(1)
+    assert admission.pop() == (_cmd(3), "m3")
+    assert admission.pop() is None
+    assert admission.stats() == {"running": 1, "queued": 0, "maxRunning": 1, "duplicates": 0}
+
+
+class CommandMessage:
+    def __init__(self, cmd):
+        self.body = json.dumps(cmd).encode()
+        self.content_type = "application/json"
+        self.processed = False
+        self.outcome = None
+
+    async def ack(self):
+        self.processed, self.outcome = True, "ack"
+
+    async def reject(self, requeue=False):
+        self.processed, self.outcome = True, "reject"
+
+
+class FailingExchange:
+    name = "failing"
+
+    async def publish(self, message, routing_key=""):
+        raise ConnectionError("broker gone")
+
+
+def test_commands_are_always_settled_unless_queued():
+    async def scenario():
+        svc = CrawlerService(AMQP_URL)
+        svc.exchange = FailingExchange()
+        outcomes = {}
+        for name, cmd in (
+                ("missing_cmd", {"task_id": 1}),
+                ("unknown_cmd", {"cmd": "pause", "task_id": 1}),
+                ("stop", {"cmd": "stop", "task_id": 1}),
+        ):
+            msg = CommandMessage(cmd)
+            await svc._on_command(msg)
+            outcomes[name] = msg.outcome
+
+        # _admit 在确认或排队之前失败：消息被拒绝，不再占用 prefetch
+        async def broken_admit(cmd, msg):
+            raise RuntimeError("boom")
+
+        admit, svc._admit = svc._admit, broken_admit
+        msg = CommandMessage({"cmd": "start", "task_id": 2})
+        await svc._on_command(msg)
+        outcomes["admit_failed"] = msg.outcome
+
+        # 已进入本地等待队列后广播失败：消息由等待队列负责，保持未确认
+        svc._admit = admit
+        for task_id in range(100, 100 + svc.admission.max_running):
+            svc.admission.try_acquire(task_id)
+        msg = CommandMessage({"cmd": "start", "task_id": 3})
+        await svc._on_command(msg)
+        outcomes["queued"] = msg.outcome
+        assert svc.admission.holds(3, msg)
+        return outcomes
+
+    assert asyncio.run(scenario()) == {
+        "missing_cmd": "reject", "unknown_cmd": "reject", "stop": "ack", "admit_failed": "reject", "queued": None,
+    }
@@ -0,0 +1,59 @@
+import asyncio
+
+from spider_core import codecs, compression
+from spider_core.broadcaster import Broadcaster, routing_key
+from spider_core.configs import EXCHANGE_CONFIG, RESULT_BATCH_CONFIG, TOPIC_EXCHANGE_CONFIG
+
+
+class Exchange:
+    def __init__(self, name):
+        self.name = name
+        self.published = []
+
+    async def publish(self, message, routing_key=""):
+        self.published.append((message, routing_key))
+
+
+def _decode(message):
+    body = compression.decompress(message.body, message.content_encoding, message.headers)
+    return codecs.decode(body, message.content_type)
+
+
+def _results(n):
+    return [{"url": f"https://www.bing.com/ck/a?!&&p={'x' * 200}{i}", "title": f"标题 {i}", "source": "example.com",
+             "keywords": ["电影"]} for i in range(n)]
+
+
+def test_routing_key():
+    assert routing_key(42, "status") == "task.42.status"
+    assert routing_key("a.b") == "task.a_b.*"
+
+
+def test_status_reaching_springboot_is_never_compressed():
+    """SpringBoot 队列也会收到状态，即使超过压缩阈值也不压缩"""
+    topic = Exchange(TOPIC_EXCHANGE_CONFIG["name"])
+    asyncio.run(Broadcaster.broadcast_status(topic, 1, "error", "x" * 4096))
+    message, key = topic.published[0]
+    assert key == "task.1.status"
+    assert message.content_encoding is None
+    assert _decode(message)["payload"]["error"] == "x" * 4096
+
+
+def test_only_result_batches_are_compressed():
+    topic = Exchange(TOPIC_EXCHANGE_CONFIG["name"])
+    split = Exchange(RESULT_BATCH_CONFIG["split_exchange"])
+    asyncio.run(Broadcaster.broadcast_results(topic, 7, _results(20), split_exchange=split))
+
+    batches = [m for m, _ in topic.published]
+    assert batches and all(m.content_encoding == compression.algorithm() for m in batches)
+    assert sum(len(_decode(m)["payload"]["results"]) for m in batches) == 20
+
+    singles = [m for m, _ in split.published]
+    assert len(singles) == 20
+    assert all(m.content_encoding is None and m.headers["messageType"] == "result" for m in singles)
+
+
+def test_unknown_exchange_and_fanout_split_types_are_not_compressed():
+    assert not Broadcaster._compress_for(Exchange("some.other.exchange"), "resultBatch")
+    assert not Broadcaster._compress_for(Exchange(EXCHANGE_CONFIG["name"]), "result")
+    assert Broadcaster._compress_for(Exchange(EXCHANGE_CONFIG["name"]), "resultBatch")
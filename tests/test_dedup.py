@@ -0,0 +1,87 @@
+from spider_core import dedup
+from spider_core.dedup import BloomFilter, RollingBloomFilter, UrlDeduplicator
+
+
+def test_bloom_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    items = [f"https://example.com/{i}" for i in range(1000)]
+    added = sum(bloom.add(item) for item in items)
+    # 加入过程中个别新元素可能被误判为已存在，但已加入的元素一定能查到
+    assert added >= 980
+    assert all(item in bloom for item in items)
+    assert not any(bloom.add(item) for item in items)
+    assert bloom.count == added
+
+
+def test_bloom_false_positive_rate_at_capacity():
+    """装满 capacity 条后，未加入元素的误判率不超过 fpr 的两倍"""
+    capacity, fpr = 10000, 0.01
+    bloom = BloomFilter(capacity, fpr)
+    for i in range(capacity):
+        bloom.add(f"https://in.example/{i}")
+    probes = 20000
+    false_positives = sum(f"https://out.example/{i}" in bloom for i in range(probes))
+    assert false_positives / probes <= fpr * 2
+
+
+def test_bloom_sizing():
+    bloom = BloomFilter(1_000_000, 0.01)
+    # 1% 误判率约 9.6 bit/条，7 次哈希
+    assert 1_150_000 <= bloom.nbytes <= 1_250_000
+    assert bloom.hashes == 7
+
+
+def test_rolling_filter_rotates_by_window(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(dedup.time, "monotonic", lambda: clock[0])
+    rolling = RollingBloomFilter(capacity=100, fpr=0.01, window=60, generations=2)
+
+    assert rolling.add("a")
+    clock[0] += 61
+    assert not rolling.add("a")  # 上一代仍在窗口内
+    assert rolling.add("b")
+    clock[0] += 61
+    # "a" 所在的代已淘汰，"b" 仍在保留的上一代中
+    assert rolling.add("a")
+    assert not rolling.add("b")
+
+
+def test_rolling_filter_rotates_when_generation_is_full(monkeypatch):
+    monkeypatch.setattr(dedup.time, "monotonic", lambda: 1000.0)
+    rolling = RollingBloomFilter(capacity=10, fpr=0.01, window=3600, generations=3)
+    for i in range(35):
+        rolling.add(f"u{i}")
+    # 每代最多 capacity 条，只保留 generations 代
+    assert len(rolling._filters) == 3
+    assert rolling.nbytes == 3 * BloomFilter(10, 0.01).nbytes
+    assert not rolling.add("u34")
+
+
+def _config(global_enabled=False):
+    return {
+        "enabled": True,
+        "task": {"fpr": 0.001, "results_per_page": 10, "min_capacity": 100, "max_capacity": 1000},
+        "global": {"enabled": global_enabled, "capacity": 1000, "fpr": 0.01, "window": 3600, "generations": 2},
+    }
+
+
+def test_deduplicator_per_task_and_global():
+    links = [{"href": "https://a.example/x"}, {"href": "https://A.example/x"}, {"href": "https://b.example/"}]
+
+    per_task = UrlDeduplicator(_config())
+    per_task.open_task(1, 5)
+    per_task.open_task(2, 5)
+    kept, suppressed = per_task.filter(1, links)
+    assert [link["href"] for link in kept] == ["https://a.example/x", "https://b.example/"]
+    assert suppressed == 1
+    # 另一个任务有自己的过滤器
+    assert per_task.filter(2, links)[1] == 1
+    per_task.close_task(1)
+    assert per_task.stats()["activeTasks"] == 1
+
+    shared = UrlDeduplicator(_config(global_enabled=True))
+    shared.open_task(1, 5)
+    shared.open_task(2, 5)
+    shared.filter(1, links)
+    assert shared.filter(2, links) == ([], 3)
+    assert shared.stats()["suppressed"] == 4
@@ -0,0 +1,229 @@
+import asyncio
+import time
+
+from spider_core import codecs, compression, distributed
+from spider_core.configs import AMQP_URL
+from spider_core.crawler import CrawlerService
+from spider_core.distributed import PageTracker, RecentSet
+
+
+def _tracker(total_pages=3):
+    async def make():
+        return PageTracker(7, total_pages)
+    return asyncio.run(make())
+
+
+def test_tracker_counts_each_page_once():
+    tracker = _tracker()
+    assert tracker.record({"pageNo": 1, "status": "ok", "worker": "a"})
+    assert not tracker.record({"pageNo": 1, "status": "ok", "worker": "b"})
+    assert not tracker.record({"pageNo": 2, "status": "delivered", "worker": "b"})
+    assert not tracker.record({"pageNo": 2, "status": "skipped", "worker": "b"})
+    assert tracker.record({"pageNo": 2, "status": "failed", "worker": "b"})
+    assert not tracker.finished.is_set()
+    assert tracker.record({"pageNo": 3, "status": "ok", "cacheHit": True, "worker": "a"})
+    assert tracker.finished.is_set()
+    tracker.record_links(15, 2)
+    assert tracker.results == 15
+    assert tracker.progress_stats() == {"cacheHits": 1, "suppressed": 2, "failedPages": 1, "retriedPages": 0,
+                                        "inFlightPages": 0, "workers": 2}
+
+
+def test_tracker_limits_pages_in_flight():
+    async def scenario():
+        tracker = PageTracker(7, 4, concurrency=2)
+        assert await tracker.next_page() == (1, 1)
+        assert await tracker.next_page() == (2, 1)
+        third = asyncio.create_task(tracker.next_page())
+        await asyncio.sleep(0.01)
+        assert not third.done()  # 名额已满
+
+        # 交还的重试页释放名额，到期后优先重新投递
+        assert tracker.retry(1, 2, delay=0.05)
+        assert not tracker.retry(1, 2, delay=0.05)  # 重复的回执
+        assert await third == (3, 1)
+        await asyncio.sleep(0.06)
+        tracker.record({"pageNo": 2, "status": "ok", "worker": "a"})
+        assert await tracker.next_page() == (1, 2)
+        for page_no in (1, 3):
+            tracker.record({"pageNo": page_no, "status": "ok", "worker": "a"})
+        assert await tracker.next_page() == (4, 1)
+        tracker.record({"pageNo": 4, "status": "ok", "worker": "a"})
+        assert await tracker.next_page() is None
+
+    asyncio.run(scenario())
+
+
+def test_tracker_timeout_starts_at_first_delivery(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(distributed.time, "monotonic", lambda: clock[0])
+
+    async def scenario():
+        tracker = PageTracker(7, 3)
+        await tracker.next_page()
+        # 页还排在共享队列里：等多久都不算超时
+        clock[0] += 10_000
+        assert not tracker.stalled(300)
+
+        tracker.record({"pageNo": 1, "status": "delivered", "worker": "a"})
+        clock[0] += 200
+        assert not tracker.stalled(300)
+        tracker.record({"pageNo": 1, "status": "ok", "worker": "a"})
+        # 没有在途页（如限速造成的投递空档）时不算停滞，再次投递时重新计时
+        clock[0] += 10_000
+        assert not tracker.stalled(300)
+        await tracker.next_page()
+        clock[0] += 299
+        assert not tracker.stalled(300)
+        clock[0] += 2
+        assert tracker.stalled(300)
+
+    asyncio.run(scenario())
+
+
+def test_recent_set_evicts_oldest():
+    recent = RecentSet(2)
+    for key in ("a", "b", "c"):
+        recent.add(key)
+    assert "a" not in recent
+    assert "b" in recent and "c" in recent
+
+
+class FakeMessage:
+    """AMQP 消息替身：记录 ack / reject"""
+
+    def __init__(self, body, content_type="application/json", reply_to=None, correlation_id=None):
+        self.body = body
+        self.content_type = content_type
+        self.content_encoding = None
+        self.headers = {}
+        self.reply_to = reply_to
+        self.correlation_id = correlation_id
+        self.settled = None
+
+    async def ack(self, multiple=False):
+        self.settled = "ack"
+
+    async def reject(self, requeue=False):
+        self.settled = "reject"
+
+    def process(self):
+        message = self
+
+        class _Process:
+            async def __aenter__(self):
+                return message
+
+            async def __aexit__(self, *exc):
+                await message.ack()
+
+        return _Process()
+
+
+class RecordingExchange:
+    """交换机替身：解码并记录发布的信封"""
+
+    name = "recording"
+
+    def __init__(self):
+        self.envelopes = []
+
+    async def publish(self, message, routing_key=""):
+        body = compression.decompress(message.body, message.content_encoding, message.headers)
+        self.envelopes.append(codecs.decode(body, message.content_type))
+
+
+class FastRetryPolicy:
+    def delay(self, reason, attempt):
+        return 0.02 if attempt < 3 else None
+
+
+def test_task_limits_hold_across_workers():
+    """三个 worker 进程处理同一任务：在途请求与请求速率不超过任务上限，跨 worker 的重复 URL 只发布一次"""
+    cmd = {"task_id": 42, "keywords": ["k"], "pageSize": 12, "concurrency": 2, "rateLimitPerSec": 40, "engine": "bing"}
+    starts, active, peak, handled = [], [0], [0], {}
+
+    async def scenario():
+        page_queue = asyncio.Queue()
+        coordinator = CrawlerService(AMQP_URL)
+        coordinator.exchange = coordinator_exchange = RecordingExchange()
+
+        async def publish_page_item(cmd, page_no, attempt=1):
+            body = codecs.JSON.encode({"cmd": cmd, "pageNo": page_no, "attempt": attempt})
+            await page_queue.put(FakeMessage(body, reply_to="coordinator", correlation_id=str(cmd["task_id"])))
+
+        coordinator._publish_page_item = publish_page_item
+
+        class ReportChannel:
+            """worker 发往协调者 reply_to 的回执：按发布顺序交给协调者处理"""
+
+            class default_exchange:
+                @staticmethod
+                async def publish(message, routing_key):
+                    asyncio.get_running_loop().create_task(
+                        coordinator._on_page_report(FakeMessage(message.body, message.content_type)))
+
+        workers, consumers = [], []
+        for n in range(3):
+            worker = CrawlerService(AMQP_URL)
+            worker.worker_id = f"w{n}"
+            worker.exchange = RecordingExchange()
+            worker.channel = ReportChannel
+            worker.retry_scheduler.policy = lambda engine: FastRetryPolicy()
+            await worker.http_pool.start()
+
+            async def crawl_one(session, job, page_no, exchange, worker=worker):
+                starts.append(time.monotonic())
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+                try:
+                    await asyncio.sleep(0.15)  # 仅靠限速时会有约 6 个并发请求
+                finally:
+                    active[0] -= 1
+                handled.setdefault(page_no, []).append(worker.worker_id)
+                report = {"pageNo": page_no, "status": "ok", "results": 0, "suppressed": 0, "cacheHit": False}
+                if page_no == 5 and len(handled[page_no]) == 1:
+                    return {**report, "status": "failed", "retry": "timeout"}
+                links = [
+                    {"href": f"https://shared.example/{page_no % 3}", "title": "shared", "source": "s"},
+                    {"href": f"https://page.example/{page_no}", "title": "own", "source": "p"},
+                ]
+                await worker._publish_links(job, links, exchange, report)
+                return report
+
+            worker._crawl_one = crawl_one
+            workers.append(worker)
+
+            async def consume(worker=worker):
+                while True:
+                    await worker._on_page_item(await page_queue.get())
+
+            consumers.append(asyncio.create_task(consume()))
+
+        try:
+            await asyncio.wait_for(coordinator._coordinate_job(coordinator_exchange, cmd, asyncio.Event()), 10)
+        finally:
+            for task in consumers:
+                task.cancel()
+            for worker in workers:
+                for job in worker.remote_jobs.values():
+                    for task in job.workers:
+                        task.cancel()
+                await worker.http_pool.close()
+        return coordinator_exchange.envelopes, [w.exchange.envelopes for w in workers]
+
+    envelopes, worker_envelopes = asyncio.run(scenario())
+
+    assert len({worker for ids in handled.values() for worker in ids}) > 1
+    assert peak[0] <= cmd["concurrency"]
+    # 12 页 + 1 次重试，首个令牌立即可用
+    assert len(starts) == 13
+    assert (len(starts) - 1) / (starts[-1] - starts[0]) <= cmd["rateLimitPerSec"] * 1.1
+
+    # 结果只由协调者发布，跨 worker 的重复 URL 只发布一次
+    assert not any(worker_envelopes)
+    urls = [item["url"] for env in envelopes if env["messageType"] == "resultBatch"
+            for item in env["payload"]["results"]]
+    assert len(urls) == len(set(urls)) == 3 + 12
+    statuses = [env["payload"]["status"] for env in envelopes if env["messageType"] == "status"]
+    assert statuses == ["started", "done"]
@@ -0,0 +1,56 @@
+import pytest
+
+from spider_core import codecs
+from spider_core.engines import CaptchaScanner, SearchEngine, get_engine, register_engine
+
+
+def test_build_url_paging():
+    assert get_engine("bing").build_url(["电影", "top"], 3).endswith("q=%E7%94%B5%E5%BD%B1+top&first=21")
+    assert get_engine("baidu").build_url(["a"], 1).endswith("wd=a&pn=0")
+    assert get_engine("baidu").build_url(["a"], 2).endswith("wd=a&pn=10")
+
+
+@pytest.mark.parametrize("engine", ["bing", "baidu"])
+def test_captcha_marker_split_across_chunks(engine):
+    """标记跨越块边界的每一种切分位置都能命中"""
+    for marker in get_engine(engine).captcha_markers:
+        page = "<html><body>" + "x" * 50 + marker + "y" * 50
+        start = page.index(marker)
+        for cut in range(start + 1, start + len(marker)):
+            scanner = get_engine(engine).captcha_scanner()
+            assert not scanner.feed(page[:cut])
+            assert scanner.feed(page[cut:])
+
+
+def test_scanner_across_many_small_chunks():
+    scanner = CaptchaScanner(('id="b_captcha"',))
+    page = '<div id="b_captcha">'
+    assert any(scanner.feed(ch) for ch in page)
+
+
+def test_scanner_ignores_normal_pages():
+    scanner = get_engine("bing").captcha_scanner()
+    assert not any(scanner.feed(chunk) for chunk in ["<li class='b_algo'>", "/challenge", "<p>verify</p>"])
+
+
+def test_incomplete_plugin_fails_before_registration():
+    class HalfEngine(SearchEngine):
+        name = "half"
+
+        def build_url(self, keywords, page_no):
+            return "https://half.example/"
+
+    with pytest.raises(TypeError):
+        register_engine(HalfEngine())
+    with pytest.raises(TypeError):
+        register_engine(HalfEngine)
+    assert get_engine("half") is None
+
+
+def test_incomplete_codec_cannot_be_instantiated():
+    class EncodeOnly(codecs.Codec):
+        def encode(self, obj):
+            return b""
+
+    with pytest.raises(TypeError):
+        EncodeOnly()
@@ -0,0 +1,28 @@
+import asyncio
+
+from yarl import URL
+
+from spider_core.configs import HTTP_POOL_CONFIG
+from spider_core.http_pool import HttpClientPool
+
+
+def test_sessions_share_connector_but_not_cookies():
+    async def scenario():
+        pool = HttpClientPool(HTTP_POOL_CONFIG)
+        await pool.start()
+        first, second = pool.session(1), pool.session(2)
+        assert pool.session("1") is first
+        assert first.connector is second.connector
+
+        first.cookie_jar.update_cookies({"SRCHUID": "abc"}, URL("https://www.cn.bing.com/"))
+        assert len(first.cookie_jar) == 1
+        assert len(second.cookie_jar) == 0
+
+        # 任务结束只关闭会话，连接器继续供其他任务复用；同一 id 再次获取得到新会话
+        await pool.release(1)
+        assert first.closed and not second.connector.closed
+        assert len(pool.session(1).cookie_jar) == 0
+        await pool.close()
+        assert second.closed
+
+    asyncio.run(scenario())
@@ -0,0 +1,143 @@
+"""SERP 解析后端等价性：各后端与流式解析的输出必须与 bs4 参考实现逐条一致"""
+from pathlib import Path
+
+import pytest
+
+from spider_core.parsers import PARSER_BACKENDS, bing_stream_parser, get_parser, parse_baidu_links, parse_links_bs4
+
+FIXTURES = Path(__file__).resolve().parent.parent / "spider_core" / "fixtures"
+
+# 每个 fixture 的预期结果数：防止所有后端一起解析出 0 条时仍判为“一致”
+BING_FIXTURES = {
+    "bing_serp_li.html": 10,
+    "bing_serp_div.html": 10,
+}
+
+
+def _read(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def _stream_parse(html: str, chunk_size: int):
+    parser = bing_stream_parser()
+    links = []
+    for i in range(0, len(html), chunk_size):
+        links.extend(parser.feed(html[i:i + chunk_size]))
+    links.extend(parser.close())
+    return links
+
+
+@pytest.mark.parametrize("fixture", sorted(BING_FIXTURES))
+def test_reference_result_count(fixture):
+    links = parse_links_bs4(_read(fixture), "bing")
+    assert len(links) == BING_FIXTURES[fixture]
+    assert all(link["href"].startswith("http") and link["title"] for link in links)
+
+
+@pytest.mark.parametrize("backend", sorted(PARSER_BACKENDS))
+@pytest.mark.parametrize("fixture", sorted(BING_FIXTURES))
+def test_backend_matches_reference(fixture, backend):
+    html = _read(fixture)
+    assert PARSER_BACKENDS[backend](html, "bing") == parse_links_bs4(html, "bing")
+
+
+@pytest.mark.skipif(bing_stream_parser() is None, reason="未安装 lxml")
+@pytest.mark.parametrize("chunk_size", [1, 97, 4096, 1 << 20])
+@pytest.mark.parametrize("fixture", sorted(BING_FIXTURES))
+def test_stream_parser_matches_reference(fixture, chunk_size):
+    html = _read(fixture)
+    assert _stream_parse(html, chunk_size) == parse_links_bs4(html, "bing")
+
+
+@pytest.mark.parametrize("backend", sorted(PARSER_BACKENDS))
+def test_redirect_and_missing_cite(backend):
+    """ck 跳转与相对地址优先取 data-url；无 cite 时来源为“未知来源”；文本跳过脚本与注释"""
+    html = (
+        '<ol><li class="b_algo"><h2><a href="https://www.bing.com/ck/a?u=1" data-url="https://a.example/">'
+        'A<script>var x;</script> <!-- c -->标题</a></h2></li>'
+        '<li class="b_algo"><h2><a href="/search?q=2">B</a></h2><cite> b.example </cite></li></ol>'
+    )
+    assert PARSER_BACKENDS[backend](html, "bing") == [
+        {"title": "A标题", "href": "https://a.example/", "source": "未知来源", "engine": "bing"},
+        {"title": "B", "href": "/search?q=2", "source": "b.example", "engine": "bing"},
+    ]
+
+
+# 结构边界：各后端逐条与 bs4 一致，并核对 bs4 自身的结果，防止一起出错
+EDGE_CASES = {
+    "xml_declaration": (
+        '<?xml version="1.0" encoding="utf-8"?>\n<html><body><ol><li class="b_algo">'
+        '<h2><a href="https://a.example/">中文标题</a></h2><cite>a.example</cite></li></ol></body></html>',
+        ["https://a.example/"],
+    ),
+    "nested_b_algo": (
+        '<div class="b_algo"><h2><a href="https://outer.example/">Outer</a></h2>'
+        '<div class="b_algo"><h2><a href="https://inner.example/">Inner</a></h2></div></div>',
+        ["https://outer.example/", "https://inner.example/"],
+    ),
+    "missing_h2_or_a": (
+        '<ol><li class="b_algo"><p>无标题</p></li><li class="b_algo"><h2>无链接</h2></li>'
+        '<li class="b_algo"><h2><a>无 href</a></h2></li>'
+        '<li class="b_algo"><h2><a href="https://ok.example/">OK</a></h2></li></ol>',
+        ["https://ok.example/"],
+    ),
+    "li_before_div": (
+        '<li class="b_algo"><p>无标题</p></li>'
+        '<div class="b_algo"><h2><a href="https://div.example/">Div</a></h2></div>',
+        [],  # 有 li.b_algo 时不再看 div.b_algo
+    ),
+    "div_before_li": (
+        '<div class="b_algo"><h2><a href="https://div.example/">Div</a></h2></div>'
+        '<ol><li class="b_algo"><h2><a href="https://li.example/">Li</a></h2></li></ol>',
+        ["https://li.example/"],
+    ),
+    "nested_li_b_algo": (
+        '<ol><li class="b_algo"><h2><a href="https://outer.example/">Outer</a></h2>'
+        '<ul><li class="b_algo"><h2><a href="https://inner.example/">Inner</a></h2></li></ul></li>'
+        '<li class="b_algo"><h2><a href="https://next.example/">Next</a></h2></li></ol>',
+        ["https://outer.example/", "https://inner.example/", "https://next.example/"],
+    ),
+    "any_tag_fallback": (
+        '<section class="b_algo"><h2><a href="https://s.example/">S</a></h2></section>',
+        ["https://s.example/"],
+    ),
+}
+
+
+@pytest.mark.parametrize("backend", sorted(PARSER_BACKENDS))
+@pytest.mark.parametrize("case", sorted(EDGE_CASES))
+def test_backend_edge_cases(case, backend):
+    html, hrefs = EDGE_CASES[case]
+    reference = parse_links_bs4(html, "bing")
+    assert [link["href"] for link in reference] == hrefs
+    assert PARSER_BACKENDS[backend](html, "bing") == reference
+
+
+@pytest.mark.skipif(bing_stream_parser() is None, reason="未安装 lxml")
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+@pytest.mark.parametrize("case", sorted(EDGE_CASES))
+def test_stream_parser_edge_cases(case, chunk_size):
+    html, hrefs = EDGE_CASES[case]
+    assert _stream_parse(html, chunk_size) == parse_links_bs4(html, "bing")
+
+
+def test_stream_parser_yields_li_results_before_close():
+    parser = bing_stream_parser()
+    links = parser.feed(EDGE_CASES["nested_li_b_algo"][0] + '<div class="b_algo"></div>')
+    assert [link["href"] for link in links] == ["https://outer.example/", "https://inner.example/",
+                                                "https://next.example/"]
+    assert parser.close() == []
+
+
+def test_unknown_backend_falls_back_to_reference():
+    assert get_parser("no-such-backend") is parse_links_bs4
+
+
+def test_baidu_fixture():
+    """百度：推广位（无链接）被跳过，优先取 c-link / c-showurl 等直链，来源缺失时为“未知来源”"""
+    links = parse_baidu_links(_read("baidu_serp.html"))
+    assert len(links) == 9
+    assert all(link["engine"] == "baidu" and "baidu.com" not in link["href"] for link in links)
+    assert links[0] == {"title": "豆瓣电影 Top 250", "href": "https://movie.douban.com/top250",
+                        "source": "豆瓣", "engine": "baidu"}
+    assert [link["source"] for link in links].count("未知来源") == 2
@@ -0,0 +1,86 @@
+import django
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+BATCH_CONFIG = {"batch_size": 100}
+
+
+@pytest.fixture(scope="module")
+def db():
+    # 不依赖 PostgreSQL：内存 sqlite，按当前模型直接建表
+    if not settings.configured:
+        settings.configure(
+            INSTALLED_APPS=["spider_core"],
+            DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}},
+            MIGRATION_MODULES={"spider_core": None},
+            USE_TZ=True,
+        )
+        django.setup()
+        call_command("migrate", run_syncdb=True, verbosity=0)
+    from spider_core import models
+    return models
+
+
+def _task(models, name="t"):
+    return models.SpiderTask.objects.create(name=name, keywords="k")
+
+
+def test_result_rows(db):
+    from spider_core.persistence import result_rows
+
+    batch = {"messageType": "resultBatch", "taskId": 5, "payload": {"results": [
+        {"taskId": 5, "url": "https://a.example/", "title": "A"},
+        {"url": "https://b.example/", "title": None},  # taskId 取信封上的
+        {"taskId": 5, "url": ""},
+        {"taskId": "x", "url": "https://c.example/"},
+    ]}}
+    rows, invalid = result_rows(batch)
+    assert rows == [
+        {"task_id": 5, "url": "https://a.example/", "title": "A"},
+        {"task_id": 5, "url": "https://b.example/", "title": ""},
+    ]
+    assert invalid == 2
+
+    single = {"messageType": "result", "taskId": 6, "payload": {"url": "https://d.example/" + "x" * 3000, "title": "T" * 600}}
+    (row,), invalid = result_rows(single)
+    assert (row["task_id"], len(row["url"]), len(row["title"]), invalid) == (6, 2000, 500, 0)
+    assert result_rows({"messageType": "progress", "payload": {}}) == ([], 0)
+
+
+def test_write_batch_filters_missing_tasks_and_duplicates(db):
+    from spider_core.persistence import ResultPersister
+
+    task = _task(db)
+    persister = ResultPersister(BATCH_CONFIG)
+    rows = [
+        {"task_id": task.pk, "url": "https://a.example/", "title": "old"},
+        {"task_id": task.pk, "url": "https://a.example/", "title": "new"},
+        {"task_id": task.pk, "url": "https://b.example/", "title": "B"},
+        {"task_id": task.pk + 1000, "url": "https://a.example/", "title": "orphan"},
+    ]
+    assert persister._write_batch(rows) == (2, 1)
+    assert db.CrawledResult.objects.get(task=task, url="https://a.example/").title == "new"
+    # 重复写入被 ignore_conflicts 吸收
+    assert persister._write_batch(rows[:1]) == (1, 0)
+    assert db.CrawledResult.objects.filter(task=task).count() == 2
+
+
+def test_write_batch_recovers_from_deleted_cached_task(db):
+    from spider_core.persistence import ResultPersister
+
+    kept, deleted = _task(db, "kept"), _task(db, "deleted")
+    persister = ResultPersister(BATCH_CONFIG)
+    deleted_id = deleted.pk
+    persister._write_batch([{"task_id": deleted_id, "url": "https://a.example/", "title": ""}])
+    assert deleted_id in persister._known_tasks
+
+    deleted.delete()
+    rows = [
+        {"task_id": kept.pk, "url": "https://k.example/", "title": ""},
+        {"task_id": deleted_id, "url": "https://d.example/", "title": ""},
+    ]
+    # 缓存中的任务已删除：写入违反外键约束，重新确认后只跳过该任务的行，而不是整批失败
+    assert persister._write_batch(rows) == (1, 1)
+    assert deleted_id not in persister._known_tasks
+    assert db.CrawledResult.objects.filter(task=kept).count() == 1
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from spider_core.rate_limiter import RateLimiterRegistry, TokenBucket
+
+
+def test_burst_then_rate():
+    """桶满时 burst 个请求立即放行，之后按 rate 间隔发放"""
+    async def run():
+        bucket = TokenBucket(rate=20, burst=3)
+        waits = [await bucket.acquire() for _ in range(5)]
+        return bucket, waits
+
+    bucket, waits = asyncio.run(run())
+    assert all(w < 0.01 for w in waits[:3])
+    assert 0.03 <= waits[3] <= 0.1
+    assert 0.03 <= waits[4] <= 0.1
+    assert bucket.stats()["acquired"] == 5
+    assert bucket.stats()["delayed"] == 2
+
+
+def test_waiters_are_served_fifo():
+    """并发等待者按到达顺序取得令牌"""
+    async def run():
+        bucket = TokenBucket(rate=50, burst=1)
+        order = []
+
+        async def take(i):
+            await bucket.acquire()
+            order.append(i)
+
+        await asyncio.gather(*(take(i) for i in range(8)))
+        return order
+
+    assert asyncio.run(run()) == list(range(8))
+
+
+def test_rate_is_enforced_across_concurrent_callers():
+    """并发调用不会穿透限速：n 个请求至少耗时 (n - burst) / rate"""
+    async def run():
+        bucket = TokenBucket(rate=50, burst=2)
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(12)))
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= (12 - 2) / 50 * 0.95
+
+
+def test_non_positive_rate_never_waits():
+    async def run():
+        bucket = TokenBucket(rate=0)
+        return [await bucket.acquire() for _ in range(100)]
+
+    assert asyncio.run(run()) == [0.0] * 100
+
+
+def test_set_rate_takes_effect():
+    async def run():
+        bucket = TokenBucket(rate=1, burst=1)
+        await bucket.acquire()
+        bucket.set_rate(100)
+        return await bucket.acquire()
+
+    assert asyncio.run(run()) < 0.05
+
+
+def test_registry_shares_bucket_per_engine_and_proxy():
+    registry = RateLimiterRegistry({"default": {"rate": 2, "burst": 2}, "bing": {"rate": 3, "burst": 3}})
+    bing = registry.get("bing")
+    assert registry.get("bing") is bing
+    assert registry.get("bing", "http://p:1") is not bing
+    assert bing.rate == 3 and bing.burst == 3
+    assert registry.get("unknown").rate == 2
+    assert set(registry.stats()) == {"bing", "bing@http://p:1", "unknown"}
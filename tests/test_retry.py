@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from spider_core.adaptive import CAPTCHA, TIMEOUT
+from spider_core.retry import RetryPolicy, RetryScheduler
+
+POLICY = {"retry_on": [429, 503, "timeout"], "max_attempts": 4, "base_delay": 1.0, "max_delay": 3.0, "jitter": 0.5}
+
+
+class Job:
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self.stop_event = asyncio.Event()
+
+
+def test_policy_backoff_and_jitter():
+    policy = RetryPolicy(POLICY)
+    for _ in range(200):
+        assert 0.5 <= policy.delay(429, 1) <= 1.0
+        assert 1.0 <= policy.delay(TIMEOUT, 2) <= 2.0
+        assert 1.5 <= policy.delay(503, 3) <= 3.0  # 4.0 被 max_delay 截断为 3.0
+
+
+def test_policy_gives_up():
+    policy = RetryPolicy(POLICY)
+    assert policy.delay(429, 4) is None  # 已用完 max_attempts
+    assert policy.delay(404, 1) is None
+    assert policy.delay(CAPTCHA, 1) is None
+    assert RetryPolicy({**POLICY, "jitter": 0}).delay(429, 2) == 2.0
+
+
+def test_policy_per_engine_with_default():
+    scheduler = RetryScheduler({"default": POLICY, "bing": {**POLICY, "max_attempts": 1}})
+    assert scheduler.policy("bing").delay(429, 1) is None
+    assert scheduler.policy("baidu") is scheduler.policy("baidu")
+    assert scheduler.policy("baidu").max_attempts == 4
+
+
+def _run(scenario):
+    """在事件循环中运行 scenario(scheduler, requeued)，返回交还记录 [(task_id, item, 耗时)]"""
+    async def main():
+        scheduler = RetryScheduler({"default": POLICY})
+        requeued = []
+        start = time.monotonic()
+
+        async def requeue(job, item):
+            requeued.append((job.task_id, item, time.monotonic() - start))
+
+        runner = asyncio.create_task(scheduler.run(requeue))
+        try:
+            await scenario(scheduler, requeued)
+        finally:
+            runner.cancel()
+        return scheduler, requeued
+
+    return asyncio.run(main())
+
+
+def test_entries_are_requeued_in_due_order():
+    async def scenario(scheduler, requeued):
+        job = Job(1)
+        for delay, page in ((0.15, 3), (0.05, 1), (0.10, 2)):
+            scheduler.schedule(delay, job, (page,))
+        assert scheduler.stats()["pending"] == 3
+        await asyncio.sleep(0.3)
+
+    scheduler, requeued = _run(scenario)
+    assert [item for _, item, _ in requeued] == [(1,), (2,), (3,)]
+    for (_, (page,), elapsed) in requeued:
+        assert elapsed == pytest.approx(page * 0.05, abs=0.04)
+    assert scheduler.stats() == {"pending": 0, "scheduled": 3, "exhausted": 0}
+
+
+def test_earlier_entry_wakes_scheduler():
+    async def scenario(scheduler, requeued):
+        scheduler.schedule(5.0, Job(1), ("late",))
+        await asyncio.sleep(0.02)
+        scheduler.schedule(0.02, Job(1), ("early",))
+        await asyncio.sleep(0.1)
+
+    _, requeued = _run(scenario)
+    assert [item for _, item, _ in requeued] == [("early",)]
+
+
+def test_stop_hands_back_only_that_task():
+    async def scenario(scheduler, requeued):
+        stopped, running = Job(1), Job(2)
+        scheduler.schedule(5.0, stopped, ("a",))
+        scheduler.schedule(5.0, stopped, ("b",))
+        scheduler.schedule(0.1, running, ("c",))
+        await asyncio.sleep(0.02)
+        scheduler.stop(1)
+        await asyncio.sleep(0.02)
+        assert sorted(item for _, item, _ in requeued) == [("a",), ("b",)]
+        assert scheduler.stats()["pending"] == 1
+        await asyncio.sleep(0.15)
+
+    _, requeued = _run(scenario)
+    assert [task_id for task_id, _, _ in requeued] == [1, 1, 2]
+    assert requeued[0][2] < 0.1
+
+
+def test_record_exhausted():
+    scheduler = RetryScheduler({"default": POLICY})
+    scheduler.record_exhausted()
+    assert scheduler.stats()["exhausted"] == 1
@@ -0,0 +1,97 @@
+import asyncio
+
+from spider_core import sse_hub
+from spider_core.sse_hub import HubEvent, ReplayBuffer, SseHub, Subscription
+
+CONFIG = {"subscriber_queue_size": 3, "prefetch": 10, "replay_size": 5, "replay_max_age": 60}
+
+
+def _event(event, n=0):
+    return HubEvent(event, f"event: {event}\ndata: {n}\n\n", 1, None)
+
+
+def _drain(sub):
+    items = []
+    while len(sub):
+        items.append(asyncio.run(sub.get()))
+    return items
+
+
+def test_replay_since_returns_only_missed_events():
+    buffer = ReplayBuffer(size=5, max_age=60)
+    for i in range(1, 8):
+        buffer.append("e", _event("result", i))
+    # 环形缓冲只保留最近 5 条（序号 3..7）
+    assert len(buffer) == 5
+    missed = buffer.since(5)
+    assert [item.frame for item in missed] == [
+        "id: e-6\nevent: result\ndata: 6\n\n",
+        "id: e-7\nevent: result\ndata: 7\n\n",
+    ]
+    assert buffer.since(7) == []
+    assert len(buffer.since(0)) == 5
+
+
+def test_replay_since_skips_expired_events(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(sse_hub.time, "monotonic", lambda: clock[0])
+    buffer = ReplayBuffer(size=10, max_age=60)
+    buffer.append("e", _event("result", 1))
+    clock[0] += 50
+    buffer.append("e", _event("result", 2))
+    clock[0] += 20
+    # 第 1 条已超过 max_age，只补发第 2 条
+    assert [item.frame for item in buffer.since(0)] == ["id: e-2\nevent: result\ndata: 2\n\n"]
+    assert not buffer.expired(clock[0])
+    assert buffer.expired(clock[0] + 61)
+
+
+def test_subscription_drops_incoming_progress_when_full():
+    sub = Subscription("1", maxsize=2)
+    assert sub.offer(_event("result", 1))
+    assert sub.offer(_event("result", 2))
+    assert sub.offer(_event("progress", 3))
+    assert sub.dropped == 1
+    assert [item.frame for item in _drain(sub)] == [_event("result", 1).frame, _event("result", 2).frame]
+
+
+def test_subscription_evicts_oldest_progress_for_results():
+    sub = Subscription("1", maxsize=3)
+    for item in (_event("progress", 1), _event("result", 2), _event("progress", 3)):
+        sub.offer(item)
+    assert sub.offer(_event("status", 4))
+    assert sub.dropped == 1
+    assert [item.frame for item in _drain(sub)] == [
+        _event("result", 2).frame, _event("progress", 3).frame, _event("status", 4).frame]
+
+
+def test_subscription_disconnects_when_only_results_queued():
+    sub = Subscription("1", maxsize=2)
+    sub.offer(_event("result", 1))
+    sub.offer(_event("result", 2))
+    assert not sub.offer(_event("result", 3))
+    assert sub.closed
+    assert asyncio.run(sub.get()) is None
+
+
+def test_dispatch_buffers_and_disconnects_slow_subscriber():
+    hub = SseHub(CONFIG)
+    hub._buffers["7"] = ReplayBuffer(CONFIG["replay_size"], CONFIG["replay_max_age"])
+    sub = Subscription("7", CONFIG["subscriber_queue_size"])
+    hub._subscribers["7"] = {sub}
+
+    for i in range(4):
+        hub.dispatch("7", _event("result", i))
+    # 第 4 条结果放不下，订阅者被断开，但事件仍记入重放缓冲
+    assert sub.closed
+    assert "7" not in hub._subscribers
+    assert hub.stats()["disconnected"] == 1
+    assert len(hub._buffers["7"]) == 4
+
+    # 重连时按 Last-Event-ID 只取错过的事件
+    last_seq = hub._parse_event_id(f"{hub.epoch}-2")
+    assert last_seq == 2
+    assert len(hub._buffers["7"].since(last_seq)) == 2
+    # 其他进程纪元的 id 补发整个缓冲，无法解析的 id 不补发
+    assert hub._parse_event_id("other-2") == 0
+    assert hub._parse_event_id("garbage") is None
@@ -0,0 +1,86 @@
+import asyncio
+
+from spider_core.configs import AMQP_URL
+from spider_core.crawler import CrawlerService
+from spider_core.engines import get_engine
+
+PAGE = ('<html><body><ol>'
+        '<li class="b_algo"><h2><a href="https://a.example/">A</a></h2><cite>a.example</cite></li>'
+        '<li class="b_algo"><h2><a href="https://b.example/">Ω</a></h2><cite>b.example</cite></li>'
+        '</ol></body></html>').encode("utf-8")
+
+
+class FakeResponse:
+    def __init__(self, body, charset="utf-8", chunk_size=40, on_chunk=None):
+        self.status = 200
+        self.charset = charset
+        self._body = body
+        self._chunk_size = chunk_size
+        self._on_chunk = on_chunk
+        self.content = self
+
+    async def iter_chunked(self, n):
+        for i in range(0, len(self._body), self._chunk_size):
+            if self._on_chunk:
+                self._on_chunk(i)
+            yield self._body[i:i + self._chunk_size]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, **kwargs):
+        return self.response
+
+
+def _run(response, before_publish=None):
+    async def scenario():
+        svc = CrawlerService(AMQP_URL)
+        job = svc._new_job({"task_id": 1, "keywords": ["k"], "pageSize": 1, "rateLimitPerSec": 1000},
+                           asyncio.Event())
+        published, in_flight = [], []
+
+        async def publish_links(job, links, exchange, report):
+            await asyncio.sleep(0.01)  # 发布比下载慢：名额不应等发布完成
+            in_flight.append(job.in_flight)
+            published.extend(link["href"] for link in links)
+            report["results"] += len(links)
+
+        svc._publish_links = publish_links
+        if before_publish:
+            before_publish(job, response)
+        report = {"pageNo": 1, "status": "failed", "results": 0, "suppressed": 0, "cacheHit": False}
+        report = await svc._stream_page(FakeSession(response), job, 1, "https://x/",
+                                        get_engine("bing").stream_parser(), None, report)
+        return report, published, in_flight + [job.in_flight]
+
+    return asyncio.run(scenario())
+
+
+def test_stream_page_publishes_all_results_and_releases_slot():
+    report, published, in_flight = _run(FakeResponse(PAGE))
+    assert report["status"] == "ok" and report["results"] == 2
+    assert published == ["https://a.example/", "https://b.example/"]
+    assert in_flight[-2:] == [0, 0]
+
+
+def test_stream_page_unknown_charset_falls_back_to_utf8():
+    report, published, _ = _run(FakeResponse(PAGE, charset="x-no-such-charset"))
+    assert report["status"] == "ok"
+    assert published == ["https://a.example/", "https://b.example/"]
+
+
+def test_stream_page_stopped_mid_stream_is_skipped():
+    def stop_after_first_chunk(job, response):
+        response._on_chunk = lambda offset: offset and job.stop_event.set()
+
+    report, _, in_flight = _run(FakeResponse(PAGE), stop_after_first_chunk)
+    assert report["status"] == "skipped"
+    assert in_flight[-1] == 0
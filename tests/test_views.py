@@ -0,0 +1,78 @@
+import io
+import json
+
+import pytest
+from django.core.exceptions import RequestDataTooBig
+
+from spider_core.configs import BULK_SUBMIT_CONFIG
+from spider_core.views import _iter_bulk_tasks
+
+
+class NdjsonRequest:
+    content_type = "application/x-ndjson"
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def __iter__(self):
+        return iter(self.lines)
+
+
+def test_ndjson_rejects_only_bad_lines():
+    lines = [
+        json.dumps({"taskId": 1, "keywords": ["a"]}).encode() + b"\n",
+        b"\n",
+        b'{"taskId": 2, "keywords": "\xff\xfe"}\n',  # 非 UTF-8
+        b"{not json}\n",
+        json.dumps({"taskId": 3, "keywords": ["b"]}).encode() + b"\n",
+    ]
+    tasks = list(_iter_bulk_tasks(NdjsonRequest(lines)))
+    assert [index for index, _ in tasks] == [0, 1, 2, 3]
+    assert tasks[0][1]["taskId"] == 1
+    assert isinstance(tasks[1][1], UnicodeDecodeError)
+    assert isinstance(tasks[2][1], json.JSONDecodeError)
+    assert tasks[3][1]["taskId"] == 3
+
+
+class ArrayRequest:
+    content_type = "application/json"
+
+    def __init__(self, body: bytes):
+        self.stream = io.BytesIO(body)
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64 * 1024])
+def test_json_array_body_is_read_incrementally(monkeypatch, chunk_size):
+    monkeypatch.setitem(BULK_SUBMIT_CONFIG, "read_chunk_size", chunk_size)
+    body = ' [ {"taskId": 1, "keywords": ["电影"]},\n{"taskId": 22} , {"taskId": 333, "n": 12345} ] '.encode()
+    request = ArrayRequest(body)
+    tasks = _iter_bulk_tasks(request)
+    assert next(tasks) == (0, {"taskId": 1, "keywords": ["电影"]})
+    if chunk_size < len(body):
+        assert request.stream.tell() < len(body)  # 第一条任务产出时请求体还没读完
+    assert list(tasks) == [(1, {"taskId": 22}), (2, {"taskId": 333, "n": 12345})]
+    assert list(_iter_bulk_tasks(ArrayRequest(b"[]"))) == []
+
+
+@pytest.mark.parametrize("body", [b'{"taskId": 1}', b"", b'[{"taskId": 1}', b'[{"taskId": 1},]',
+                                  b'[{"taskId": 1} {"taskId": 2}]', b'[{"taskId": 1}] x', b'["\xff"]'])
+def test_json_array_body_rejects_malformed(monkeypatch, body):
+    monkeypatch.setitem(BULK_SUBMIT_CONFIG, "read_chunk_size", 4)
+    with pytest.raises(ValueError):
+        list(_iter_bulk_tasks(ArrayRequest(body)))
+
+
+def test_body_over_limit_is_too_big(monkeypatch):
+    monkeypatch.setitem(BULK_SUBMIT_CONFIG, "read_chunk_size", 16)
+    monkeypatch.setitem(BULK_SUBMIT_CONFIG, "max_body_bytes", 40)
+    body = json.dumps([{"taskId": i} for i in range(10)]).encode()
+    tasks = _iter_bulk_tasks(ArrayRequest(body))
+    assert next(tasks) == (0, {"taskId": 0})
+    with pytest.raises(RequestDataTooBig):
+        list(tasks)
+    lines = [json.dumps({"taskId": i}).encode() + b"\n" for i in range(10)]
+    with pytest.raises(RequestDataTooBig):
+        list(_iter_bulk_tasks(NdjsonRequest(lines)))